@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Storage backends for the accounts, settings.json "users" or an sqlite database.
+"""
+import json
+import threading
+from collections.abc import MutableMapping
+
+
+class AccountStore(MutableMapping):
+    """
+    Dict of login_name -> account kept in memory, changes are persisted by the backend.
+
+    Assigning or deleting an account persists it, accounts edited in place are persisted with save().
+    version is bumped on every change, changed_since() tells which accounts a change touched. Threads editing
+    accounts in place hold lock, for settings.json accounts it is the settings writer's lock.
+    """
+    users: dict
+    lock: threading.RLock
+    version: int = 0
+    changed_versions: dict = None  # login_name: version of its last change
+
+    def __getitem__(self, login_name):
+        return self.users[login_name]
+
+    def __setitem__(self, login_name, user):
+        with self.lock:
+            self.users[login_name] = user
+        self.save(login_name)
+
+    def __delitem__(self, login_name):
+        with self.lock:
+            del self.users[login_name]
+            self._changed((login_name,))
+        self._delete(login_name)
+
+    def __iter__(self):
+        return iter(self.users)
+
+    def __len__(self):
+        return len(self.users)
+
+    def save(self, *login_names):
+        self._changed(login_names)
+        self._save(login_names)
+
+    def _changed(self, login_names):
+        with self.lock:
+            self.version += 1
+            if self.changed_versions is None:
+                self.changed_versions = {}
+            for login_name in login_names:
+                self.changed_versions[login_name] = self.version
+
+    def changed_since(self, version: int) -> list:
+        """
+        Login names added, saved, reordered or deleted after version
+        """
+        with self.lock:
+            return [login_name for login_name, changed in (self.changed_versions or {}).items()
+                    if changed > version]
+
+    def add_many(self, users: dict):
+        """
+        Add or replace several accounts, persisted in one write
+        """
+        with self.lock:
+            self.users.update(users)
+        self.save(*users)
+
+    def save_all(self):
+        self.save(*self.users.keys())
+
+    def sorted_items(self) -> list:
+        return sorted(self.users.items(), key=lambda a: a[1].get("display_order", 0))
+
+    def set_order(self, login_names: list):
+        """
+        Set display_order of the accounts to the order of login_names
+        """
+        changed = []
+        with self.lock:
+            for display_order, login_name in enumerate(login_names, 1):
+                user = self.users[login_name]
+                if user.get("display_order") != display_order:
+                    user["display_order"] = display_order
+                    changed.append(login_name)
+        if changed:
+            self._changed(changed)
+            self._save_order(changed)
+
+    def _save(self, login_names):
+        raise NotImplementedError()
+
+    def _save_order(self, login_names):
+        self._save(login_names)
+
+    def _delete(self, login_name):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class JsonAccountStore(AccountStore):
+    """
+    Accounts in the "users" dict of settings.json, every change rewrites the settings file.
+    """
+    def __init__(self, settings: dict, settings_write, lock: threading.RLock = None):
+        self.users = settings.setdefault("users", {})
+        self.settings_write = settings_write
+        self.lock = lock or threading.RLock()
+
+    def _save(self, login_names):
+        self.settings_write()
+
+    def _delete(self, login_name):
+        self.settings_write()
+
+
+class SqliteAccountStore(AccountStore):
+    """
+    One row per account in an sqlite database, changes update only the affected rows.
+    """
+    def __init__(self, db_path: str):
+        import sqlite3
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS accounts ("
+                            "login_name TEXT PRIMARY KEY, steam_uid TEXT, display_order INTEGER, data TEXT NOT NULL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS accounts_steam_uid ON accounts (steam_uid)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS accounts_display_order ON accounts (display_order)")
+        rows = self.db.execute("SELECT login_name, display_order, data FROM accounts ORDER BY display_order").fetchall()
+        # One json.loads for all rows, display_order is only stored in its column
+        self.users = json.loads("{" + ",".join(json.dumps(login_name) + ":" + data for login_name, _, data in rows) + "}")
+        for login_name, display_order, _ in rows:
+            self.users[login_name]["display_order"] = display_order
+
+    def _save(self, login_names):
+        rows = []
+        for login_name in login_names:
+            user = dict(self.users[login_name])
+            display_order = user.pop("display_order", None)
+            rows.append((login_name, user.get("steam_uid"), display_order, json.dumps(user, ensure_ascii=False)))
+        with self._lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO accounts (login_name, steam_uid, display_order, data) "
+                                "VALUES (?, ?, ?, ?)", rows)
+
+    def _save_order(self, login_names):
+        rows = [(self.users[login_name]["display_order"], login_name) for login_name in login_names]
+        with self._lock, self.db:
+            self.db.executemany("UPDATE accounts SET display_order = ? WHERE login_name = ?", rows)
+
+    def _delete(self, login_name):
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM accounts WHERE login_name = ?", (login_name,))
+
+    def find_by_uid(self, steam_uid: str):
+        row = self.db.execute("SELECT login_name FROM accounts WHERE steam_uid = ?", (steam_uid,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.db.close()
+
+
+def migrate_json_to_sqlite(settings: dict, db_path: str) -> SqliteAccountStore:
+    """
+    Copy the accounts of settings.json into db_path, settings["users"] is removed
+    """
+    store = SqliteAccountStore(db_path)
+    store.users.update(settings.pop("users", {}))
+    store.save_all()
+    settings["account_store"] = "sqlite"
+    return store
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Avatar images stored by content hash, and the background downloader used by SteamSwitcher.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fileutils import write_atomic
+
+MANIFEST_VERSION = 1
+# Derived copies named after the content hash, removed together with the image
+THUMBNAILS_DIR = "thumbnails"
+
+
+class AvatarStore:
+    """
+    Avatar images kept once per content hash in avatars/store, however many accounts or urls use them.
+
+    manifest.json maps each url to the hash of its image with the ETag and Last-Modified needed to revalidate it,
+    each account to the hash of its avatar and each hash to the size of the file. Lookups are served from the
+    manifest in memory, nothing is probed on disk. Images no account uses any more are kept for urls that come
+    back until the store is over budget_bytes, then gc() removes them, stored longest ago first. Images an
+    account uses are never removed.
+    """
+    def __init__(self, avatars_dir: str, budget_bytes: int = 256 * 1024 * 1024):
+        self.avatars_dir = avatars_dir
+        self.store_dir = os.path.join(avatars_dir, "store")
+        self.manifest_file = os.path.join(avatars_dir, "manifest.json")
+        self.budget_bytes = budget_bytes
+        self.version = 0
+        self.dirty = False
+        self._lock = threading.RLock()
+        manifest = self._load_manifest()
+        self.urls = manifest.get("urls", {})  # url: {"hash", "etag", "last_modified"}
+        self.accounts = manifest.get("accounts", {})  # login_name: hash
+        self.files = manifest.get("files", {})  # hash: {"size", "stored", "ext"}
+        # Files of the old one file per url name layout, claimed by the first account whose url has that name
+        self.legacy = manifest.get("legacy", {})  # url file name: {"hash", "etag", "last_modified"}
+        if manifest.get("version") != MANIFEST_VERSION:
+            self._migrate()
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_file, encoding="utf-8") as manifest_file:
+                return json.load(manifest_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        """
+        Write the manifest if anything changed since the last save
+        """
+        with self._lock:
+            if not self.dirty:
+                return
+            data = json.dumps({"version": MANIFEST_VERSION, "urls": self.urls, "accounts": self.accounts,
+                               "files": self.files, "legacy": self.legacy}).encode("utf-8")
+            self.dirty = False
+        os.makedirs(self.avatars_dir, exist_ok=True)
+        write_atomic(self.manifest_file, data)
+
+    def _changed(self):
+        self.version += 1
+        self.dirty = True
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.store_dir, digest + self.files[digest].get("ext", ".jpg"))
+
+    def url_path(self, url: str):
+        """
+        Path of the image downloaded from url, None when it hasn't been
+        """
+        entry = self.urls.get(url)
+        return self.path(entry["hash"]) if entry is not None else None
+
+    def validators(self, url: str) -> dict:
+        """
+        Conditional request headers for revalidating url
+        """
+        entry = self.urls.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def lookup(self, login_name: str, url: str):
+        """
+        Path of the avatar of login_name at url, None when it hasn't been downloaded
+        """
+        entry = self.urls.get(url)
+        if entry is None:
+            entry = self._claim_legacy(url)
+            if entry is None:
+                return None
+        if self.accounts.get(login_name) != entry["hash"]:
+            with self._lock:
+                self.accounts[login_name] = entry["hash"]
+                self.dirty = True
+        return self.path(entry["hash"])
+
+    def _claim_legacy(self, url: str):
+        with self._lock:
+            entry = self.legacy.pop(url.split("/")[-1], None)
+            if entry is None or entry["hash"] not in self.files:
+                return None
+            self.urls[url] = entry
+            self._changed()
+            return entry
+
+    def put(self, url: str, data: bytes, etag: str = None, last_modified: str = None) -> str:
+        """
+        Store the image downloaded from url, an image already stored for another url or account is reused
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        ext = os.path.splitext(url.split("/")[-1])[1].lower() or ".jpg"
+        with self._lock:
+            new_file = digest not in self.files
+            if new_file:
+                self.files[digest] = {"size": len(data), "stored": int(time.time()), "ext": ext}
+            self.urls[url] = {"hash": digest, "etag": etag, "last_modified": last_modified}
+            self._changed()
+        path = self.path(digest)
+        if new_file or not os.path.isfile(path):
+            os.makedirs(self.store_dir, exist_ok=True)
+            write_atomic(path, data)
+        return path
+
+    def forget(self, login_name: str):
+        with self._lock:
+            if self.accounts.pop(login_name, None) is not None:
+                self._changed()
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(entry["size"] for entry in self.files.values())
+
+    def gc(self, account_urls: dict, budget_bytes: int = None) -> tuple:
+        """
+        Remove the images no account uses, stored longest ago first, while the store is over budget_bytes.
+        budget_bytes=0 removes all of them.
+
+        account_urls is {login_name: avatar url} of every account, it replaces the account manifest.
+        Returns (files removed, bytes freed).
+        """
+        budget_bytes = self.budget_bytes if budget_bytes is None else budget_bytes
+        with self._lock:
+            for url in account_urls.values():
+                if url not in self.urls:
+                    self._claim_legacy(url)
+            self.accounts = {login_name: self.urls[url]["hash"] for login_name, url in account_urls.items()
+                             if url in self.urls}
+            self.legacy = {}
+            self.dirty = True
+            referenced = set(self.accounts.values())
+            used = self.used_bytes
+            removed = []
+            for digest in sorted(self.files.keys() - referenced, key=lambda d: self.files[d]["stored"]):
+                if used <= budget_bytes:
+                    break
+                used -= self.files[digest]["size"]
+                removed.append(digest)
+            paths = [self.path(digest) for digest in removed]
+            freed = sum(self.files.pop(digest)["size"] for digest in removed)
+            if removed:
+                removed_set = set(removed)
+                self.urls = {url: entry for url, entry in self.urls.items() if entry["hash"] not in removed_set}
+                self.accounts = {login_name: digest for login_name, digest in self.accounts.items()
+                                 if digest not in removed_set}
+                self._changed()
+        for path in paths + self._thumbnail_paths(removed):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self.save()
+        return len(removed), freed
+
+    def _thumbnail_paths(self, digests: list) -> list:
+        thumbnails_dir = os.path.join(self.avatars_dir, THUMBNAILS_DIR)
+        if not digests or not os.path.isdir(thumbnails_dir):
+            return []
+        return [os.path.join(thumbnails_dir, size, digest + ".png") for size in os.listdir(thumbnails_dir)
+                for digest in digests]
+
+    def _migrate(self):
+        """
+        Move the avatars of the url file name layout and their avatars.json validators into the store
+        """
+        metadata_file = os.path.join(self.avatars_dir, "avatars.json")
+        try:
+            with open(metadata_file, encoding="utf-8") as metadata:
+                validators = json.load(metadata)
+        except (FileNotFoundError, json.JSONDecodeError):
+            validators = {}
+        try:
+            names = [name for name in os.listdir(self.avatars_dir)
+                     if name in validators or name.endswith("_full.jpg")]
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            path = os.path.join(self.avatars_dir, name)
+            try:
+                with open(path, "rb") as image_file:
+                    data = image_file.read()
+            except OSError:
+                continue
+            digest = hashlib.sha256(data).hexdigest()
+            cached = validators.get(name, {})
+            if digest not in self.files:
+                self.files[digest] = {"size": len(data), "stored": int(os.path.getmtime(path)),
+                                      "ext": os.path.splitext(name)[1].lower() or ".jpg"}
+                os.makedirs(self.store_dir, exist_ok=True)
+                os.replace(path, self.path(digest))
+            else:
+                os.unlink(path)
+            entry = {"hash": digest, "etag": cached.get("etag"), "last_modified": cached.get("last_modified")}
+            if cached.get("url"):
+                self.urls[cached["url"]] = entry
+            self.legacy[name] = entry
+            # Thumbnails were named after the url file name
+            thumbnails_dir = os.path.join(self.avatars_dir, THUMBNAILS_DIR)
+            for size in os.listdir(thumbnails_dir) if os.path.isdir(thumbnails_dir) else ():
+                old_thumbnail = os.path.join(thumbnails_dir, size, os.path.splitext(name)[0] + ".png")
+                if os.path.isfile(old_thumbnail):
+                    os.replace(old_thumbnail, os.path.join(thumbnails_dir, size, digest + ".png"))
+        if names:
+            print("Moved {0} avatars to {1}".format(len(names), self.store_dir))
+        if os.path.isfile(metadata_file):
+            os.unlink(metadata_file)
+        self._changed()
+        self.save()
+
+    def stats(self) -> str:
+        return "avatar store: {0} images, {1:.1f} MiB, {2} accounts, {3} urls".format(
+            len(self.files), self.used_bytes / 2 ** 20, len(self.accounts), len(self.urls))
+
+
+class AvatarDownloader:
+    """
+    Downloads avatars into an AvatarStore on a thread pool over one keep-alive session.
+
+    Every request for an url that is already being downloaded gets the same future. revalidate=True does a
+    conditional GET with the ETag and Last-Modified of the stored image instead of downloading it again.
+    The manifest is saved once the queued downloads are done, not after each one.
+    """
+    def __init__(self, store: AvatarStore, max_workers: int = 8, timeout: float = 10):
+        self.store = store
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="avatar")
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=max_workers))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=max_workers))
+
+    def fetch(self, url: str, revalidate=False) -> Future:
+        """
+        Returns a future resolving to the local path of the avatar at url.
+        """
+        with self._lock:
+            future = self._pending.get(url)
+            if future is None:
+                future = self.executor.submit(self._download, url, revalidate)
+                self._pending[url] = future
+                future.add_done_callback(lambda f: self._done(url))
+            return future
+
+    def _done(self, url):
+        with self._lock:
+            self._pending.pop(url, None)
+            idle = not self._pending
+        if idle:
+            self.store.save()
+
+    def _download(self, url: str, revalidate: bool) -> str:
+        path = self.store.url_path(url)
+        headers = {}
+        if path is not None:
+            if not revalidate:
+                return path
+            headers = self.store.validators(url)
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and path is not None:
+            return path
+        if response.status_code != 200:
+            raise IOError("Avatar download error {0}: HTTP {1}".format(url, response.status_code))
+        return self.store.put(url, response.content, response.headers.get("ETag"),
+                              response.headers.get("Last-Modified"))
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+        self.session.close()
+        self.store.save()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark loading, updating one account and reordering all accounts
+with the settings.json and the sqlite account stores.
+
+Run with `python benchmarks/bench_account_store.py [num_accounts ...]`
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from accountstore import JsonAccountStore, migrate_json_to_sqlite, SqliteAccountStore  # noqa: E402
+from settingswriter import SettingsWriter  # noqa: E402
+
+
+def synthetic_settings(num_accounts: int) -> dict:
+    return {"steam_api_key": "", "users": {
+        "account{0}".format(i): {
+            "comment": "", "display_order": i + 1, "timestamp": "1600000000", "steam_skin": "default",
+            "steam_uid": str(76561197960265728 + i), "steam_name": "player{0}".format(i),
+            "steam_user": {"steamid": str(76561197960265728 + i), "personaname": "player{0}".format(i),
+                           "profileurl": "https://steamcommunity.com/profiles/{0}/".format(76561197960265728 + i),
+                           "avatarfull": "https://avatars.steamstatic.com/{0:040x}_full.jpg".format(i),
+                           "timecreated": 1300000000, "personastate": 0, "communityvisibilitystate": 3}}
+        for i in range(num_accounts)}}
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_json(directory: str, settings: dict) -> dict:
+    settings_file = os.path.join(directory, "settings.json")
+    with open(settings_file, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
+    loaded = {}
+
+    def load():
+        with open(settings_file, encoding="utf-8") as f:
+            loaded["settings"] = json.load(f)
+        loaded["writer"] = SettingsWriter(settings_file, lambda: loaded["settings"])
+        loaded["store"] = JsonAccountStore(loaded["settings"], loaded["writer"].mark_dirty)
+
+    def update():
+        loaded["store"]["account1"]["comment"] = "updated"
+        loaded["store"].save("account1")
+        loaded["writer"].flush()
+
+    def reorder():
+        loaded["store"].set_order(list(reversed(list(loaded["store"].keys()))))
+        loaded["writer"].flush()
+
+    return {"load": timed(load), "update": timed(update), "reorder": timed(reorder)}
+
+
+def bench_sqlite(directory: str, settings: dict) -> dict:
+    db_path = os.path.join(directory, "accounts.db")
+    migrate_json_to_sqlite(dict(settings), db_path).close()
+    loaded = {}
+
+    def load():
+        loaded["store"] = SqliteAccountStore(db_path)
+
+    def update():
+        loaded["store"]["account1"]["comment"] = "updated"
+        loaded["store"].save("account1")
+
+    def reorder():
+        loaded["store"].set_order(list(reversed(list(loaded["store"].keys()))))
+
+    r = {"load": timed(load), "update": timed(update), "reorder": timed(reorder)}
+    loaded["store"].close()
+    return r
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [1000, 10000]
+    print("{0:>8} {1:>7} {2:>10} {3:>10} {4:>10}".format("accounts", "store", "load ms", "update ms", "reorder ms"))
+    for num_accounts in sizes:
+        settings = synthetic_settings(num_accounts)
+        for name, bench in (("json", bench_json), ("sqlite", bench_sqlite)):
+            with tempfile.TemporaryDirectory() as directory:
+                r = bench(directory, settings)
+            print("{0:>8} {1:>7} {2[load]:>10.2f} {2[update]:>10.2f} {2[reorder]:>10.2f}".format(num_accounts,
+                                                                                                 name, r))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the avatar store: storing downloaded avatars with one manifest write compared to rewriting the
+metadata after every download, looking avatars up from the manifest compared to a stat per account, and gc.
+
+Run with `python benchmarks/bench_avatar_store.py [num_accounts]`
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from avatars import AvatarStore  # noqa: E402
+
+# Accounts share this many distinct images, like default and reused avatars
+DISTINCT_IMAGES = 0.8
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def account_urls(num_accounts: int) -> dict:
+    return {"account{0}".format(i): "https://avatars.example/{0:040x}_full.jpg".format(i) for i in range(num_accounts)}
+
+
+def image(i: int, num_accounts: int) -> bytes:
+    return "avatar {0}".format(i % max(1, int(num_accounts * DISTINCT_IMAGES))).encode() * 400
+
+
+def store_all(store: AvatarStore, urls: dict, save_each: bool):
+    for i, url in enumerate(urls.values()):
+        store.put(url, image(i, len(urls)), '"etag{0}"'.format(i))
+        if save_each:
+            store.save()
+    store.save()
+
+
+def stat_lookup(directory: str, urls: dict):
+    for url in urls.values():
+        os.path.isfile(os.path.join(directory, url.split("/")[-1]))
+
+
+def manifest_lookup(store: AvatarStore, urls: dict):
+    for login_name, url in urls.items():
+        store.lookup(login_name, url)
+
+
+if __name__ == "__main__":
+    num_accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    urls = account_urls(num_accounts)
+    with tempfile.TemporaryDirectory() as directory:
+        each_ms = timed(store_all, AvatarStore(os.path.join(directory, "each")), urls, True)
+        store = AvatarStore(os.path.join(directory, "once"))
+        once_ms = timed(store_all, store, urls, False)
+        print("{0} accounts, {1} images".format(num_accounts, len(store.files)))
+        print("store, manifest saved per download {0:>9.1f} ms".format(each_ms))
+        print("store, manifest saved once         {0:>9.1f} ms".format(once_ms))
+        print("lookup, stat per account           {0:>9.2f} ms".format(
+            timed(stat_lookup, os.path.join(directory, "once", "store"), urls)))
+        print("lookup, manifest                   {0:>9.2f} ms".format(timed(manifest_lookup, store, urls)))
+        print("load manifest                      {0:>9.2f} ms".format(
+            timed(AvatarStore, os.path.join(directory, "once"))))
+        # Half the accounts get a new avatar url, their old images become garbage
+        changed = dict(urls)
+        for login_name in list(changed)[::2]:
+            changed[login_name] = changed[login_name].replace("_full", "_new_full")
+        for url in list(changed.values())[::2]:
+            store.put(url, url.encode() * 100)
+        for label, budget_bytes in (("gc, under budget", None), ("gc, --gc-avatars", 0)):
+            start = time.perf_counter()
+            removed, freed = store.gc(changed, budget_bytes)
+            print("{0:<34} {1:>9.1f} ms, removed {2} images, {3:.1f} MiB".format(
+                label, (time.perf_counter() - start) * 1000, removed, freed / 2 ** 20))
+        print(store.stats())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End to end benchmark against a fake steam install and a local steam web api, see fakesteam.py.
+
+Reports startup, loginusers sync, refresh throughput (summaries and avatars), switch latency per phase,
+time until the fake steam logged in and with --gui the GUI load time, for each number of accounts.
+
+Run with `QT_QPA_PLATFORM=offscreen python benchmarks/bench_e2e.py [--accounts 10 100 1000 10000] [--gui]`
+"""
+import argparse
+import os
+import signal
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fakesteam import FakeSteam, FakeSteamServer, login_name  # noqa: E402
+from steamprocess import SWITCH_PHASES  # noqa: E402
+from steamswitcher import SteamSwitcher, build_parser  # noqa: E402
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    r = fn(*args)
+    return (time.perf_counter() - start) * 1000, r
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            raise TimeoutError("Fake steam didn't start")
+        time.sleep(0.01)
+
+
+def download_avatars(switcher):
+    for future in switcher.download_steam_avatars(switcher.users).values():
+        future.result()
+
+
+def bench_switcher(steam: FakeSteam, num_switches: int) -> dict:
+    r = {}
+    r["startup_ms"], switcher = timed(SteamSwitcher, build_parser().parse_args([]))
+    r["update_steamuids_ms"], _ = timed(switcher.update_steamuids)
+    r["summaries_ms"], _ = timed(switcher.get_steamapi_usersummary)
+    r["avatars_ms"], _ = timed(download_avatars, switcher)
+
+    switcher.start_steam()
+    wait_for(lambda: switcher.get_steam_pid() is not None)
+    results = []
+    logged_in = []
+    for i in range(num_switches):
+        watcher = switcher.watch_login(login_name((i + 1) % steam.num_accounts))
+        result = switcher.login_with(watcher.login_name)
+        if not result.ok:
+            raise Exception(str(result))
+        login_result = switcher.confirm_login(watcher, timeout=10)
+        if not login_result.ok:
+            raise Exception(str(login_result))
+        results.append(result)
+        logged_in.append(login_result.elapsed_ms)
+    r["switch_ms"] = statistics.median(result.total_ms for result in results)
+    r["logged_in_ms"] = statistics.median(logged_in)
+    r["phases_ms"] = {phase: statistics.median(result.timings.get(phase, 0) for result in results)
+                      for phase in SWITCH_PHASES}
+    switcher.kill_steam(getattr(signal, "SIGKILL", signal.SIGTERM))
+    switcher.settings_flush()
+    switcher.parse_cache.save()
+    switcher.avatar_downloader.shutdown()
+    return r
+
+
+def bench_gui(app) -> dict:
+    import gui
+    from PySide2.QtCore import QThreadPool
+    sys.argv = [sys.argv[0], "--gui"]
+    start = time.perf_counter()
+    window = gui.SteamAccountSwitcherGui()
+    constructed_ms = (time.perf_counter() - start) * 1000
+    deadline = time.monotonic() + 30
+    while not hasattr(window, "first_paint_ms") and time.monotonic() < deadline:
+        app.processEvents()
+    r = {"gui_construct_ms": constructed_ms, "gui_first_paint_ms": getattr(window, "first_paint_ms", float("nan"))}
+    # Let the avatar downloads and thumbnails finish before the directory is removed
+    if window.switcher.avatar_downloader is not None:
+        window.switcher.avatar_downloader.shutdown()
+    QThreadPool.globalInstance().waitForDone()
+    app.processEvents()
+    window.stop_file_sync()
+    window.stop_control_server()
+    window.stop_summary_refresh()
+    window.stop_tasks()
+    window.switcher.settings_flush()
+    window.switcher.parse_cache.save()
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return r
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--accounts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    arg_parser.add_argument("--switches", type=int, default=3)
+    arg_parser.add_argument("--gui", action="store_true", help="Also measure the GUI load time (needs PySide2)")
+    args = arg_parser.parse_args()
+
+    app = None
+    if args.gui:
+        from PySide2.QtWidgets import QApplication
+        os.chdir(REPO_DIR)  # gui loads its translations from ./locales on import
+        import gui  # noqa: F401
+        app = QApplication(sys.argv[:1])
+
+    rows = []
+    with FakeSteamServer() as server:
+        for num_accounts in args.accounts:
+            with tempfile.TemporaryDirectory() as directory, FakeSteam(directory, num_accounts, server.url) as steam:
+                r = bench_switcher(steam, args.switches)
+                if app is not None:
+                    r.update(bench_gui(app))
+            rows.append((num_accounts, r))
+            print("{0} accounts done".format(num_accounts), file=sys.stderr)
+
+    print("{0:>8} {1:>10} {2:>10} {3:>14} {4:>14} {5:>10} {6:>10}{7}".format(
+        "accounts", "startup", "loginusers", "summaries/s", "avatars/s", "switch", "logged in",
+        "  {0:>10} {1:>11}".format("gui", "first paint") if app else ""))
+    for num_accounts, r in rows:
+        print("{0:>8} {1:>7.1f} ms {2:>7.1f} ms {3:>14.0f} {4:>14.0f} {5:>7.0f} ms {6:>7.0f} ms{7}".format(
+            num_accounts, r["startup_ms"], r["update_steamuids_ms"], num_accounts / r["summaries_ms"] * 1000,
+            num_accounts / r["avatars_ms"] * 1000, r["switch_ms"], r["logged_in_ms"],
+            "  {0:>7.0f} ms {1:>8.0f} ms".format(r["gui_construct_ms"], r["gui_first_paint_ms"]) if app else ""))
+    print("switch phases (median ms): " + ", ".join(
+        "{0} {1:.0f}".format(phase, ms) for phase, ms in rows[-1][1]["phases_ms"].items()))
+    print("fake api: {0} summary requests, {1} avatar requests".format(server.summary_requests,
+                                                                      server.avatar_requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the games index on a synthetic steam library: a full scan in this process and in a process pool, an
+update when nothing changed, an update after a few files changed, loading the saved index and --who-has queries.
+
+Run with `python benchmarks/bench_games_index.py [num_games] [num_accounts] [games_per_account]`
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gamesindex import GamesIndex, library_dirs  # noqa: E402
+import steamid  # noqa: E402
+
+FIRST_ACCOUNT_ID = 1000
+
+
+def manifest(appid: int, owner: str) -> str:
+    return ('"AppState"\n{{\n\t"appid"\t\t"{0}"\n\t"Universe"\t\t"1"\n\t"name"\t\t"Game {0}"\n'
+            '\t"StateFlags"\t\t"4"\n\t"installdir"\t\t"game{0}"\n\t"SizeOnDisk"\t\t"{1}"\n'
+            '\t"LastOwner"\t\t"{2}"\n\t"InstalledDepots"\n\t{{\n\t\t"{3}"\n\t\t{{\n\t\t\t"manifest"\t\t"{4}"\n'
+            '\t\t\t"size"\t\t"{1}"\n\t\t}}\n\t}}\n}}\n').format(appid, appid * 1000, owner, appid + 1, appid * 7)
+
+
+def localconfig(appids: list) -> str:
+    lines = ['"UserLocalConfigStore"', "{", '\t"friends"', "\t{", '\t\t"PersonaName"\t\t"player"', "\t}",
+             '\t"Software"', "\t{", '\t\t"Valve"', "\t\t{", '\t\t\t"Steam"', "\t\t\t{", '\t\t\t\t"apps"', "\t\t\t\t{"]
+    for appid in appids:
+        lines += ['\t\t\t\t\t"{0}"'.format(appid), "\t\t\t\t\t{",
+                  '\t\t\t\t\t\t"LastPlayed"\t\t"{0}"'.format(1600000000 + appid),
+                  '\t\t\t\t\t\t"Playtime"\t\t"{0}"'.format(appid % 5000), "\t\t\t\t\t}"]
+    lines += ["\t\t\t\t}", "\t\t\t}", "\t\t}", "\t}", "}"]
+    return "\n".join(lines) + "\n"
+
+
+def build_library(root: str, num_games: int, num_accounts: int, games_per_account: int):
+    rng = random.Random(1)
+    steamapps = os.path.join(root, "steamapps")
+    os.makedirs(steamapps)
+    for appid in range(10, (num_games + 1) * 10, 10):
+        owner = steamid.account_id_to_steamid64(FIRST_ACCOUNT_ID + rng.randrange(num_accounts))
+        with open(os.path.join(steamapps, "appmanifest_{0}.acf".format(appid)), "w", encoding="utf-8") as f:
+            f.write(manifest(appid, owner))
+    for account_id in range(FIRST_ACCOUNT_ID, FIRST_ACCOUNT_ID + num_accounts):
+        appids = sorted(rng.sample(range(10, (num_games + 1) * 10, 10), min(games_per_account, num_games)))
+        config_dir = os.path.join(root, "userdata", str(account_id), "config")
+        os.makedirs(config_dir)
+        with open(os.path.join(config_dir, "localconfig.vdf"), "w", encoding="utf-8") as f:
+            f.write(localconfig(appids))
+        for appid in appids[:5]:
+            os.makedirs(os.path.join(root, "userdata", str(account_id), str(appid)))
+
+
+def timed(fn, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000, result
+
+
+if __name__ == "__main__":
+    num_games = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    num_accounts = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    games_per_account = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, "Steam")
+        build_library(root, num_games, num_accounts, games_per_account)
+        steamapps_dirs = library_dirs(root)
+        userdata_dir = os.path.join(root, "userdata")
+        print("{0} games, {1} accounts with {2} games each, {3} cpus".format(
+            num_games, num_accounts, games_per_account, os.cpu_count()))
+
+        elapsed, read = timed(GamesIndex().update, steamapps_dirs, userdata_dir, processes=1)
+        print("full scan, one process        {0:>9.1f} ms, {1} files".format(elapsed, read))
+        processes = max(2, os.cpu_count() or 1)
+        index_file = os.path.join(directory, "games_index.json")
+        index = GamesIndex(index_file)
+        elapsed, read = timed(index.update, steamapps_dirs, userdata_dir, processes=processes)
+        print("full scan, {0} processes      {1:>9.1f} ms, {2} files".format(processes, elapsed, read))
+        elapsed, read = timed(index.update, steamapps_dirs, userdata_dir)
+        print("update, nothing changed       {0:>9.1f} ms, {1} files".format(elapsed, read))
+        for account_id in range(FIRST_ACCOUNT_ID, FIRST_ACCOUNT_ID + max(1, num_accounts // 100)):
+            path = os.path.join(userdata_dir, str(account_id), "config", "localconfig.vdf")
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 1000000000))
+        for appid in range(10, max(2, num_games // 100) * 10, 10):
+            os.unlink(os.path.join(root, "steamapps", "appmanifest_{0}.acf".format(appid)))
+        elapsed, read = timed(index.update, steamapps_dirs, userdata_dir)
+        print("update, 1% changed            {0:>9.1f} ms, {1} files".format(elapsed, read))
+        elapsed, loaded = timed(GamesIndex, index_file)
+        print("load saved index              {0:>9.1f} ms, {1:.1f} MiB".format(
+            elapsed, os.path.getsize(index_file) / 2 ** 20))
+        assert loaded.apps == index.apps
+        queries = [str(appid) for appid in range(10, (num_games + 1) * 10, 10)][:1000]
+        elapsed, _ = timed(lambda: [index.who_has(appid) for appid in queries])
+        print("who has appid                 {0:>9.3f} ms per query".format(elapsed / len(queries)))
+        elapsed, found = timed(index.find_apps, "game 12")
+        print("find game by name             {0:>9.3f} ms, {1} games".format(elapsed, len(found)))
+        print(index.stats())
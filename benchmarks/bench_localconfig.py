@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark reading a synthetic multi-MB userdata/<id>/config/localconfig.vdf: the whole tree compared to the
+friends and apps subtrees localconfig.read extracts, the persona name alone, and cached reads per account.
+
+Run with `python benchmarks/bench_localconfig.py [num_apps]`
+"""
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from bench_vdf import block, value  # noqa: E402
+import localconfig  # noqa: E402
+from parsecache import ParseCache  # noqa: E402
+import vdf  # noqa: E402
+
+
+def synthetic_localconfig(num_apps: int) -> str:
+    """
+    Friends first, then large blocks nothing reads, like steam's chat, broadcast and web storage state
+    """
+    friends = [value("PersonaName", "player", 2)]
+    for i in range(num_apps // 4):
+        friends += block(str(10000 + i), [value("name", "friend {0}".format(i), 3),
+                                          value("avatar", "{0:040x}".format(i), 3),
+                                          *block("NameHistory", [value("0", "old name {0}".format(i), 4)], 3)], 2)
+    web_storage = [value("key{0}".format(i), "x" * 200, 2) for i in range(num_apps)]
+    apps = []
+    for appid in range(num_apps):
+        apps += block(str(appid * 10), [value("LastPlayed", str(1600000000 + appid), 6),
+                                        value("Playtime", str(appid), 6), value("LaunchOptions", "-novid", 6),
+                                        *block("cloud", [value("last_sync_state", "synchronized", 7),
+                                                         value("quota_bytes", "1000000000", 7)], 6)], 5)
+    other = []
+    for i in range(num_apps // 2):
+        other += block("shader{0}".format(i), [value("hash", "{0:064x}".format(i), 5)], 4)
+    steam = block("Software", block("Valve", block("Steam", block("ShaderCacheManager", other, 4) +
+                                                   block("apps", apps, 4), 3), 2), 1)
+    tree = block("UserLocalConfigStore", block("friends", friends, 1) + block("WebStorage", web_storage, 1) +
+                 steam, 0)
+    return "\n".join(tree) + "\n"
+
+
+def timed(fn, *args, runs: int = 3) -> float:
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    num_apps = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "localconfig.vdf")
+        with open(path, "w", encoding="utf-8") as config_file:
+            config_file.write(synthetic_localconfig(num_apps))
+        config = localconfig.read(path)
+        assert config["persona_name"] == "player" and len(config["apps"]) == num_apps
+        print("localconfig.vdf {0:.1f} MiB, {1} apps, {2} friends".format(
+            os.path.getsize(path) / 2 ** 20, len(config["apps"]), len(config["friends"])))
+        print("whole tree                {0:>9.1f} ms".format(timed(vdf.load, path, "UserLocalConfigStore")))
+        print("friends and apps          {0:>9.1f} ms".format(timed(localconfig.read, path)))
+        print("persona name only         {0:>9.2f} ms".format(timed(localconfig.read_persona_name, path)))
+        cache = ParseCache()
+        print("first read, cached        {0:>9.1f} ms".format(timed(cache.get, path, localconfig.read, runs=1)))
+        print("cached read               {0:>9.3f} ms".format(timed(cache.get, path, localconfig.read)))
+        os.utime(path)
+        print("read after the file changed {0:>7.1f} ms".format(timed(cache.get, path, localconfig.read, runs=1)))
+        print(cache.stats())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the account search: keystroke to results latency while typing queries into the filter box and the
+tray quick switch, and the cost of keeping the index up to date.
+
+Run with `python benchmarks/bench_search.py [--accounts 1000 10000] [--gui]`, --gui also times filtering the
+account list model (needs PySide2, use QT_QPA_PLATFORM=offscreen without a display).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from accountstore import JsonAccountStore  # noqa: E402
+from searchindex import SearchIndex  # noqa: E402
+
+FRAME_MS = 1000 / 60
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "smurf", "main", "trade", "alt"]
+COMMENTS = ["", "", "csgo smurf", "trading bot", "main account", "family share"]
+QUERIES = ["account42", "acc 99", "bravo del", "delta bravo", "smurf", "csgo", "7656119796026", "acnt12", "zzz",
+           "tradingb", "main"]
+
+
+def synthetic_users(num_accounts: int) -> JsonAccountStore:
+    rng = random.Random(1)
+    settings = {"users": {"account{0}".format(i): {
+        "display_order": i,
+        "steam_name": "{0} {1}".format(rng.choice(WORDS), rng.choice(WORDS)).title(),
+        "comment": rng.choice(COMMENTS),
+        "steam_uid": str(76561197960265728 + i)} for i in range(num_accounts)}}
+    return JsonAccountStore(settings, lambda: None)
+
+
+def type_query(search, query: str) -> list:
+    """
+    Milliseconds for each keystroke of typing query
+    """
+    timings = []
+    search("")
+    for i in range(1, len(query) + 1):
+        start = time.perf_counter()
+        search(query[:i])
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentiles(timings: list) -> str:
+    timings = sorted(timings)
+    return "median {0:5.2f} ms  p95 {1:5.2f} ms  max {2:5.2f} ms".format(
+        statistics.median(timings), timings[int(len(timings) * 0.95)], timings[-1])
+
+
+def bench_index(num_accounts: int):
+    users = synthetic_users(num_accounts)
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.sync(users)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    users["account7"]["comment"] = "edited"
+    users.save("account7")
+    start = time.perf_counter()
+    index.sync(users)
+    sync_ms = (time.perf_counter() - start) * 1000
+
+    filter_timings, quick_timings = [], []
+    for query in QUERIES:
+        filter_timings += type_query(lambda text: index.search(text, ranked=False), query)
+        quick_timings += type_query(lambda text: index.search(text, limit=20), query)
+    start = time.perf_counter()
+    found = index.search("bravo", limit=20)
+    find_ms = (time.perf_counter() - start) * 1000
+    print("{0:>6} accounts  build {1:6.1f} ms  sync after an edit {2:5.1f} ms  --find {3:5.2f} ms ({4})".format(
+        num_accounts, build_ms, sync_ms, find_ms, found[0] if found else "-"))
+    for name, timings in (("filter box", filter_timings), ("quick switch", quick_timings)):
+        print("        {0:<13} {1}  {2}".format(name, percentiles(timings),
+                                                  "ok" if max(timings) < FRAME_MS else "over a frame"))
+    return users, index
+
+
+def bench_gui(users, index):
+    from PySide2.QtWidgets import QApplication, QListView
+
+    os.chdir(REPO_DIR)  # gui loads its translations from ./locales on import
+    from gui.account_model import AccountListModel, LAYOUT_BATCH_SIZE
+
+    class Switcher:
+        settings = {"display_size": "small", "show_avatars": False}
+
+    switcher = Switcher()
+    switcher.users = users
+    app = QApplication.instance() or QApplication(sys.argv)
+    model = AccountListModel(switcher, None)
+    view = QListView()
+    view.setUniformItemSizes(True)
+    view.setLayoutMode(QListView.Batched)
+    view.setBatchSize(LAYOUT_BATCH_SIZE)
+    view.setModel(model)
+    view.resize(300, 600)
+    view.show()
+    model.reload()
+    app.processEvents()
+
+    def search(text):
+        model.set_filter(index.search(text, ranked=False) if text else None)
+        app.processEvents()
+
+    timings = []
+    for query in QUERIES:
+        timings += type_query(search, query)
+    print("        {0:<13} {1}  {2}".format("filter + view", percentiles(timings),
+                                              "ok" if max(timings) < FRAME_MS else "over a frame"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--gui", action="store_true")
+    args = parser.parse_args()
+    print("keystroke latency while typing {0} queries, a frame is {1:.1f} ms".format(len(QUERIES), FRAME_MS))
+    for num_accounts in args.accounts:
+        users, index = bench_index(num_accounts)
+        if args.gui:
+            bench_gui(users, index)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup benchmark of the command line, `steamswitcher.py --list` in a throwaway steam and settings directory.
+
+Reports the wall-clock time and the slowest imports from `python -X importtime`,
+and fails if a heavy module is imported or startup is much slower than startup_baseline.json.
+
+Run with `python benchmarks/bench_startup.py [--runs N] [--update-baseline]`
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+BASELINE_FILE = os.path.join(BENCHMARKS_DIR, "startup_baseline.json")
+
+# Modules the --list command must never import
+FORBIDDEN_MODULES = ("PySide2", "PyQt5", "requests", "PyVDF", "urllib3", "sqlite3")
+
+
+def setup_environment(directory: str) -> dict:
+    home = os.path.join(directory, "home")
+    os.makedirs(os.path.join(home, ".steam"))
+    os.makedirs(os.path.join(home, ".local/share/Steam/skins"))
+    os.makedirs(os.path.join(directory, "switcher"))
+    users = {"account{0}".format(i): {"display_order": i + 1, "steam_uid": str(76561197960265728 + i)}
+             for i in range(100)}
+    with open(os.path.join(directory, "switcher", "settings.json"), "w", encoding="utf-8") as settings_file:
+        json.dump({"steam_api_key": "", "behavior_after_login": "nothing", "users": users}, settings_file)
+    env = dict(os.environ)
+    env["HOME"] = home
+    return env
+
+
+def run_list(directory: str, env: dict, importtime=False) -> tuple:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + \
+              [os.path.join(REPO_DIR, "steamswitcher.py"), "--list"]
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=os.path.join(directory, "switcher"), env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return (time.perf_counter() - start) * 1000, result.stderr
+
+
+def run_python(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    {module: cumulative microseconds}, nested imports are counted in the module importing them
+    """
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.setdefault(name.strip(), 0)
+        if not name.startswith("  ") and name.strip() != "site":  # site is interpreter startup, not ours
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--runs", type=int, default=10)
+    arg_parser.add_argument("--max-slowdown", type=float, default=1.5,
+                            help="Fail when the overhead is this many times the baseline")
+    arg_parser.add_argument("--slack", type=float, default=20, help="Milliseconds allowed over the baseline")
+    arg_parser.add_argument("--update-baseline", action="store_true")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = setup_environment(directory)
+        _, stderr = run_list(directory, env, importtime=True)
+        wall_times = [run_list(directory, env)[0] for _ in range(args.runs)]
+        python_times = [run_python(env) for _ in range(args.runs)]
+
+    imports = parse_importtime(stderr)
+    median = statistics.median(wall_times)
+    # Compare the time spent on top of the interpreter startup, it is less machine dependent
+    overhead = median - statistics.median(python_times)
+    print("--list wall-clock median {0:.1f} ms, min {1:.1f} ms ({2} runs)".format(median, min(wall_times), args.runs))
+    print("--list over interpreter startup {0:.1f} ms".format(overhead))
+    print("slowest imports:")
+    for name, cumulative in sorted(imports.items(), key=lambda i: i[1], reverse=True)[:8]:
+        print("  {0:>8.1f} ms  {1}".format(cumulative / 1000, name))
+
+    failed = False
+    forbidden = [name for name in imports if name.split(".")[0] in FORBIDDEN_MODULES]
+    if forbidden:
+        print("FAIL: --list imported {0}".format(", ".join(sorted(set(forbidden)))))
+        failed = True
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as baseline_file:
+            json.dump({"list_overhead_ms": round(overhead, 1)}, baseline_file, indent=2)
+            baseline_file.write("\n")
+        print("Baseline updated")
+    elif os.path.isfile(BASELINE_FILE):
+        with open(BASELINE_FILE, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["list_overhead_ms"]
+        print("baseline {0:.1f} ms".format(baseline))
+        if overhead > baseline * args.max_slowdown + args.slack:
+            print("FAIL: startup is more than {0}x slower than the baseline".format(args.max_slowdown))
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark opening the tray "Login with" menu.
+
+Run with `QT_QPA_PLATFORM=offscreen python benchmarks/bench_tray_menu.py [num_accounts]`
+"""
+import os
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.chdir(REPO_DIR)  # gui loads its translations from ./locales on import
+
+from PySide2.QtWidgets import QApplication, QWidget  # noqa: E402
+
+from accountstore import JsonAccountStore  # noqa: E402
+from gui.avatar_cache import AvatarPixmapCache  # noqa: E402
+from gui.systemtray import SystemTray  # noqa: E402
+from steamswitcher import SteamSwitcher  # noqa: E402
+
+
+class TrayHost(QWidget, SystemTray):
+    def __init__(self, switcher, avatar_cache):
+        QWidget.__init__(self)
+        self.switcher = switcher
+        self.avatar_cache = avatar_cache
+        self.systemtray(self)
+
+    def steam_login(self, login_name, ignore_after_login_behavior=False):
+        pass
+
+    def exit_app(self):
+        pass
+
+
+def synthetic_switcher(num_accounts: int, directory: str) -> SteamSwitcher:
+    switcher = SteamSwitcher.__new__(SteamSwitcher)
+    switcher.changer_path = directory
+    switcher.default_avatar = os.path.join(REPO_DIR, "avatars", "avatar.png")
+    switcher.settings = {"show_avatars": True, "users": {
+        "account{0}".format(i): {"display_order": i, "steam_name": "player{0}".format(i),
+                                 "steam_user": {"avatarfull": "https://avatars/{0:040x}_full.jpg".format(i)}}
+        for i in range(num_accounts)}}
+    switcher.users = JsonAccountStore(switcher.settings, lambda: None)
+    return switcher
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    num_accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        switcher = synthetic_switcher(num_accounts, directory)
+        tray = TrayHost(switcher, AvatarPixmapCache(os.path.join(directory, "thumbnails")))
+
+        print("first open             {0:>8.2f} ms".format(timed(tray.populate_login_menu)))
+        runs = 100
+        print("open, nothing changed  {0:>8.3f} ms".format(
+            sum(timed(tray.populate_login_menu) for _ in range(runs)) / runs))
+        changed = []
+        for i in range(10):
+            switcher.users.save("account0")
+            changed.append(timed(tray.populate_login_menu))
+        print("open after a change    {0:>8.2f} ms".format(sum(changed) / len(changed)))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark merging GetPlayerSummaries results into the accounts with the uid index,
+compared to the old scan-every-account lookup.
+
+Run with `python benchmarks/bench_uid_index.py [num_accounts]`
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from accountstore import JsonAccountStore  # noqa: E402
+from steamswitcher import SteamSwitcher  # noqa: E402
+
+
+def synthetic_switcher(num_accounts: int) -> SteamSwitcher:
+    switcher = SteamSwitcher.__new__(SteamSwitcher)
+    switcher.settings = {"users": {
+        "account{0}".format(i): {"display_order": i, "steam_uid": str(76561197960265728 + i), "steam_user": {}}
+        for i in range(num_accounts)
+    }}
+    switcher.users = JsonAccountStore(switcher.settings, lambda: None)
+    switcher.build_uid_index()
+    return switcher
+
+
+def synthetic_players(num_accounts: int) -> list:
+    return [{"steamid": str(76561197960265728 + i), "personaname": "player{0}".format(i)}
+            for i in range(num_accounts)]
+
+
+def merge_scan(switcher: SteamSwitcher, players: list):
+    for steam_user in players:
+        login_name, user = [(login_name, user) for (login_name, user) in switcher.settings["users"].items() if
+                            user.get("steam_uid") == steam_user["steamid"]][0]
+        user["steam_user"] = steam_user
+        user["steam_name"] = steam_user.get("personaname")
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    num_accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    players = synthetic_players(num_accounts)
+
+    switcher = synthetic_switcher(num_accounts)
+    print("build index   {0:>6} accounts {1:>10.2f} ms".format(num_accounts, timed(switcher.build_uid_index)))
+    print("indexed merge {0:>6} accounts {1:>10.2f} ms".format(num_accounts,
+                                                                timed(switcher.merge_usersummaries, players)))
+
+    # The scan is quadratic, keep it to a size that finishes
+    scan_accounts = min(num_accounts, 2000)
+    print("scan merge    {0:>6} accounts {1:>10.2f} ms".format(scan_accounts,
+                                                                timed(merge_scan, synthetic_switcher(scan_accounts),
+                                                                      synthetic_players(scan_accounts))))
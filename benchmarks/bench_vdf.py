@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the built-in vdf reader and patcher against PyVDF on large synthetic
+registry.vdf and localconfig.vdf files, and check that patching round-trips losslessly.
+
+Run with `python benchmarks/bench_vdf.py [num_apps]`, PyVDF is optional.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vdf  # noqa: E402
+
+try:
+    from PyVDF import PyVDF
+except ImportError:
+    PyVDF = None
+
+
+def block(key: str, lines: list, depth: int) -> list:
+    indent = "\t" * depth
+    return ['{0}"{1}"'.format(indent, key), indent + "{"] + lines + [indent + "}"]
+
+
+def value(key: str, val: str, depth: int) -> str:
+    return '{0}"{1}"\t\t"{2}"'.format("\t" * depth, key, val)
+
+
+def synthetic_registry(num_apps: int) -> str:
+    apps = []
+    for appid in range(num_apps):
+        apps += block(str(appid), [value("installed", "1", 7), value("Running", "0", 7),
+                                   value("Updating", "0", 7), value("name", "Game {0}".format(appid), 7)], 6)
+    steam = block("apps", apps, 5) + [value("AutoLoginUser", "account1", 5), value("SkinV5", "", 5),
+                                      value("language", "english", 5)]
+    tree = block("Registry", block("HKCU", block("Software", block("Valve", block("Steam", steam, 4), 3), 2), 1), 0)
+    return "\n".join(tree) + "\n"
+
+
+def synthetic_localconfig(num_apps: int) -> str:
+    friends = []
+    for i in range(num_apps):
+        friends += block(str(10000 + i), [value("name", "friend {0}".format(i), 3),
+                                          value("avatar", "{0:040x}".format(i), 3)], 2)
+    apps = []
+    for appid in range(num_apps):
+        apps += block(str(appid), [value("LastPlayed", "1600000000", 6), value("Playtime", str(appid), 6),
+                                   value("cloud", "1", 6), value("LaunchOptions", "-novid -high", 6)], 5)
+    steam = block("Software", block("Valve", block("Steam", block("apps", apps, 4), 3), 2), 1)
+    tree = block("UserLocalConfigStore", block("friends", friends + [value("PersonaName", "player", 2)], 1) + steam, 0)
+    return "\n".join(tree) + "\n"
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def report(name: str, size: int, builtin: float, pyvdf: float = None):
+    print("{0:<28} {1:>8.1f} KiB {2:>10.2f} ms {3:>12}".format(
+        name, size / 1024, builtin, "{0:.2f} ms".format(pyvdf) if pyvdf is not None else "-"))
+
+
+def pyvdf_autologin(path: str):
+    registry = PyVDF(infile=path)
+    registry.edit("Registry.HKCU.Software.Valve.Steam.AutoLoginUser", "account2")
+    registry.edit("Registry.HKCU.Software.Valve.Steam.SkinV5", "Metro")
+    registry.write_file(path)
+
+
+def pyvdf_persona(path: str):
+    return PyVDF(infile=path).getData()["UserLocalConfigStore"]["friends"]["PersonaName"]
+
+
+if __name__ == "__main__":
+    num_apps = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    autologin = {"Registry.HKCU.Software.Valve.Steam.AutoLoginUser": "account2",
+                 "Registry.HKCU.Software.Valve.Steam.SkinV5": "Metro"}
+
+    with tempfile.TemporaryDirectory() as directory:
+        registry_path = os.path.join(directory, "registry.vdf")
+        localconfig_path = os.path.join(directory, "localconfig.vdf")
+        registry = synthetic_registry(num_apps).encode("utf-8")
+        with open(localconfig_path, "w", encoding="utf-8") as f:
+            f.write(synthetic_localconfig(num_apps))
+
+        # Round trip, unchanged values and patching back must give back the same bytes
+        assert vdf.patch_data(registry, {"Registry.HKCU.Software.Valve.Steam.AutoLoginUser": "account1"}) == registry
+        patched = vdf.patch_data(registry, autologin)
+        assert vdf.patch_data(patched, {"Registry.HKCU.Software.Valve.Steam.AutoLoginUser": "account1",
+                                        "Registry.HKCU.Software.Valve.Steam.SkinV5": ""}) == registry
+        print("round trip ok")
+
+        print("{0:<28} {1:>12} {2:>13} {3:>12}".format("", "file", "vdf", "PyVDF"))
+        with open(registry_path, "wb") as f:
+            f.write(registry)
+        builtin = timed(vdf.patch, registry_path, autologin)
+        with open(registry_path, "wb") as f:
+            f.write(registry)
+        report("set AutoLoginUser, SkinV5", len(registry), builtin,
+               timed(pyvdf_autologin, registry_path) if PyVDF else None)
+
+        size = os.path.getsize(localconfig_path)
+        report("read friends.PersonaName", size,
+               timed(vdf.extract, localconfig_path, ["UserLocalConfigStore.friends.PersonaName"]),
+               timed(pyvdf_persona, localconfig_path) if PyVDF else None)
+        report("read whole localconfig", size, timed(vdf.load, localconfig_path, "UserLocalConfigStore"),
+               timed(lambda: PyVDF(infile=localconfig_path)) if PyVDF else None)
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Fake steam install and steam web api for the end to end benchmarks.
+
+FakeSteam builds ~/.steam and ~/.local/share/Steam with registry.vdf, loginusers.vdf and skins in a
+throwaway home, plus a steam-runtime stub that writes steam.pid and exits on SIGTERM like steam does.
+FakeSteamServer answers GetPlayerSummaries and serves avatar images.
+"""
+import json
+import os
+import shutil
+import struct
+import sys
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_UID = 76561197960265728
+
+STEAM_RUNTIME_STUB = '''#!{python}
+# Stand-in for steam-runtime: writes steam.pid, logs on to AutoLoginUser after FAKE_STEAM_LOGIN_DELAY seconds,
+# on SIGTERM waits FAKE_STEAM_EXIT_DELAY seconds, writes back the registry.vdf it started with like steam
+# does on shutdown and exits
+import os
+import re
+import signal
+import sys
+import time
+
+steam_dir = os.path.join(os.path.expanduser("~"), ".steam")
+steam_linux_dir = os.path.join(os.path.expanduser("~"), ".local", "share", "Steam")
+registry_path = os.path.join(steam_dir, "registry.vdf")
+with open(registry_path, "rb") as registry_file:
+    registry = registry_file.read()
+
+
+def log_on():
+    autologin = re.search(rb'"AutoLoginUser"\\s+"([^"]*)"', registry).group(1)
+    with open(os.path.join(steam_linux_dir, "config", "loginusers.vdf"), "rb") as loginusers_file:
+        loginusers = loginusers_file.read()
+    for uid, account_name in re.findall(rb'"(\\d{{17}})"\\s*{{[^}}]*?"AccountName"\\s+"([^"]*)"', loginusers):
+        if account_name == autologin:
+            os.makedirs(os.path.join(steam_linux_dir, "logs"), exist_ok=True)
+            with open(os.path.join(steam_linux_dir, "logs", "connection_log.txt"), "a") as log_file:
+                log_file.write("[{{0}}] [U:1:{{1}}] Logged On\\n".format(time.strftime("%Y-%m-%d %H:%M:%S"),
+                                                                int(uid) - {first_uid}))
+
+
+def terminate(signum, frame):
+    time.sleep(float(os.environ.get("FAKE_STEAM_EXIT_DELAY", "0.2")))
+    with open(registry_path, "wb") as registry_file:
+        registry_file.write(registry)
+    sys.exit(0)
+
+
+signal.signal(signal.SIGTERM, terminate)
+time.sleep(float(os.environ.get("FAKE_STEAM_START_DELAY", "0.05")))
+with open(os.path.join(steam_dir, "steam.pid"), "w") as pid_file:
+    pid_file.write(str(os.getpid()))
+time.sleep(float(os.environ.get("FAKE_STEAM_LOGIN_DELAY", "0.1")))
+log_on()
+while True:
+    time.sleep(1)
+'''
+
+
+def login_name(i: int) -> str:
+    return "account{0}".format(i)
+
+
+def steam_uid(i: int) -> str:
+    return str(FIRST_UID + i)
+
+
+def avatar_png() -> bytes:
+    """
+    A valid 1x1 png
+    """
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)) +
+            chunk(b"IDAT", zlib.compress(b"\x00\x66\x99\xcc")) + chunk(b"IEND", b""))
+
+
+class FakeSteamServer:
+    """
+    Local stand-in for api.steampowered.com and the avatar cdn, use as a context manager
+    """
+    def __init__(self):
+        self.summary_requests = 0
+        self.avatar_requests = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self.png = avatar_png()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = "http://127.0.0.1:{0}".format(self.server.server_address[1])
+        self._thread = None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for header in headers:
+                    self.send_header(*header)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/ISteamUser/GetPlayerSummaries/v0002":
+                    with fake._lock:
+                        fake.summary_requests += 1
+                    uids = [uid for uid in parse_qs(url.query).get("steamids", [""])[0].split(",") if uid]
+                    if len(uids) > 100:
+                        return self.send(400)
+                    players = [{"steamid": uid, "personaname": "player{0}".format(int(uid) - FIRST_UID),
+                                "avatarfull": "{0}/avatars/{1:040x}_full.jpg".format(fake.url, int(uid))}
+                               for uid in uids]
+                    return self.send(200, json.dumps({"response": {"players": players}}).encode(),
+                                     [("Content-Type", "application/json")])
+                if url.path.startswith("/avatars/"):
+                    etag = '"{0}"'.format(url.path.rsplit("/", 1)[-1].split("_")[0])
+                    with fake._lock:
+                        fake.avatar_requests += 1
+                        if self.headers.get("If-None-Match") == etag:
+                            fake.not_modified += 1
+                            return self.send(304, headers=[("ETag", etag)])
+                    return self.send(200, fake.png, [("Content-Type", "image/png"), ("ETag", etag)])
+                self.send(404)
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeSteam:
+    """
+    Steam install for num_accounts accounts under directory.
+
+    home is used as HOME, switcher_dir is the working directory with settings.json.
+    """
+    def __init__(self, directory: str, num_accounts: int, api_url: str = None):
+        self.directory = directory
+        self.num_accounts = num_accounts
+        self.home = os.path.join(directory, "home")
+        self.steam_dir = os.path.join(self.home, ".steam")
+        self.steam_linux_dir = os.path.join(self.home, ".local", "share", "Steam")
+        self.switcher_dir = os.path.join(directory, "switcher")
+        self.steam_runtime = os.path.join(directory, "bin", "steam-runtime")
+        self.api_url = api_url
+        self._saved_home = None
+        self._saved_cwd = None
+        self.build()
+
+    def build(self):
+        for path in (self.steam_dir, os.path.join(self.steam_linux_dir, "config"),
+                     os.path.join(self.steam_linux_dir, "logs"), self.switcher_dir,
+                     os.path.dirname(self.steam_runtime), os.path.join(self.switcher_dir, "avatars")):
+            os.makedirs(path, exist_ok=True)
+        for skin in ("Metro", "Air", "Pixelvision"):
+            os.makedirs(os.path.join(self.steam_linux_dir, "skins", skin), exist_ok=True)
+
+        steam = ['"AutoLoginUser"\t\t"{0}"'.format(login_name(0)), '"SkinV5"\t\t""', '"language"\t\t"english"']
+        for key in ("Steam", "Valve", "Software", "HKCU", "Registry"):
+            steam = ['"{0}"'.format(key), "{"] + ["\t" + line for line in steam] + ["}"]
+        with open(os.path.join(self.steam_dir, "registry.vdf"), "w", encoding="utf-8") as registry_file:
+            registry_file.write("\n".join(steam) + "\n")
+
+        lines = ['"users"', "{"]
+        for i in range(self.num_accounts):
+            lines += ['\t"{0}"'.format(steam_uid(i)), "\t{", '\t\t"AccountName"\t\t"{0}"'.format(login_name(i)),
+                      '\t\t"PersonaName"\t\t"player{0}"'.format(i), '\t\t"RememberPassword"\t\t"1"',
+                      '\t\t"MostRecent"\t\t"{0}"'.format(int(i == 0)), '\t\t"Timestamp"\t\t"1600000000"', "\t}"]
+        lines.append("}")
+        with open(os.path.join(self.steam_linux_dir, "config", "loginusers.vdf"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+        with open(self.steam_runtime, "w", encoding="utf-8") as stub_file:
+            stub_file.write(STEAM_RUNTIME_STUB.format(python=sys.executable, first_uid=FIRST_UID))
+        os.chmod(self.steam_runtime, 0o755)
+
+        users = {login_name(i): {"comment": "", "display_order": i + 1, "timestamp": "1600000000",
+                                 "steam_skin": "default", "steam_uid": steam_uid(i), "steam_user": {}}
+                 for i in range(self.num_accounts)}
+        settings = {"steam_api_key": "0" * 32, "behavior_after_login": "nothing", "theme": "dark",
+                    "display_size": "medium", "show_on_startup": True, "show_avatars": True,
+                    "use_systemtray": False, "steam_runtime": self.steam_runtime, "users": users}
+        if self.api_url:
+            settings["steam_api_url"] = self.api_url
+        with open(os.path.join(self.switcher_dir, "settings.json"), "w", encoding="utf-8") as settings_file:
+            json.dump(settings, settings_file, indent=2)
+        shutil.copyfile(os.path.join(REPO_DIR, "avatars", "avatar.png"),
+                        os.path.join(self.switcher_dir, "avatars", "avatar.png"))
+
+    def __enter__(self):
+        """
+        Point HOME and the working directory at the fake install
+        """
+        self._saved_home = os.environ.get("HOME")
+        self._saved_cwd = os.getcwd()
+        os.environ["HOME"] = self.home
+        os.chdir(self.switcher_dir)
+        return self
+
+    def __exit__(self, *exc):
+        self.kill()
+        os.chdir(self._saved_cwd)
+        if self._saved_home is not None:
+            os.environ["HOME"] = self._saved_home
+
+    def steam_pid(self):
+        try:
+            with open(os.path.join(self.steam_dir, "steam.pid")) as pid_file:
+                return int(pid_file.read())
+        except (OSError, ValueError):
+            return None
+
+    def kill(self):
+        """
+        Stop a stub steam left running
+        """
+        import signal
+        pid = self.steam_pid()
+        if pid is not None:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+            os.remove(os.path.join(self.steam_dir, "steam.pid"))
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Control socket of a running switcher (the tray GUI or `--daemon`), later invocations forward their
+command line to it instead of starting up.
+
+One JSON object per line each way: the parsed arguments, then {"ok", "exit_code", "output"}. While a command
+runs the switcher sends an empty line every KEEPALIVE_INTERVAL seconds, so commands that wait for steam, like
+`--login --confirm`, don't run into the client's timeout.
+"""
+import json
+import os
+import threading
+import zlib
+
+KEEPALIVE_INTERVAL = 5
+
+# socket is imported only when there is a switcher to talk to, it is a noticeable part of --list startup
+
+
+def available() -> bool:
+    return os.name == "posix"
+
+
+def socket_path(changer_path: str) -> str:
+    """
+    One socket per settings directory, in XDG_RUNTIME_DIR when there is one
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(runtime_dir, "steam_account_switcher-{0}-{1:08x}.sock".format(
+        os.getuid(), zlib.crc32(os.path.abspath(changer_path).encode())))
+
+
+def _read_line(sock) -> bytes:
+    """
+    The next non-empty line, keepalives are skipped
+    """
+    data = b""
+    while True:
+        chunk = sock.recv(64 * 1024)
+        if not chunk:
+            return data
+        data = (data + chunk).lstrip(b"\n")
+        if data.endswith(b"\n"):
+            return data
+
+
+def forward(path: str, command: dict, timeout: float = 30):
+    """
+    Send command to the switcher listening on path, returns its response or None if nothing is listening.
+    timeout is how long to wait without hearing from the switcher, a running command sends keepalives
+    """
+    if not available() or not os.path.exists(path):
+        return None
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        try:
+            sock.sendall(json.dumps(command).encode("utf-8") + b"\n")
+            return json.loads(_read_line(sock).decode("utf-8"))
+        except (OSError, ValueError) as e:
+            return {"ok": False, "exit_code": 1, "output": "Lost connection to the switcher: {0}".format(e)}
+    finally:
+        sock.close()
+
+
+def is_listening(path: str) -> bool:
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(1)
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+class ControlServer:
+    """
+    Serves handler(command) -> response on a unix socket, each connection on its own thread
+    """
+    def __init__(self, path: str, handler):
+        self.path = path
+        self.handler = handler
+        self.server = None
+        self._thread = None
+
+    def bind(self) -> bool:
+        """
+        Returns False if another switcher is already listening on path, stale sockets are replaced
+        """
+        import socketserver
+
+        if is_listening(self.path):
+            return False
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+        handler = self.handler
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                if not line:
+                    return
+                result = {}
+                thread = threading.Thread(target=self.run, args=(line, result), name="ControlCommand", daemon=True)
+                thread.start()
+                thread.join(KEEPALIVE_INTERVAL)
+                try:
+                    while thread.is_alive():
+                        self.wfile.write(b"\n")
+                        thread.join(KEEPALIVE_INTERVAL)
+                    self.wfile.write(json.dumps(result["response"]).encode("utf-8") + b"\n")
+                except OSError:
+                    pass  # the client is gone, the command still finishes
+
+            @staticmethod
+            def run(line: bytes, result: dict):
+                try:
+                    result["response"] = handler(json.loads(line.decode("utf-8")))
+                except Exception as e:
+                    result["response"] = {"ok": False, "exit_code": 1, "output": "Error: {0}".format(e)}
+
+        old_umask = os.umask(0o177)  # only the owner may connect
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.path, RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self.server.daemon_threads = True
+        return True
+
+    def start(self) -> bool:
+        """
+        bind() and serve on a background thread
+        """
+        if not self.bind():
+            return False
+        self._thread = threading.Thread(target=self.server.serve_forever, name="ControlServer", daemon=True)
+        self._thread.start()
+        return True
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def close(self):
+        if self.server is None:
+            return
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread = None
+        self.server.server_close()
+        self.server = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import os
+import stat
+import tempfile
+
+
+def _read_umask() -> int:
+    # os.umask can only be read by setting it, done once at import before other threads create files
+    umask = os.umask(0o22)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _read_umask()
+
+
+def write_atomic(path: str, data: bytes, fsync=False):
+    """
+    Write data to a temporary file next to path and rename it over path,
+    readers see either the old or the new file, never a partial one.
+
+    path keeps its permissions, a new file gets the umask default instead of mkstemp's 0600.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+            if fsync:
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Watch files and directories for changes, with inotify on Linux and stat polling elsewhere.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ATTRIB
+_EVENT = struct.Struct("iIII")
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """
+    Calls callback(paths) on a background thread with the set of watched paths that changed.
+
+    Files are watched through their directory, so files replaced by a rename are noticed too.
+    A directory path changes when an entry is added, removed or renamed in it.
+    Events are debounced, callback runs once the paths have been quiet for delay seconds.
+    """
+    def __init__(self, paths: list, callback, delay: float = 0.5, poll_interval: float = 2.0, use_inotify=True):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.callback = callback
+        self.delay = delay
+        self.poll_interval = poll_interval
+        self.events = 0
+        self.callbacks = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+        self._wake = None  # pipe that ends the select() of the watch thread on stop()
+        self._watches = {}
+        self._stat_keys = {}
+        libc = _load_libc() if use_inotify else None
+        self.backend = "inotify" if libc is not None and self._init_inotify(libc) else "polling"
+
+    def _init_inotify(self, libc) -> bool:
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+        for path in self.paths:
+            if os.path.isdir(path):
+                directory, name = path, None
+            else:
+                directory, name = os.path.split(path)
+            wd = libc.inotify_add_watch(fd, directory.encode(), WATCH_MASK)
+            if wd < 0:
+                print("Can't watch {0}: {1}".format(directory, os.strerror(ctypes.get_errno())))
+                continue
+            # {name in the directory: watched path}, None matches every entry of a watched directory
+            self._watches.setdefault(wd, {})[name] = path
+        self._fd = fd
+        self._wake = os.pipe()
+        return True
+
+    def start(self):
+        if self._thread is None:
+            if self.backend == "polling":
+                self._stat_keys = {path: self._stat_key(path) for path in self.paths}
+            self._thread = threading.Thread(target=self._run, name="FileWatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._wake is not None:
+            os.write(self._wake[1], b"\0")
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._wake is not None:
+            for fd in self._wake:
+                os.close(fd)
+            self._wake = None
+
+    def _run(self):
+        pending = set()
+        deadline = None
+        while not self._stop.is_set():
+            timeout = self.poll_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            changed = self._wait_inotify(min(timeout, 1.0)) if self.backend == "inotify" else self._wait_polling(timeout)
+            if changed:
+                self.events += len(changed)
+                pending |= changed
+                deadline = time.monotonic() + self.delay
+            elif pending and time.monotonic() >= deadline:
+                self.callbacks += 1
+                try:
+                    self.callback(pending)
+                except Exception as e:
+                    print("File watch callback error\n{0}".format(e))
+                pending = set()
+                deadline = None
+
+    def _wait_inotify(self, timeout: float) -> set:
+        try:
+            readable, _, _ = select.select([self._fd, self._wake[0]], [], [], timeout)
+            if self._fd not in readable:
+                return set()
+            data = os.read(self._fd, 64 * 1024)
+        except (OSError, ValueError, TypeError):  # closed by stop()
+            return set()
+        changed = set()
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0").decode(errors="replace")
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                return set(self.paths)
+            names = self._watches.get(wd, {})
+            if name in names:
+                changed.add(names[name])
+            if None in names:
+                changed.add(names[None])
+        return changed
+
+    @staticmethod
+    def _stat_key(path: str):
+        try:
+            stat = os.stat(path)
+            return stat.st_ino, stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def _wait_polling(self, timeout: float) -> set:
+        if self._stop.wait(timeout):
+            return set()
+        changed = set()
+        for path in self.paths:
+            key = self._stat_key(path)
+            if key != self._stat_keys.get(path):
+                self._stat_keys[path] = key
+                changed.add(path)
+        return changed
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Which accounts have installed, played or configured which games, from the appmanifest_<appid>.acf files of the
+steam libraries and the userdata/<account id> directories.
+"""
+import json
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from fileutils import write_atomic
+import steamid
+import vdf
+
+INDEX_VERSION = 1
+MANIFEST = "manifest"
+LOCALCONFIG = "localconfig"
+USERDATA = "userdata"
+# Stale files are parsed in a process pool from this many on, fewer aren't worth starting the workers
+PARALLEL_MIN_FILES = 200
+# userdata/<account id> entries that aren't games: steam itself, screenshots and the controller configs
+NOT_GAMES = {"7", "760", "241100"}
+
+_MANIFEST_NAME = re.compile(r"appmanifest_(\d+)\.acf$", re.I)
+
+
+def library_dirs(steam_root: str) -> list:
+    """
+    steamapps directories of the steam install at steam_root and the libraries in its libraryfolders.vdf
+    """
+    steamapps = os.path.join(steam_root, "steamapps")
+    dirs = [steamapps]
+    try:
+        folders = vdf.load(os.path.join(steamapps, "libraryfolders.vdf"), "libraryfolders")
+    except (OSError, vdf.VdfError):
+        return dirs
+    for key, folder in (folders or {}).items():
+        # {"path": ...} blocks, or the library path directly in the old format
+        path = folder.get("path") if isinstance(folder, dict) else folder if key.isdigit() else None
+        if path:
+            library = os.path.join(path, "steamapps")
+            if os.path.normcase(os.path.abspath(library)) != os.path.normcase(os.path.abspath(steamapps)):
+                dirs.append(library)
+    return dirs
+
+
+def read_manifest(path: str) -> dict:
+    values = vdf.extract(path, ["AppState.appid", "AppState.name", "AppState.LastOwner"])
+    return {"appid": values.get("AppState.appid") or _MANIFEST_NAME.search(path).group(1),
+            "name": values.get("AppState.name", ""), "owner": values.get("AppState.LastOwner", "")}
+
+
+def read_localconfig(path: str) -> dict:
+    import localconfig
+    return {appid: [app["last_played"], app["playtime"]] for appid, app in localconfig.read(path)["apps"].items()}
+
+
+def read_userdata(path: str) -> list:
+    return sorted(name for name in os.listdir(path) if name.isdigit() and name not in NOT_GAMES)
+
+
+READERS = {MANIFEST: read_manifest, LOCALCONFIG: read_localconfig, USERDATA: read_userdata}
+
+
+def scan_file(kind: str, path: str):
+    """
+    Parsed contents of the file at path, None when it can't be read. Runs in the worker processes as well
+    """
+    try:
+        return READERS[kind](path)
+    except (OSError, ValueError, AttributeError, vdf.VdfError) as e:
+        print("Games index: {0} read error {1}\n{2}".format(kind, path, e))
+        return None
+
+
+def _file_key(stat: os.stat_result) -> list:
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class GamesIndex:
+    """
+    appid <-> account index of the installed games and the games each account has played or has settings for.
+
+    The parsed contents of each appmanifest, localconfig.vdf and userdata directory listing are kept in
+    index_file with the size and mtime they were read at, update() stats the files and parses only the new and
+    changed ones, in a process pool when there are many. Queries are answered from dicts in memory, an update
+    builds new ones and swaps them in as one tuple, so queries never wait for a scan and each query reads maps
+    of the same scan.
+    """
+    def __init__(self, index_file: str = None):
+        self.index_file = index_file
+        # files {path: [file key, kind, parsed contents]}, apps {appid: {steamid64: [installed, last played,
+        # playtime]}}, accounts {steamid64: {appid, ...}} and names {appid: name}, replaced together
+        self.maps = ({}, {}, {}, {})
+        self.version = 0
+        self.dirty = False
+        self.last_scan = None  # (files stat'ed, files parsed, files removed)
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.index_file:
+            return
+        try:
+            with open(self.index_file, encoding="utf-8") as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return
+        if index.get("version") == INDEX_VERSION:
+            self._swap(index.get("files", {}))
+
+    @property
+    def files(self) -> dict:
+        return self.maps[0]
+
+    @property
+    def apps(self) -> dict:
+        return self.maps[1]
+
+    @property
+    def accounts(self) -> dict:
+        return self.maps[2]
+
+    @property
+    def names(self) -> dict:
+        return self.maps[3]
+
+    def save(self):
+        with self._lock:
+            if not self.index_file or not self.dirty:
+                return
+            files = self.files
+            self.dirty = False
+        # files isn't changed after it was swapped in, it is serialized without holding the lock
+        data = json.dumps({"version": INDEX_VERSION, "files": files}).encode("utf-8")
+        try:
+            write_atomic(self.index_file, data)
+        except OSError as e:
+            print("Games index write error\n{0}".format(e))
+
+    @staticmethod
+    def list_files(steamapps_dirs: list, userdata_dir: str) -> dict:
+        """
+        {path: (file key, kind)} of the files the index is built from
+        """
+        r = {}
+        for steamapps in steamapps_dirs:
+            try:
+                entries = list(os.scandir(steamapps))
+            except OSError:
+                continue
+            for entry in entries:
+                if _MANIFEST_NAME.match(entry.name):
+                    try:
+                        r[entry.path] = (_file_key(entry.stat()), MANIFEST)
+                    except OSError:
+                        pass
+        try:
+            accounts = [entry for entry in os.scandir(userdata_dir) if entry.name.isdigit() and entry.is_dir()]
+        except OSError:
+            accounts = []
+        for entry in accounts:
+            try:
+                r[entry.path] = (_file_key(entry.stat()), USERDATA)
+            except OSError:
+                continue
+            path = os.path.join(entry.path, "config", "localconfig.vdf")
+            try:
+                r[path] = (_file_key(os.stat(path)), LOCALCONFIG)
+            except OSError:
+                pass
+        return r
+
+    def update(self, steamapps_dirs: list, userdata_dir: str, processes: int = None, progress=None) -> int:
+        """
+        Re-read the new and changed files, drop the removed ones and save. Returns how many files were read.
+
+        processes limits the worker processes, 1 parses in this process. progress(done, total) is called while
+        parsing.
+        """
+        # Only one update scans at a time, the files and maps in use are replaced when it's done
+        with self._update_lock:
+            current = self.list_files(steamapps_dirs, userdata_dir)
+            files = {path: entry for path, entry in self.files.items() if path in current}
+            removed = len(self.files) - len(files)
+            stale = [(path, kind, key) for path, (key, kind) in current.items()
+                     if path not in files or files[path][0] != key]
+            self.last_scan = (len(current), len(stale), removed)
+            if not stale and not removed:
+                return 0
+            if progress:
+                progress(0, len(stale))
+            kinds = [kind for _, kind, _ in stale]
+            paths = [path for path, _, _ in stale]
+            workers = min(processes or os.cpu_count() or 1, len(stale) // (PARALLEL_MIN_FILES // 2) or 1)
+            if len(stale) >= PARALLEL_MIN_FILES and workers > 1:
+                # spawn, forking a process with GUI and downloader threads isn't safe
+                with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    results = executor.map(scan_file, kinds, paths, chunksize=max(1, len(stale) // (workers * 4)))
+                    self._store(files, stale, results, progress)
+            else:
+                self._store(files, stale, map(scan_file, kinds, paths), progress)
+            self._swap(files)
+            self.dirty = True
+        self.save()
+        return len(stale)
+
+    @staticmethod
+    def _store(files: dict, stale: list, results, progress):
+        for done, ((path, kind, key), data) in enumerate(zip(stale, results), 1):
+            files[path] = [key, kind, data]
+            if progress and (done % 100 == 0 or done == len(stale)):
+                progress(done, len(stale))
+
+    def _swap(self, files: dict):
+        maps = (files, *self._build(files))
+        with self._lock:
+            self.maps = maps
+            self.version += 1
+
+    @staticmethod
+    def _build(files: dict) -> tuple:
+        """
+        (apps, accounts, names) maps of the parsed files
+        """
+        apps = {}
+        names = {}
+        for path, (_, kind, data) in files.items():
+            if data is None:
+                continue
+            if kind == MANIFEST:
+                names[data["appid"]] = data["name"]
+                if steamid.is_steamid64(data["owner"]):
+                    apps.setdefault(data["appid"], {}).setdefault(data["owner"], [False, 0, 0])[0] = True
+                else:
+                    apps.setdefault(data["appid"], {})
+                continue
+            try:
+                uid = steamid.account_id_to_steamid64(os.path.basename(os.path.dirname(os.path.dirname(path)))
+                                                      if kind == LOCALCONFIG else os.path.basename(path))
+            except ValueError:
+                continue
+            if kind == LOCALCONFIG:
+                for appid, (last_played, playtime) in data.items():
+                    entry = apps.setdefault(appid, {}).setdefault(uid, [False, 0, 0])
+                    entry[1], entry[2] = last_played, playtime
+            else:
+                for appid in data:
+                    apps.setdefault(appid, {}).setdefault(uid, [False, 0, 0])
+        accounts = {}
+        for appid, owners in apps.items():
+            for uid in owners:
+                accounts.setdefault(uid, set()).add(appid)
+        return apps, accounts, names
+
+    def who_has(self, appid) -> list:
+        """
+        [(steamid64, installed, last played, playtime), ...] of the accounts with appid, most recently played first
+        """
+        owners = self.apps.get(str(appid), {})
+        return sorted(((uid, *entry) for uid, entry in owners.items()), key=lambda owner: (-owner[2], not owner[1]))
+
+    def games_of(self, steamid64) -> list:
+        """
+        [(appid, installed, last played, playtime), ...] of the games of steamid64, most recently played first
+        """
+        _, apps, accounts, _ = self.maps
+        steamid64 = str(steamid64)
+        return sorted(((appid, *apps[appid][steamid64]) for appid in accounts.get(steamid64, ())),
+                      key=lambda game: -game[2])
+
+    def find_apps(self, query: str) -> list:
+        """
+        appids matching query, an appid or part of the name of an installed game
+        """
+        _, apps, _, names = self.maps
+        query = query.strip()
+        if query.isdigit():
+            return [query] if query in apps else []
+        query = query.casefold()
+        return [appid for appid, name in names.items() if query and query in name.casefold()]
+
+    def name(self, appid) -> str:
+        return self.names.get(str(appid)) or str(appid)
+
+    def stats(self) -> str:
+        files, apps, accounts, _ = self.maps
+        r = "games index: {0} games, {1} accounts, {2} files".format(len(apps), len(accounts), len(files))
+        if self.last_scan:
+            r += ", last update checked {0} and read {1}, {2} removed".format(*self.last_scan)
+        return r
@@ -22,24 +22,34 @@ elif 'PyQt5' in sys.modules:
 else:
     print("Pyside2 or PyQt5 should be installed")
 
+import profiling
 from gui._i18n import _
 
+from gui.account_model import AccountListModel, AccountDelegate, LoginNameRole, LAYOUT_BATCH_SIZE
 from gui.accounts import Accounts
+from gui.control import Control
+from gui.avatar_cache import AvatarPixmapCache
 from gui.dialog_about import DialogAbout
 from gui.dialog_account import DialogAccount
 from gui.dialog_import_accounts import DialogImportAccount
 from gui.dialog_steamapi_key import DialogSteamapiKey
+from gui.file_sync import FileSync
+from gui.games import Games
 from gui.rightclick_menu import RightClickMenu
+from gui.search import Search
 from gui.settings import Settings
+from gui.summary_refresh import SummaryRefresh
 from gui.systemtray import SystemTray
+from gui.tasks import Tasks
 
 
 class SteamAccountSwitcherGui(QMainWindow, Accounts, DialogAccount, DialogImportAccount, DialogSteamapiKey, Settings,
-                              SystemTray):
+                              SystemTray, FileSync, Control, SummaryRefresh, Tasks, Search, Games):
     account_dialog_window: QDialog
     submit_button: QPushButton
     tray_menu: QMenu
 
+    @profiling.traced()
     def __init__(self):
         QMainWindow.__init__(self)
         signal.signal(signal.SIGINT, self.exit_app)
@@ -77,7 +87,7 @@ class SteamAccountSwitcherGui(QMainWindow, Accounts, DialogAccount, DialogImport
         about_action = QAction(_("About"), self)
         exit_action = QAction(_("Exit"), self)
 
-        refresh_action.triggered.connect(Accounts.steamapi_refresh)
+        refresh_action.triggered.connect(lambda: self.steamapi_refresh())
         import_action.triggered.connect(lambda: DialogImportAccount.import_accounts_dialog(self))
         open_skinsdir_action.triggered.connect(self.open_skinsdir)
         about_action.triggered.connect(lambda: DialogAbout.about_dialog(self))
@@ -153,20 +163,38 @@ class SteamAccountSwitcherGui(QMainWindow, Accounts, DialogAccount, DialogImport
         self.layout = QVBoxLayout()
         self.main_widget.setLayout(self.layout)
 
-        self.accounts_list = QListWidget()
+        self.avatar_cache = AvatarPixmapCache(os.path.join(self.switcher.changer_path, "avatars", "thumbnails"),
+                                              self.switcher.settings.get("avatar_cache_mb", 32) * 1024 * 1024)
+        self.accounts_model = AccountListModel(self.switcher, self.avatar_cache, self)
+        self.accounts_list = QListView()
+        self.accounts_list.setModel(self.accounts_model)
+        self.accounts_list.setItemDelegate(AccountDelegate(self.accounts_list))
+        self.accounts_list.setUniformItemSizes(True)
+        # Laid out in batches so filtering thousands of accounts doesn't block a frame
+        self.accounts_list.setLayoutMode(QListView.Batched)
+        self.accounts_list.setBatchSize(LAYOUT_BATCH_SIZE)
+        self.accounts_list.setSelectionMode(QAbstractItemView.SingleSelection)
         self.accounts_list.setDragDropMode(QAbstractItemView.InternalMove)
+        self.accounts_list.setDefaultDropAction(Qt.MoveAction)
         self.layout.addWidget(self.accounts_list)
         self.layout.addLayout(self.buttons)
 
         self.layout.setSpacing(10)
         self.accounts_list.setSpacing(1)
 
+        self.start_search()
+        self.start_tasks()
+
         self.import_accounts_window = QDialog()
 
         self.load_accounts()
+        self.start_file_sync()
+        self.start_control_server()
+        self.start_summary_refresh()
+        self.start_games_index()
 
         def edit_button_enabled():
-            if self.accounts_list.selectedItems():
+            if self.accounts_list.selectionModel().hasSelection():
                 self.edit_button.setEnabled(True)
             else:
                 self.edit_button.setEnabled(False)
@@ -174,8 +202,8 @@ class SteamAccountSwitcherGui(QMainWindow, Accounts, DialogAccount, DialogImport
         # Signals and Slots
         self.add_button.clicked.connect(lambda: self.account_dialog(True))
         self.edit_button.clicked.connect(lambda: self.account_dialog(False))
-        self.accounts_list.itemSelectionChanged.connect(edit_button_enabled)
-        self.accounts_list.doubleClicked.connect(lambda: self.steam_login(self.accounts_list.currentIndex().data(5)))
+        self.accounts_list.selectionModel().selectionChanged.connect(edit_button_enabled)
+        self.accounts_list.doubleClicked.connect(lambda index: self.steam_login(index.data(LoginNameRole)))
         self.accounts_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.accounts_list.customContextMenuRequested.connect(lambda: RightClickMenu.show_rightclick_menu(self))
         # self.accounts_list.layoutChanged.connect(lambda: self.account_reordered)
@@ -195,6 +223,11 @@ class SteamAccountSwitcherGui(QMainWindow, Accounts, DialogAccount, DialogImport
             self.tray_icon.showMessage("No api key", "Set the steam web api key.", self.switcher_logo)
 
     def exit_app(self):
+        self.stop_file_sync()
+        self.stop_control_server()
+        self.stop_summary_refresh()
+        self.stop_tasks()
+        self.switcher.settings_flush()
         self.tray_icon.hide()
         QApplication.quit()
 
@@ -0,0 +1,214 @@
+from PySide2.QtCore import QAbstractListModel, QByteArray, QMimeData, QModelIndex, QSize, Qt
+from PySide2.QtGui import QFont
+from PySide2.QtWidgets import QStyledItemDelegate
+
+import profiling
+
+LoginNameRole = Qt.UserRole
+AccountRole = Qt.UserRole + 1
+
+# flags() always returns ItemFlags, some PySide2 builds reject a bare ItemFlag and fail on | between flags
+NO_FLAGS = Qt.ItemFlags()
+ROOT_FLAGS = Qt.ItemFlags(int(Qt.ItemIsDropEnabled))
+ITEM_FLAGS = Qt.ItemFlags(int(Qt.ItemIsEnabled) | int(Qt.ItemIsSelectable))
+DRAGGABLE_ITEM_FLAGS = Qt.ItemFlags(int(Qt.ItemIsEnabled) | int(Qt.ItemIsSelectable) | int(Qt.ItemIsDragEnabled))
+
+# Rows the account list lays out per event loop pass, Qt asks the model for every row on each layout
+LAYOUT_BATCH_SIZE = 200
+
+# display_size: (row height, font pixel size, show comment)
+DISPLAY_SIZES = {
+    "small": (20, 12, False),
+    "medium": (40, 14, True),
+    "large": (60, 18, True),
+}
+
+
+class AccountListModel(QAbstractListModel):
+    """
+    Accounts of switcher.users in display_order, one row per account.
+
+    Changes are applied with the account_* methods so that only the affected rows are updated. set_filter() shows
+    only some of the accounts, reordering is disabled while filtered.
+    """
+    mime_type = "application/x-steam-account-switcher-login-names"
+
+    def __init__(self, switcher, avatar_cache, parent=None):
+        QAbstractListModel.__init__(self, parent)
+        self.switcher = switcher
+        self.avatar_cache = avatar_cache
+        self.login_names = []
+        self.rows = {}
+        self.filtered = False
+        self.avatars = {}
+        self.font = QFont()
+        self.update_display_size()
+
+    def update_display_size(self):
+        self.row_height, font_size, self.show_comment = DISPLAY_SIZES.get(
+            self.switcher.settings.get("display_size", "small"), DISPLAY_SIZES["small"])
+        self.font = QFont()
+        self.font.setPixelSize(font_size)
+        self.show_avatars = self.switcher.settings.get("show_avatars")
+
+    def _update_rows(self, first=0):
+        for row in range(first, len(self.login_names)):
+            self.rows[self.login_names[row]] = row
+
+    @profiling.traced()
+    def reload(self):
+        self.beginResetModel()
+        self.login_names = [login_name for login_name, _ in self.switcher.users.sorted_items()]
+        self.filtered = False
+        self.rows = {}
+        self._update_rows()
+        self.endResetModel()
+
+    def set_filter(self, login_names: list = None):
+        """
+        Show only login_names in their order, None shows every account again
+        """
+        if login_names is None:
+            return self.reload() if self.filtered else None
+        if login_names == self.login_names:
+            # The same rows, like a first letter every account matches, only reordering changes
+            self.filtered = True
+            return
+        self.beginResetModel()
+        self.login_names = list(login_names)
+        self.filtered = True
+        self.rows = {}
+        self._update_rows()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.login_names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.login_names):
+            return None
+        login_name = self.login_names[index.row()]
+        if role == LoginNameRole:
+            return login_name
+        account = self.switcher.users.get(login_name, {})
+        if role == Qt.DisplayRole:
+            name = str(account.get("steam_name", login_name))
+            if self.show_comment and account.get("comment"):
+                return name + "\n" + account.get("comment")
+            return name
+        elif role == Qt.DecorationRole:
+            if self.show_avatars:
+                avatar_path = self.avatars.get(login_name)
+                pixmap = self.avatar_cache.get(avatar_path, self.row_height) if avatar_path else None
+                return pixmap or self.avatar_cache.pixmap(self.switcher.default_avatar, self.row_height)
+        elif role == Qt.FontRole:
+            return self.font
+        elif role == Qt.ToolTipRole:
+            return account.get("comment") or None
+        elif role == Qt.SizeHintRole:
+            return QSize(0, self.row_height)
+        elif role == AccountRole:
+            return account
+        return None
+
+    def index_of(self, login_name) -> QModelIndex:
+        row = self.rows.get(login_name)
+        return QModelIndex() if row is None else self.index(row)
+
+    def account_changed(self, login_name, roles=()):
+        index = self.index_of(login_name)
+        if index.isValid():
+            self.dataChanged.emit(index, index, list(roles))
+
+    def account_added(self, login_name):
+        if login_name in self.rows:
+            return self.account_changed(login_name)
+        row = len(self.login_names)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.login_names.append(login_name)
+        self.rows[login_name] = row
+        self.endInsertRows()
+
+    def account_removed(self, login_name):
+        row = self.rows.get(login_name)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.login_names[row]
+        del self.rows[login_name]
+        self.avatars.pop(login_name, None)
+        self._update_rows(row)
+        self.endRemoveRows()
+
+    def account_renamed(self, old_login_name, login_name):
+        row = self.rows.pop(old_login_name, None)
+        if row is None:
+            return self.account_added(login_name)
+        self.login_names[row] = login_name
+        self.rows[login_name] = row
+        self.avatars.pop(old_login_name, None)
+        self.account_changed(login_name)
+
+    def set_avatar(self, login_name, avatar_path: str):
+        self.avatars[login_name] = avatar_path
+        self.account_changed(login_name, [Qt.DecorationRole])
+
+    def display_changed(self):
+        self.update_display_size()
+        if self.login_names:
+            self.dataChanged.emit(self.index(0), self.index(len(self.login_names) - 1))
+
+    # Drag and drop reordering
+    def flags(self, index):
+        if self.filtered:
+            return ITEM_FLAGS if index.isValid() else NO_FLAGS
+        if not index.isValid():
+            return ROOT_FLAGS
+        return DRAGGABLE_ITEM_FLAGS
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [self.mime_type]
+
+    def mimeData(self, indexes):
+        mime_data = QMimeData()
+        login_names = [self.login_names[index.row()] for index in sorted(indexes, key=lambda i: i.row())]
+        mime_data.setData(self.mime_type, QByteArray("\n".join(login_names).encode("utf-8")))
+        return mime_data
+
+    def move_account(self, login_name, row) -> bool:
+        source_row = self.rows[login_name]
+        if row in (source_row, source_row + 1):
+            return False
+        self.beginMoveRows(QModelIndex(), source_row, source_row, QModelIndex(), row)
+        del self.login_names[source_row]
+        self.login_names.insert(row - 1 if row > source_row else row, login_name)
+        self._update_rows(min(row, source_row))
+        self.endMoveRows()
+        return True
+
+    def dropMimeData(self, data, action, row, column, parent):
+        if action != Qt.MoveAction or not data.hasFormat(self.mime_type) or self.filtered:
+            return False
+        if row == -1:
+            row = parent.row() if parent.isValid() else len(self.login_names)
+        moved = False
+        for login_name in data.data(self.mime_type).data().decode("utf-8").split("\n"):
+            if login_name in self.rows:
+                moved = self.move_account(login_name, row) or moved
+                row = self.rows[login_name] + 1
+        if moved:
+            with self.switcher.command_lock:
+                self.switcher.users.set_order(self.login_names)
+        # The rows are already moved, returning False keeps the view from removing the dragged rows
+        return False
+
+
+class AccountDelegate(QStyledItemDelegate):
+    """
+    Rows have a fixed height per display_size, no text layout is needed to size them
+    """
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), index.data(Qt.SizeHintRole).height())
@@ -1,20 +1,66 @@
-from PySide2.QtCore import QSize
-from PySide2.QtGui import QIcon, QFont
-from PySide2.QtWidgets import QListWidgetItem
+import time
 
+from PySide2.QtCore import QSize, QObject, QRunnable, QThreadPool, QTimer, Qt, Signal
+
+import profiling
 from ._i18n import _
 
+
+class AvatarLoader(QObject):
+    """
+    Decodes and scales avatar images on the global QThreadPool, loaded is emitted on the GUI thread
+    """
+    loaded = Signal(str, str, object)
+
+    class DecodeAvatar(QRunnable):
+        def __init__(self, loader, login_name, path):
+            QRunnable.__init__(self)
+            self.loader = loader
+            self.login_name = login_name
+            self.path = path
+
+        def run(self):
+            images = self.loader.avatar_cache.load_thumbnails(self.path)
+            if images:
+                self.loader.loaded.emit(self.login_name, self.path, images)
+
+    def __init__(self, avatar_cache):
+        QObject.__init__(self)
+        self.avatar_cache = avatar_cache
+
+    def load(self, login_name: str, path: str):
+        QThreadPool.globalInstance().start(self.DecodeAvatar(self, login_name, path))
+
+
 class Accounts:
+    avatar_loader: AvatarLoader = None
+    first_paint_ms: float
+
     def steamapi_refresh(self, uids=None):
+        """
+        Refresh the summaries of uids, or of the accounts older than the summary_ttl setting, in the background
+        """
         print("Updating")
-        try:
-            self.switcher.steam_skins = self.switcher.get_steam_skins()
+        if not uids:
+            self.get_refresh_scheduler().prioritize(self.visible_login_names())
+        self.run_task(("refresh", tuple(uids or ())), _("Refreshing accounts"), self.refresh_summaries, uids,
+                      on_done=lambda refreshed: self.load_accounts() if uids else None,
+                      on_error=self.steamapi_refresh_failed)
+
+    def refresh_summaries(self, task, uids):
+        with self.switcher.command_lock:
             self.switcher.update_steamuids()
-            self.switcher.get_steamapi_usersummary(uids)
-            self.load_accounts()
-        except Exception as e:
-            self.tray_icon.showMessage(_("ERROR"), _("Something when wrong updating \n{0}").format(str(e)),
-                                       self.switcher_logo)
+            if uids:
+                self.switcher.get_steamapi_usersummary(uids)
+                return uids
+        refreshed = self.refresh_stale_summaries(task)
+        with self.switcher.command_lock:
+            self.switcher.gc_avatars(out=None)
+        return refreshed
+
+    def steamapi_refresh_failed(self, error):
+        self.tray_icon.showMessage(_("ERROR"), _("Something when wrong updating \n{0}").format(str(error)),
+                                   self.switcher_logo)
 
     def account_reordered(self, account):
         print(account)
@@ -23,23 +69,85 @@ class Accounts:
         print("hallo")
 
     def save_account(self, login_name, user, original_login_name=None):
-        self.switcher.add_account(login_name, user, original_login_name)
+        new_account = login_name not in self.switcher.users
+
+        def saved(result):
+            if original_login_name and original_login_name != login_name:
+                self.accounts_model.account_renamed(original_login_name, login_name)
+            elif new_account:
+                self.accounts_model.account_added(login_name)
+            else:
+                self.accounts_model.account_changed(login_name)
+            self.update_account_filter()
+            self.load_avatars([login_name])
 
-        self.load_accounts()
+        self.run_task(("save", login_name), _("Saving {0}").format(login_name),
+                      self.add_account, login_name, user, original_login_name,
+                      on_done=saved, on_error=lambda error: self.tray_icon.showMessage(
+                          _("ERROR"), _("Saving {0} failed\n{1}").format(login_name, error), self.switcher_logo))
         self.account_dialog_window.close()
 
+    def add_account(self, task, login_name, user, original_login_name):
+        with self.switcher.command_lock:
+            self.switcher.add_account(login_name, user, original_login_name)
+
+    def import_accounts(self, task, login_names: list):
+        task.progress(0, 2, _("Importing {0} accounts").format(len(login_names)))
+        with self.switcher.command_lock:
+            added = self.switcher.add_accounts(login_names, fetch=False)
+        task.raise_if_cancelled()
+        task.progress(1, 2, _("Downloading {0} summaries").format(len(added)))
+        with self.switcher.command_lock:
+            self.switcher.fetch_accounts(added)
+        return added
+
     def remove_account(self, account_name):
-        self.switcher.delete_account(account_name)
-        self.load_accounts()
+        with self.switcher.command_lock:
+            self.switcher.delete_account(account_name)
+        self.accounts_model.account_removed(account_name)
+        self.update_account_filter()
+
+    @profiling.traced()
+    def accounts_imported(self, login_names: list):
+        for login_name in login_names:
+            self.accounts_model.account_added(login_name)
+        self.update_account_filter()
+        self.load_avatars(login_names)
 
     def steam_login(self, login_name: str, ignore_after_login_behavior=False):
+        self.run_task(("login", login_name), _("Switching to {0}").format(login_name), self.switch_account,
+                      login_name, on_done=lambda r: self.steam_login_finished(*r, ignore_after_login_behavior),
+                      on_error=lambda error: self.tray_icon.showMessage(
+                          _("ERROR"), _("Switching to {0} failed\n{1}").format(login_name, error), self.switcher_logo))
+
+    def switch_account(self, task, login_name: str):
+        watcher = self.switcher.watch_login(login_name)
         try:
-            self.switcher.login_with(login_name)
-        except PermissionError:
+            task.raise_if_cancelled()
+            return self.switcher.login_with(login_name), watcher
+        except Exception:
+            watcher.stop()
+            raise
+
+    def confirm_account_login(self, task, watcher):
+        login_result = self.switcher.confirm_login(watcher, cancelled=task.cancelled)
+        task.raise_if_cancelled()
+        return login_result
+
+    def steam_login_finished(self, result, watcher, ignore_after_login_behavior=False):
+        if result.ok:
+            self.run_task(("confirm_login", result.login_name), _("Waiting for steam to log in"),
+                          self.confirm_account_login, watcher, on_done=self.after_steam_login)
+        else:
+            watcher.stop()
+        if isinstance(result.error, PermissionError):
             self.tray_icon.showMessage(_("Permission error"), _("Are you running as administrator?"),
                                        self.switcher_logo)
-
-        if not ignore_after_login_behavior:
+        elif not result.ok:
+            self.tray_icon.showMessage(_("ERROR"), _("Switching to {0} failed\n{1}").format(result.login_name,
+                                                                                           result.error),
+                                       self.switcher_logo)
+        elif not ignore_after_login_behavior:
             if self.switcher.settings["behavior_after_login"] == "close":
                 self.exit_app()
             elif self.switcher.settings["behavior_after_login"] == "minimize":
@@ -48,47 +156,52 @@ class Accounts:
             elif self.switcher.settings["behavior_after_login"] == "minimize_tray":
                 self.hide()
 
-    def load_accounts(self, no_populate=False):
-        sorted_users = sorted(self.switcher.settings["users"].items(), key=lambda a: a[1]["display_order"])
-        avatars = self.switcher.get_steam_avatars(list(self.switcher.settings["users"].keys()))
-        if not no_populate:
-            self.accounts_list.clear()
-            self.insert_accounts(sorted_users, avatars)
-        else:
-            return sorted_users, avatars
-
-    def insert_accounts(self, sorted_users, avatars):
-        size = self.switcher.settings.get("display_size", "small")
-        font = QFont()
-
-        def insert(name, qsize, font_size: int, icon_size):
-            item.setData(2, name)
-            item.setData(13, qsize)
-            font.setPixelSize(font_size)
-            item.setFont(font)
-            self.accounts_list.setIconSize(icon_size)
-
-        for login_name, account in sorted_users:
-            item = QListWidgetItem()
-            item.setData(0, account)
-            sname = str(account.get("steam_name", login_name))
-            if self.switcher.settings.get("show_avatars"):
-                item.setData(1, QIcon(avatars.get(login_name, self.switcher.default_avatar)))
-            item.setData(3, account.get("comment"))
-            item.setData(5, login_name)
-            if size == "small":
-                insert(sname, QSize(0, 20), 12, QSize(20, 20))
-            elif size == "medium":
-                insert(sname + "\n" + account.get("comment") if account.get("comment") else sname,
-                       QSize(0, 40), 14, QSize(40, 40))
-            elif size == "large":
-                insert(sname + "\n" + account.get("comment") if account.get("comment") else sname,
-                       QSize(0, 60), 18, QSize(60, 60))
-            self.accounts_list.addItem(item)
-        # self.switcher.get_steamids()
-
-    def after_steam_login(self):
+    @profiling.traced()
+    def load_accounts(self):
+        start = time.perf_counter()
+        self.accounts_model.reload()
+        self.update_account_filter()
+        self.update_account_display()
+        QTimer.singleShot(0, lambda: self._first_paint(start))
+        self.load_avatars(self.switcher.users.keys())
+
+    def _first_paint(self, start):
+        # Read by benchmarks/bench_e2e.py
+        self.first_paint_ms = (time.perf_counter() - start) * 1000
+
+    @profiling.traced()
+    def load_avatars(self, login_names):
+        if not self.switcher.settings.get("show_avatars"):
+            return
+        if self.avatar_loader is None:
+            self.avatar_loader = AvatarLoader(self.avatar_cache)
+            self.avatar_loader.loaded.connect(self.set_account_avatar, Qt.QueuedConnection)
+        avatars = self.switcher.get_steam_avatars(list(login_names), callback=self.avatar_loader.load)
+        for login_name, avatar_path in avatars.items():
+            if avatar_path == self.switcher.default_avatar:
+                continue
+            if self.avatar_cache.contains(avatar_path, self.accounts_model.row_height):
+                self.accounts_model.set_avatar(login_name, avatar_path)
+            else:
+                self.avatar_loader.load(login_name, avatar_path)
+
+    def set_account_avatar(self, login_name: str, avatar_path: str, images: dict):
+        self.avatar_cache.put_thumbnails(avatar_path, images)
+        self.accounts_model.set_avatar(login_name, avatar_path)
+
+    def update_account_display(self):
+        self.accounts_model.display_changed()
+        icon_size = self.accounts_model.row_height
+        self.accounts_list.setIconSize(QSize(icon_size, icon_size))
+
+    def after_steam_login(self, login_result):
         """
-        Wait for steam to login then run get_steamapi_usersummary
+        Steam has logged in, or not, after a switch, the account's summary is already refreshed
         """
-        raise NotImplementedError()
+        if login_result.ok:
+            self.tray_icon.showMessage(_("Logged in"), _("Logged in as {0} in {1:.1f} s").format(
+                login_result.login_name, login_result.elapsed_ms / 1000), self.switcher_logo)
+            self.accounts_model.account_changed(login_result.login_name)
+            self.load_avatars([login_result.login_name])
+        else:
+            self.tray_icon.showMessage(_("ERROR"), str(login_result), self.switcher_logo)
@@ -0,0 +1,117 @@
+import os
+from collections import OrderedDict
+
+from PySide2.QtCore import QBuffer, QByteArray, QIODevice, Qt
+from PySide2.QtGui import QIcon, QImage, QImageReader, QPixmap
+
+from fileutils import write_atomic
+
+# Icon sizes of the display_size presets
+THUMBNAIL_SIZES = (20, 40, 60)
+
+
+def avatar_hash(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class AvatarPixmapCache:
+    """
+    LRU cache of scaled avatar pixmaps keyed by (avatar hash, size), limited to budget_bytes.
+
+    Scaled copies for THUMBNAIL_SIZES are also kept on disk in thumbnails_dir,
+    load_thumbnails() can run on any thread, pixmaps are only created on the GUI thread.
+    """
+    def __init__(self, thumbnails_dir: str, budget_bytes: int = 32 * 1024 * 1024):
+        self.thumbnails_dir = thumbnails_dir
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.pixmaps = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    def thumbnail_path(self, path: str, size: int) -> str:
+        return os.path.join(self.thumbnails_dir, str(size), avatar_hash(path) + ".png")
+
+    def load_thumbnails(self, path: str) -> dict:
+        """
+        Returns {size: QImage} for THUMBNAIL_SIZES, creating missing thumbnails from the avatar at path
+        """
+        images = {}
+        full_image = None
+        for size in THUMBNAIL_SIZES:
+            thumbnail_path = self.thumbnail_path(path, size)
+            image = QImage(thumbnail_path)
+            if image.isNull():
+                if full_image is None:
+                    reader = QImageReader(path)
+                    reader.setDecideFormatFromContent(True)
+                    full_image = reader.read()
+                    if full_image.isNull():
+                        return images
+                image = full_image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                self.save_thumbnail(image, thumbnail_path)
+            images[size] = image
+        return images
+
+    @staticmethod
+    def save_thumbnail(image: QImage, thumbnail_path: str):
+        """
+        Written to a temporary file and renamed, other threads and processes never read a partial png
+        """
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, "PNG")
+        buffer.close()
+        try:
+            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            write_atomic(thumbnail_path, data.data())
+        except OSError as e:
+            print("Thumbnail write error {0}\n{1}".format(thumbnail_path, e))
+
+    def get(self, path: str, size: int):
+        pixmap = self.pixmaps.get((avatar_hash(path), size))
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.pixmaps.move_to_end((avatar_hash(path), size))
+        return pixmap
+
+    def contains(self, path: str, size: int) -> bool:
+        return (avatar_hash(path), size) in self.pixmaps
+
+    def put(self, path: str, size: int, image: QImage) -> QPixmap:
+        key = (avatar_hash(path), size)
+        if key in self.pixmaps:
+            self.used_bytes -= self._bytes(self.pixmaps.pop(key))
+        pixmap = QPixmap.fromImage(image)
+        self.generation += 1
+        self.pixmaps[key] = pixmap
+        self.used_bytes += self._bytes(pixmap)
+        while self.used_bytes > self.budget_bytes and len(self.pixmaps) > 1:
+            _, evicted = self.pixmaps.popitem(last=False)
+            self.used_bytes -= self._bytes(evicted)
+        return pixmap
+
+    def put_thumbnails(self, path: str, images: dict):
+        for size, image in images.items():
+            self.put(path, size, image)
+
+    def pixmap(self, path: str, size: int) -> QPixmap:
+        """
+        Cached pixmap, loaded synchronously on a miss
+        """
+        pixmap = self.get(path, size)
+        if pixmap is None:
+            self.put_thumbnails(path, self.load_thumbnails(path))
+            pixmap = self.pixmaps.get((avatar_hash(path), size)) or QPixmap(path)
+        return pixmap
+
+    def icon(self, path: str, size: int) -> QIcon:
+        return QIcon(self.pixmap(path, size))
+
+    @staticmethod
+    def _bytes(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
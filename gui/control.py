@@ -0,0 +1,76 @@
+import threading
+
+from PySide2.QtCore import QObject, Qt, Signal
+
+import controlsocket
+
+# Seconds a forwarded command waits for the GUI thread
+GUI_TIMEOUT = 10
+
+
+class ControlRequest:
+    def __init__(self, command: dict):
+        self.command = command
+        self.response = None
+        self.done = threading.Event()
+
+
+class ControlBridge(QObject):
+    """
+    Hands what has to happen on the GUI thread from the control socket threads to it
+    """
+    show = Signal(object)
+    accounts_changed = Signal()
+
+
+class Control:
+    """
+    Serves later invocations of main.py on the control socket, so they don't start a second GUI
+    """
+    control_server: controlsocket.ControlServer = None
+    control_bridge: ControlBridge
+
+    def start_control_server(self):
+        if not controlsocket.available() or not self.switcher.settings.get("control_socket", True):
+            return
+        self.control_bridge = ControlBridge(self)
+        self.control_bridge.show.connect(self.control_show, Qt.QueuedConnection)
+        self.control_bridge.accounts_changed.connect(self.load_accounts, Qt.QueuedConnection)
+        server = controlsocket.ControlServer(controlsocket.socket_path(self.switcher.changer_path),
+                                             self.forward_control_request)
+        if server.start():
+            self.control_server = server
+        else:
+            print("Another switcher is listening on {0}".format(server.path))
+
+    def stop_control_server(self):
+        if self.control_server is not None:
+            self.control_server.close()
+            self.control_server = None
+
+    def forward_control_request(self, command: dict) -> dict:
+        if command.get("show"):
+            request = ControlRequest(command)
+            self.control_bridge.show.emit(request)
+            if not request.done.wait(GUI_TIMEOUT):
+                return {"ok": False, "exit_code": 1, "output": "The GUI didn't respond"}
+            return request.response
+        # Refreshing, importing, switching and indexing games block for seconds, they run on the socket thread
+        # under the switcher's command lock, which the GUI holds for its own changes to the accounts and settings.
+        # Only the account list is reloaded on the GUI thread
+        version = self.switcher.users.version
+        response = self.switcher.run_command(command)
+        if self.switcher.users.version != version:
+            self.control_bridge.accounts_changed.emit()
+        return response
+
+    def control_show(self, request: ControlRequest):
+        try:
+            self.show()
+            self.raise_()
+            self.activateWindow()
+            request.response = {"ok": True, "exit_code": 0, "output": ""}
+        except Exception as e:
+            request.response = {"ok": False, "exit_code": 1, "output": "Error: {0}".format(e)}
+        finally:
+            request.done.set()
@@ -1,6 +1,7 @@
 from PySide2.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QComboBox, QPushButton, QHBoxLayout
 
 from ._i18n import _
+from .account_model import LoginNameRole
 
 
 class DialogAccount:
@@ -30,8 +31,8 @@ class DialogAccount:
             self.submit_button = QPushButton(_("Add"))
             self.submit_button.setDisabled(True)
         else:
-            login_name_selected = self.accounts_list.currentItem().data(5)
-            user = self.switcher.settings["users"].get(login_name_selected, {})
+            login_name_selected = self.accounts_list.currentIndex().data(LoginNameRole)
+            user = self.switcher.users.get(login_name_selected, {})
             self.account_dialog_window.setWindowTitle(_("Edit account {0}").format(login_name_selected))
             self.submit_button = QPushButton(_("Edit"))
             account_name_edit.setText(login_name_selected)
@@ -28,7 +28,7 @@ class DialogImportAccount():
         layout.addWidget(import_accounts_list)
         layout.addWidget(import_button)
 
-        installed_accounts = self.switcher.settings.get("users").keys()
+        installed_accounts = self.switcher.users.keys()
         disabled = []
         for uid, steam_user in self.switcher.load_loginusers().items():
             account_row = [QStandardItem(steam_user.get("AccountName")),
@@ -37,7 +37,7 @@ class DialogImportAccount():
             # account_row[0].setCheckable(True)
             account_row[2].setEnabled(False)
 
-            if steam_user.get("AccountName") in installed_accounts:
+            if uid in self.switcher.uid_index or steam_user.get("AccountName") in installed_accounts:
                 # account_row = [ x.setEnabled(False) for x in account_row]
                 disabled.append(account_row)
             else:
@@ -47,10 +47,9 @@ class DialogImportAccount():
         import_accounts_list.resizeColumnToContents(0)
 
         def import_accounts():
-            selected_accounts = import_accounts_list.selectionModel().selectedRows()
-            for account in selected_accounts:
-                self.switcher.add_account(account.data(0))
-            self.steamapi_refresh()
+            login_names = [account.data(0) for account in import_accounts_list.selectionModel().selectedRows()]
+            self.run_task("import", _("Importing accounts"), self.import_accounts, login_names,
+                          on_done=self.accounts_imported)
             self.import_accounts_window.hide()
 
         def button_enabled():
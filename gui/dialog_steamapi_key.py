@@ -35,8 +35,9 @@ class DialogSteamapiKey:
             save_button.setEnabled(self.is_valid_steampi_key(apikey_edit.text()))
 
         def save():
-            self.switcher.settings["steam_api_key"] = apikey_edit.text()
-            self.switcher.settings_write()
+            with self.switcher.command_lock:
+                self.switcher.settings["steam_api_key"] = apikey_edit.text()
+                self.switcher.settings_write()
             self.steamapi_window.hide()
             if self.switcher.first_run:
                 self.import_accounts_dialog()
@@ -0,0 +1,47 @@
+from PySide2.QtCore import QObject, Signal
+
+from filewatcher import FileWatcher
+import profiling
+from ._i18n import _
+
+
+class FileSyncBridge(QObject):
+    """
+    Carries the changed paths from the watcher thread to the GUI thread
+    """
+    changed = Signal(object)
+
+
+class FileSync:
+    file_watcher: FileWatcher = None
+    file_sync_bridge: FileSyncBridge
+
+    def start_file_sync(self):
+        """
+        Watch loginusers.vdf, registry.vdf and the skins dir, changes are applied without a full refresh
+        """
+        if not self.switcher.settings.get("watch_steam_files", True):
+            return
+        with profiling.span("start file sync") as span:
+            self.switcher.sync_baseline()
+            self.file_sync_bridge = FileSyncBridge(self)
+            self.file_sync_bridge.changed.connect(self.steam_files_changed)
+            self.file_watcher = FileWatcher(self.switcher.watched_paths(), self.file_sync_bridge.changed.emit).start()
+            span.set(backend=self.file_watcher.backend)
+
+    def stop_file_sync(self):
+        if self.file_watcher is not None:
+            self.file_watcher.stop()
+            self.file_watcher = None
+
+    def steam_files_changed(self, paths):
+        with profiling.span("steam files changed", paths=len(paths)) as span, self.switcher.command_lock:
+            delta = self.switcher.sync_steam_files(paths)
+            span.set(**{key: value for key, value in delta.items() if value})
+        for login_name in delta["accounts"]:
+            self.accounts_model.account_changed(login_name)
+        if delta["new_logins"]:
+            self.tray_icon.showMessage(_("New steam login"),
+                                       _("{0} can be imported from File > Import accounts").format(
+                                           ", ".join(delta["new_logins"])),
+                                       self.switcher_logo)
@@ -0,0 +1,43 @@
+import time
+
+import profiling
+from ._i18n import _
+
+RECENT_GAMES = 10
+
+
+class Games:
+    """
+    Games index of the accounts, updated in the background on start and used by "app:" searches and the right
+    click menu
+    """
+    def start_games_index(self):
+        if not self.switcher.settings.get("index_games", True):
+            return
+        self.run_task("games_index", _("Indexing games"), self.index_games, on_done=self.games_indexed)
+
+    def index_games(self, task) -> int:
+        return self.switcher.update_games_index(lambda done, total: task.progress(done, total))
+
+    def games_indexed(self, files_read: int):
+        files, apps, accounts, _ = self.switcher.get_games_index().maps
+        profiling.counter("games index", games=len(apps), accounts=len(accounts), files=len(files),
+                          files_read=files_read)
+        if files_read:
+            self.update_account_filter()
+
+    def recent_games(self, login_name: str) -> list:
+        """
+        Menu texts of the games of login_name, most recently played first
+        """
+        uid = self.switcher.users.get(login_name, {}).get("steam_uid")
+        if not uid or self.switcher.games_index is None:
+            return []
+        index = self.switcher.games_index
+        r = []
+        for appid, installed, last_played, _playtime in index.games_of(uid)[:RECENT_GAMES]:
+            text = index.name(appid)
+            if last_played:
+                text += " ({0})".format(time.strftime("%Y-%m-%d", time.localtime(last_played)))
+            r.append(text + (" " + _("installed") if installed else ""))
+        return r
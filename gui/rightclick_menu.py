@@ -2,6 +2,7 @@ from PySide2.QtGui import QCursor, QIcon
 from PySide2.QtWidgets import QMenu, QAction, QActionGroup
 
 from ._i18n import _
+from .account_model import LoginNameRole
 
 
 class RightClickMenu:
@@ -13,15 +14,14 @@ class RightClickMenu:
 
         right_menu = QMenu()
 
-        selected = self.accounts_list.currentItem()
-        if not self.accounts_list.selectedItems():
+        if not self.accounts_list.selectionModel().hasSelection():
             add_account_action = QAction(_("Add account"), self)
             add_account_action.triggered.connect(lambda: self.account_dialog(True))
             right_menu.addAction(add_account_action)
             right_menu.exec_(QCursor.pos())
             return
-        login_name = selected.data(5)
-        account = self.switcher.settings["users"].get(login_name, {})
+        login_name = self.accounts_list.currentIndex().data(LoginNameRole)
+        account = self.switcher.users.get(login_name, {})
 
         login_action = QAction(_("Login"), self)
         edit_action = QAction(_("Edit"), self)
@@ -38,6 +38,12 @@ class RightClickMenu:
         right_menu.addAction(open_profile_action)
         right_menu.addMenu(steampage_menu)
 
+        recent_games = self.recent_games(login_name)
+        if recent_games:
+            games_menu = right_menu.addMenu(_("Games"))
+            for text in recent_games:
+                games_menu.addAction(text).setEnabled(False)
+
         login_action.triggered.connect(lambda: self.steam_login(login_name))
         edit_action.triggered.connect(lambda: self.account_dialog())
         delete_action.triggered.connect(lambda: self.remove_account(login_name))
@@ -54,5 +60,4 @@ class RightClickMenu:
             open_profile_action.setEnabled(True)
             steampage_menu.addActions([steampage_menu_inventory])
 
-        if self.accounts_list.selectedItems():
-            right_menu.exec_(QCursor.pos())
+        right_menu.exec_(QCursor.pos())
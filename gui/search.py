@@ -0,0 +1,165 @@
+from PySide2.QtCore import QEvent, QObject, QPoint, Qt
+from PySide2.QtGui import QCursor, QIcon, QKeySequence
+from PySide2.QtWidgets import QApplication, QLineEdit, QListWidget, QListWidgetItem, QShortcut, QVBoxLayout, QWidget
+
+import profiling
+from ._i18n import _
+from .account_model import LoginNameRole
+
+QUICK_SWITCH_RESULTS = 20
+
+
+class SearchKeyFilter(QObject):
+    """
+    Keys typed in the accounts list go to the filter box, up and down in the filter box move through the list and
+    escape clears it
+    """
+    def __init__(self, search_box: QLineEdit, accounts_list, parent=None):
+        QObject.__init__(self, parent)
+        self.search_box = search_box
+        self.accounts_list = accounts_list
+
+    def eventFilter(self, watched, event):
+        if event.type() != QEvent.KeyPress:
+            return False
+        if watched is self.search_box and event.key() in (Qt.Key_Down, Qt.Key_Up, Qt.Key_PageDown, Qt.Key_PageUp):
+            self.accounts_list.setFocus()
+            if not self.accounts_list.currentIndex().isValid() and self.accounts_list.model().rowCount():
+                self.accounts_list.setCurrentIndex(self.accounts_list.model().index(0))
+            QApplication.sendEvent(self.accounts_list, event)
+            return True
+        if watched is self.search_box and event.key() == Qt.Key_Escape and self.search_box.text():
+            self.search_box.clear()
+            return True
+        # Shortcuts with ctrl don't have printable text
+        if watched is self.accounts_list and event.text().isprintable() and event.text().strip():
+            self.search_box.setFocus()
+            self.search_box.insert(event.text())
+            return True
+        return False
+
+
+class QuickSwitch(QWidget):
+    """
+    Popup with a search box and the best matching accounts, enter logs in with the selected one
+    """
+    def __init__(self, gui):
+        QWidget.__init__(self, None, Qt.Popup)
+        self.gui = gui
+        self.setMinimumWidth(280)
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText(_("Login with..."))
+        self.results = QListWidget()
+        self.results.setUniformItemSizes(True)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(self.search_box)
+        layout.addWidget(self.results)
+        self.setLayout(layout)
+
+        self.search_box.textChanged.connect(self.search)
+        self.search_box.returnPressed.connect(self.login)
+        self.results.itemActivated.connect(lambda item: self.login())
+
+    def popup(self):
+        self.search_box.clear()
+        self.search("")
+        self.adjustSize()
+        position = QCursor.pos()
+        screen = QApplication.desktop().availableGeometry(position)
+        self.move(QPoint(max(screen.left(), min(position.x(), screen.right() - self.width())),
+                         max(screen.top(), min(position.y(), screen.bottom() - self.height()))))
+        self.show()
+        self.activateWindow()
+        self.search_box.setFocus()
+
+    @profiling.traced("QuickSwitch.search")
+    def search(self, text: str):
+        switcher = self.gui.switcher
+        show_avatars = switcher.settings.get("show_avatars")
+        self.results.clear()
+        for login_name in switcher.find_accounts(text, QUICK_SWITCH_RESULTS):
+            user = switcher.users.get(login_name, {})
+            item = QListWidgetItem("{0} ({1})".format(user.get("steam_name", login_name), login_name))
+            item.setData(Qt.UserRole, login_name)
+            if show_avatars:
+                avatar_path = switcher.avatar_path(login_name)
+                pixmap = self.gui.avatar_cache.get(avatar_path, 20) if avatar_path else None
+                item.setIcon(QIcon(pixmap) if pixmap else self.gui.default_tray_avatar())
+            self.results.addItem(item)
+        if self.results.count():
+            self.results.setCurrentRow(0)
+
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key_Down, Qt.Key_Up) and self.results.count():
+            step = 1 if event.key() == Qt.Key_Down else -1
+            self.results.setCurrentRow((self.results.currentRow() + step) % self.results.count())
+        elif event.key() == Qt.Key_Escape:
+            self.hide()
+        else:
+            QWidget.keyPressEvent(self, event)
+
+    def login(self):
+        item = self.results.currentItem()
+        if item is None:
+            return
+        self.hide()
+        self.gui.steam_login(item.data(Qt.UserRole), True)
+
+
+class Search:
+    """
+    Filter box above the accounts list and the tray quick switch, both backed by switcher.get_search_index()
+    """
+    search_box: QLineEdit
+    search_key_filter: SearchKeyFilter
+    quick_switch: QuickSwitch = None
+
+    def start_search(self):
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText(_("Search accounts"))
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.setToolTip(_("app:<appid or game name> shows the accounts that have the game"))
+        self.layout.insertWidget(0, self.search_box)
+        self.search_key_filter = SearchKeyFilter(self.search_box, self.accounts_list, self)
+        self.search_box.installEventFilter(self.search_key_filter)
+        self.accounts_list.installEventFilter(self.search_key_filter)
+
+        self.search_box.textChanged.connect(lambda text: self.filter_accounts())
+        self.search_box.returnPressed.connect(self.login_with_filtered)
+        QShortcut(QKeySequence("Ctrl+F"), self, self.focus_search)
+
+    def focus_search(self):
+        self.search_box.setFocus()
+        self.search_box.selectAll()
+
+    @profiling.traced()
+    def filter_accounts(self):
+        """
+        Show the accounts matching the filter box in display order, all of them when it's empty
+        """
+        text = self.search_box.text()
+        if text.strip():
+            self.accounts_model.set_filter(self.switcher.find_accounts(text, ranked=False))
+        else:
+            self.accounts_model.set_filter(None)
+
+    def update_account_filter(self):
+        """
+        Re-apply the filter box after accounts were added, renamed or removed
+        """
+        if self.search_box.text().strip():
+            self.filter_accounts()
+
+    def login_with_filtered(self):
+        index = self.accounts_list.currentIndex()
+        if not index.isValid():
+            index = self.accounts_model.index(0)
+        login_name = index.data(LoginNameRole)
+        if login_name:
+            self.steam_login(login_name)
+
+    def show_quick_switch(self):
+        if self.quick_switch is None:
+            self.quick_switch = QuickSwitch(self)
+        self.quick_switch.popup()
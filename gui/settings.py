@@ -2,17 +2,22 @@ from ._i18n import _
 
 class Settings:
   def set_show_avatars(self):
-    self.switcher.settings["show_avatars"] = not self.switcher.settings.get("show_avatars")
-    self.switcher.settings_write()
-    self.load_accounts()
+    with self.switcher.command_lock:
+      self.switcher.settings["show_avatars"] = not self.switcher.settings.get("show_avatars")
+      self.switcher.settings_write()
+    self.update_account_display()
+    self.load_avatars(self.switcher.users.keys())
 
 
   def set_after_login_action(self, item):
-    self.switcher.settings["behavior_after_login"] = item.data()
-    self.switcher.settings_write()
+    with self.switcher.command_lock:
+      self.switcher.settings["behavior_after_login"] = item.data()
+      self.switcher.settings_write()
 
 
   def set_size(self, size):
-    self.switcher.settings["display_size"] = size
-    self.switcher.settings_write()
-    self.load_accounts()
+    with self.switcher.command_lock:
+      self.switcher.settings["display_size"] = size
+      self.switcher.settings_write()
+    self.update_account_display()
+    self.load_avatars(self.switcher.users.keys())
@@ -0,0 +1,72 @@
+from PySide2.QtCore import QObject, QPoint, Qt, Signal
+
+import profiling
+from refreshscheduler import RefreshScheduler
+from .account_model import LoginNameRole
+
+
+class SummaryRefreshBridge(QObject):
+    """
+    Carries the refreshed login names from the scheduler thread to the GUI thread
+    """
+    refreshed = Signal(object)
+
+
+class SummaryRefresh:
+    refresh_scheduler: RefreshScheduler = None
+    summary_refresh_bridge: SummaryRefreshBridge = None
+
+    def get_refresh_scheduler(self) -> RefreshScheduler:
+        if self.summary_refresh_bridge is None:
+            self.summary_refresh_bridge = SummaryRefreshBridge(self)
+            self.summary_refresh_bridge.refreshed.connect(self.summaries_refreshed, Qt.QueuedConnection)
+            self.refresh_scheduler = self.switcher.get_refresh_scheduler()
+            self.refresh_scheduler.on_refreshed = self.summary_refresh_bridge.refreshed.emit
+        return self.refresh_scheduler
+
+    def start_summary_refresh(self):
+        """
+        Refresh summaries older than the summary_ttl setting in the background, visible accounts first
+        """
+        if not self.switcher.settings.get("auto_refresh", True) or not self.switcher.settings.get("steam_api_key"):
+            return
+        self.get_refresh_scheduler().prioritize(self.visible_login_names())
+        self.refresh_scheduler.start()
+        self.accounts_list.verticalScrollBar().valueChanged.connect(
+            lambda value: self.refresh_scheduler.prioritize(self.visible_login_names()))
+
+    def stop_summary_refresh(self):
+        if self.refresh_scheduler is not None:
+            scheduler = self.refresh_scheduler
+            scheduler.stop()
+            profiling.counter("summary refresh", requests=scheduler.requests, accounts=scheduler.refreshed,
+                              errors=scheduler.errors)
+
+    def visible_login_names(self) -> list:
+        rows = self.accounts_model.rowCount()
+        if not rows:
+            return []
+        viewport = self.accounts_list.viewport()
+        first = self.accounts_list.indexAt(QPoint(1, 1)).row()
+        last = self.accounts_list.indexAt(QPoint(1, viewport.height() - 2)).row()
+        first = max(first, 0)
+        last = rows - 1 if last < 0 else last
+        return [self.accounts_model.index(row).data(LoginNameRole) for row in range(first, last + 1)]
+
+    def refresh_stale_summaries(self, task) -> list:
+        """
+        Task for F5, refresh the stale summaries now or wake up the scheduler thread to do it
+        """
+        scheduler = self.refresh_scheduler
+        if scheduler.running:
+            scheduler.wake()
+            return []
+        refreshed = scheduler.refresh_stale(cancelled=task.cancelled, progress=task.progress)
+        if not refreshed and scheduler.last_error is not None:
+            raise scheduler.last_error
+        return refreshed
+
+    def summaries_refreshed(self, login_names):
+        for login_name in login_names:
+            self.accounts_model.account_changed(login_name)
+        self.load_avatars(login_names)
@@ -7,11 +7,15 @@ from ._i18n import _
 class SystemTray:
     tray_icon: QSystemTrayIcon
     tray_menu: QMenu
+    login_menu: QMenu
+    login_menu_version: tuple = None
+    _default_tray_avatar: QIcon = None
 
     def set_use_systemtray(self):
         use_systemtray = not self.switcher.settings.get("use_systemtray")
-        self.switcher.settings["use_systemtray"] = use_systemtray
-        self.switcher.settings_write()
+        with self.switcher.command_lock:
+            self.switcher.settings["use_systemtray"] = use_systemtray
+            self.switcher.settings_write()
         if use_systemtray:
             self.tray_icon.show()
         else:
@@ -22,36 +26,56 @@ class SystemTray:
         self.tray_icon = QSystemTrayIcon(QIcon("logo.png"))
         self.tray_icon.setToolTip(_("Program to quickly switch between steam accounts"))
 
-        login_menu = QMenu(_("Login with"))
-        self.tray_menu.addMenu(login_menu)
+        self.tray_menu.addAction(_("Quick switch"), lambda: self.show_quick_switch())
+        self.login_menu = QMenu(_("Login with"))
+        self.login_menu.aboutToShow.connect(self.populate_login_menu)
+        self.tray_menu.addMenu(self.login_menu)
+        #self.tray_menu.addMenu(TopBar.settings_menu)
+        self.tray_menu.addSeparator()
+        self.tray_menu.addAction(_("Exit"), self.exit_app)
+        self.tray_icon.setContextMenu(self.tray_menu)
 
-        def populate_login_menu():
-            login_menu.clear()
-            menu_accounts = []
-            accounts, avatars = self.load_accounts(no_populate=True)
-            if not accounts:
-                login_menu.setEnabled(False)
-            else:
-                login_menu.setEnabled(True)
-                for login_name, user in accounts:
-                    menu_accounts.append(QAction(user.get("steam_name", login_name), self, data=str(login_name)))
-                    menu_accounts[-1].setToolTip("Login with {0}".format(login_name))
-                    if self.switcher.settings["show_avatars"]:
-                        menu_accounts[-1].setIcon(QIcon(avatars.get(login_name, self.switcher.default_avatar)))
-                    menu_accounts[-1].triggered.connect(lambda: self.steam_login(str(menu_accounts[-1].data()), True))
-                login_menu.addActions(menu_accounts)
-
-        def activated(reason):
-            #self.tray_menu.addMenu(TopBar.settings_menu)
-            self.tray_menu.addSeparator()
-            self.tray_menu.addAction(_("Exit"), self.exit_app)
-            self.tray_icon.setContextMenu(self.tray_menu)
-            if reason == QSystemTrayIcon.Trigger:
-                if self.isVisible():
-                    self.hide()
-                else:
-                    self.show()
-            else:
-                populate_login_menu()
+        self.tray_icon.activated.connect(self.tray_activated)
+
+    def populate_login_menu(self):
+        """
+        Rebuild the login menu from the accounts snapshot, only when accounts, avatars or settings have changed
+        """
+        snapshot_version, accounts = self.switcher.accounts_snapshot()
+        show_avatars = self.switcher.settings["show_avatars"]
+        version = (snapshot_version, show_avatars, self.avatar_cache.generation if show_avatars else 0)
+        if version == self.login_menu_version:
+            return
+        self.login_menu_version = version
+
+        self.login_menu.clear()
+        if not accounts:
+            self.login_menu.setEnabled(False)
+            return
+        self.login_menu.setEnabled(True)
+        menu_accounts = []
+        for login_name, name, avatar_path in accounts:
+            action = QAction(name, self, data=login_name)
+            action.setToolTip("Login with {0}".format(login_name))
+            if show_avatars:
+                pixmap = self.avatar_cache.get(avatar_path, 20) if avatar_path else None
+                action.setIcon(QIcon(pixmap) if pixmap else self.default_tray_avatar())
+            action.triggered.connect(lambda checked=False, name=login_name: self.steam_login(name, True))
+            menu_accounts.append(action)
+        self.login_menu.addActions(menu_accounts)
 
-        self.tray_icon.activated.connect(activated)
+    def default_tray_avatar(self) -> QIcon:
+        if self._default_tray_avatar is None:
+            self._default_tray_avatar = self.avatar_cache.icon(self.switcher.default_avatar, 20)
+        return self._default_tray_avatar
+
+    def tray_activated(self, reason):
+        if reason == QSystemTrayIcon.Trigger:
+            if self.isVisible():
+                self.hide()
+            else:
+                self.show()
+        elif reason == QSystemTrayIcon.MiddleClick:
+            self.show_quick_switch()
+        else:
+            self.populate_login_menu()
@@ -0,0 +1,205 @@
+import threading
+import time
+
+from PySide2.QtCore import QObject, QRunnable, QThreadPool, QTimer, Qt, Signal
+from PySide2.QtWidgets import QLabel, QProgressBar, QPushButton
+
+import profiling
+from ._i18n import _
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class Task(QRunnable):
+    """
+    fn(task, *args) on the global QThreadPool.
+
+    fn reports progress with task.progress() and checks task.cancelled between steps, raise_if_cancelled()
+    ends it early. result or error are set when done is emitted on the GUI thread.
+    """
+    def __init__(self, runner, key, label, fn, args, on_done, on_error):
+        QRunnable.__init__(self)
+        self.setAutoDelete(False)
+        self.runner = runner
+        self.key = key
+        self.label = label
+        self.fn = fn
+        self.args = args
+        self.on_done = [on_done] if on_done else []
+        self.on_error = [on_error] if on_error else []
+        self.cancelled = threading.Event()
+        self.result = None
+        self.error = None
+        self.done_count = 0
+        self.total = 0
+        self.text = ""
+        self.started = None
+        self.elapsed_ms = None
+
+    def run(self):
+        self.started = time.perf_counter()
+        try:
+            # The span records the duration and, for cancelled and failed tasks, the exception type
+            with profiling.span("task " + self.label):
+                self.raise_if_cancelled()
+                self.result = self.fn(self, *self.args)
+        except Exception as e:
+            self.error = e
+        self.elapsed_ms = (time.perf_counter() - self.started) * 1000
+        self.runner.done.emit(self)
+
+    def progress(self, done: int, total: int, text: str = ""):
+        self.done_count, self.total, self.text = done, total, text
+        self.runner.progressed.emit(self)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled.is_set():
+            raise TaskCancelled(self.label)
+
+
+class TaskRunner(QObject):
+    """
+    Runs blocking SteamSwitcher work off the GUI thread.
+
+    A task submitted while one with the same key is running is not started again, its callbacks are added to the
+    running one. Callbacks and the signals run on the GUI thread.
+    """
+    done = Signal(object)
+    progressed = Signal(object)
+    changed = Signal()
+
+    def __init__(self, parent=None):
+        QObject.__init__(self, parent)
+        self.tasks = {}
+        self.finished = 0
+        self.deduplicated = 0
+        self.done.connect(self._task_done, Qt.QueuedConnection)
+        self.progressed.connect(lambda task: self.changed.emit(), Qt.QueuedConnection)
+
+    def submit(self, key, label: str, fn, *args, on_done=None, on_error=None) -> Task:
+        task = self.tasks.get(key)
+        if task is not None and not task.cancelled.is_set():
+            self.deduplicated += 1
+            task.on_done += [on_done] if on_done else []
+            task.on_error += [on_error] if on_error else []
+            return task
+        task = Task(self, key, label, fn, args, on_done, on_error)
+        self.tasks[key] = task
+        QThreadPool.globalInstance().start(task)
+        self.changed.emit()
+        return task
+
+    def cancel(self, key=None):
+        """
+        Cancel the task with key, or all tasks
+        """
+        for task_key, task in list(self.tasks.items()):
+            if key is None or task_key == key:
+                task.cancel()
+        self.changed.emit()
+
+    def _task_done(self, task: Task):
+        if self.tasks.get(task.key) is task:
+            del self.tasks[task.key]
+        self.finished += 1
+        if task.error is None:
+            for callback in task.on_done:
+                callback(task.result)
+        elif not isinstance(task.error, TaskCancelled):
+            for callback in task.on_error:
+                callback(task.error)
+        self.changed.emit()
+
+    def wait(self, timeout_ms: int = -1) -> bool:
+        return QThreadPool.globalInstance().waitForDone(timeout_ms)
+
+
+class EventLoopMonitor(QObject):
+    """
+    Measures how long the GUI thread was blocked from the lateness of a repeating timer, stalls are recorded as
+    profiling counters
+    """
+    def __init__(self, interval_ms: int = 50, threshold_ms: float = 100, parent=None):
+        QObject.__init__(self, parent)
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self.max_lag_ms = 0.0
+        self.blocked_ms = 0.0
+        self.stalls = 0
+        self.last = None
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.timer.start(self.interval_ms)
+        return self
+
+    def stop(self):
+        self.timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        lag = (now - self.last) * 1000 - self.interval_ms
+        self.last = now
+        self.max_lag_ms = max(self.max_lag_ms, lag)
+        if lag >= self.threshold_ms:
+            self.stalls += 1
+            self.blocked_ms += lag
+            profiling.counter("event loop stall ms", lag=lag)
+
+    def stats(self) -> str:
+        return "event loop: {0} stalls over {1:.0f} ms, {2:.0f} ms blocked, longest {3:.0f} ms".format(
+            self.stalls, self.threshold_ms, self.blocked_ms, self.max_lag_ms)
+
+
+class Tasks:
+    """
+    Background tasks with their progress and a cancel button in the status bar
+    """
+    task_runner: TaskRunner = None
+    event_loop_monitor: EventLoopMonitor = None
+
+    def start_tasks(self):
+        self.task_runner = TaskRunner(self)
+        self.task_runner.changed.connect(self.tasks_changed)
+        self.task_label = QLabel()
+        self.task_progress = QProgressBar()
+        self.task_progress.setMaximumWidth(100)
+        self.task_cancel_button = QPushButton(_("Cancel"))
+        self.task_cancel_button.clicked.connect(lambda: self.task_runner.cancel())
+        status_bar = self.statusBar()
+        status_bar.addWidget(self.task_label, 1)
+        status_bar.addPermanentWidget(self.task_progress)
+        status_bar.addPermanentWidget(self.task_cancel_button)
+        self.tasks_changed()
+        if self.switcher.settings.get("monitor_event_loop", True):
+            self.event_loop_monitor = EventLoopMonitor(parent=self).start()
+
+    def stop_tasks(self):
+        if self.task_runner is not None:
+            self.task_runner.cancel()
+        if self.event_loop_monitor is not None:
+            self.event_loop_monitor.stop()
+            monitor = self.event_loop_monitor
+            profiling.counter("event loop", stalls=monitor.stalls, blocked_ms=monitor.blocked_ms,
+                              max_lag_ms=monitor.max_lag_ms)
+
+    def run_task(self, key, label: str, fn, *args, on_done=None, on_error=None) -> Task:
+        return self.task_runner.submit(key, label, fn, *args, on_done=on_done, on_error=on_error)
+
+    def tasks_changed(self):
+        tasks = list(self.task_runner.tasks.values())
+        self.statusBar().setVisible(bool(tasks))
+        if not tasks:
+            return
+        task = tasks[-1]
+        self.task_label.setText(task.text or task.label)
+        self.task_progress.setRange(0, task.total)
+        self.task_progress.setValue(task.done_count)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Partial reader for userdata/<account id>/config/localconfig.vdf, steam's per account settings.
+
+The files are often several MB, mostly chat, broadcast and cloud state. Only the friends and apps subtrees are
+read with vdf.extract, the rest is skipped by counting braces.
+"""
+import vdf
+
+PERSONA_NAME = "UserLocalConfigStore.friends.PersonaName"
+FRIENDS = "UserLocalConfigStore.friends"
+APPS = "UserLocalConfigStore.Software.Valve.Steam.apps"
+
+
+def _int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse(extracted: dict) -> dict:
+    """
+    Compact form of the extracted subtrees:
+    {"persona_name": str, "friends": {account id: name}, "apps": {appid: {"last_played", "playtime", "launch_options"}}}
+    """
+    friends = extracted.get(FRIENDS)
+    friends = friends if isinstance(friends, dict) else {}
+    apps = extracted.get(APPS)
+    apps = apps if isinstance(apps, dict) else {}
+    r = {
+        "persona_name": next((value for key, value in friends.items()
+                              if key.lower() == "personaname" and isinstance(value, str)), None),
+        "friends": {key: friend.get("name", "") for key, friend in friends.items()
+                    if key.isdigit() and isinstance(friend, dict)},
+        "apps": {},
+    }
+    for appid, app in apps.items():
+        if not appid.isdigit() or not isinstance(app, dict):
+            continue
+        values = {key.lower(): value for key, value in app.items() if isinstance(value, str)}
+        r["apps"][appid] = {"last_played": _int(values.get("lastplayed")), "playtime": _int(values.get("playtime")),
+                            "launch_options": values.get("launchoptions", "")}
+    return r
+
+
+def read(path: str) -> dict:
+    """
+    Persona name, friends and per app settings of the localconfig.vdf at path, see parse
+    """
+    return parse(vdf.extract(path, [FRIENDS, APPS]))
+
+
+def read_persona_name(path: str):
+    """
+    Only the persona name, reading stops right after it
+    """
+    return vdf.extract(path, [PERSONA_NAME]).get(PERSONA_NAME)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Confirm that steam logged in to an account after a switch, from steam's connection log and loginusers.vdf.
+"""
+import os
+import re
+import threading
+import time
+
+from filewatcher import FileWatcher
+from steamid import account_id_to_steamid64
+
+# "[2021-03-01 12:00:00] [U:1:22202] Logged On" style lines of logs/connection_log.txt
+_LOGGED_ON = re.compile(r"\[U:1:(\d+)\].*\blogged on\b|\blogged on\b.*\[U:1:(\d+)\]", re.I)
+
+
+class LogTail:
+    """
+    Returns the lines appended to a log file since the last read, starting at the end of the file.
+
+    A replaced or truncated file is read again from the start.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self.inode = None
+        self.partial = b""
+
+    def seek_end(self):
+        try:
+            stat = os.stat(self.path)
+            self.inode, self.offset = stat.st_ino, stat.st_size
+        except OSError:
+            self.inode, self.offset = None, 0
+        self.partial = b""
+
+    def read_lines(self) -> list:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return []
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.inode, self.offset, self.partial = stat.st_ino, 0, b""
+        if stat.st_size == self.offset:
+            return []
+        with open(self.path, "rb") as log_file:
+            log_file.seek(self.offset)
+            data = self.partial + log_file.read()
+        self.offset = stat.st_size
+        lines = data.split(b"\n")
+        self.partial = lines.pop()
+        return [line.decode("utf-8", "replace") for line in lines]
+
+
+class LoginResult:
+    def __init__(self, login_name: str):
+        self.login_name = login_name
+        self.ok = False
+        self.steam_uid = None
+        self.source = None
+        self.error = None
+        self.elapsed_ms = None
+
+    def __str__(self):
+        if self.ok:
+            return "Logged in as {0} in {1:.0f} ms ({2})".format(self.login_name, self.elapsed_ms, self.source)
+        return "Login as {0} not confirmed: {1}".format(self.login_name, self.error)
+
+
+class LoginWatcher:
+    """
+    Waits for steam to log in to login_name.
+
+    start() before switching remembers the log offsets, wait() then only reads what steam appends
+    and wakes up on file changes, polling is the fallback.
+    """
+    def __init__(self, switcher, login_name: str, poll_interval: float = 1.0):
+        self.switcher = switcher
+        self.login_name = login_name
+        self.poll_interval = poll_interval
+        self.logs_dir = os.path.join(switcher.steam_linux_dir if switcher.system_os == "Linux"
+                                     else switcher.steam_dir, "logs")
+        self.log = LogTail(os.path.join(self.logs_dir, "connection_log.txt"))
+        self.changed = threading.Event()
+        self.file_watcher = None
+        self.started = None
+        self.started_time = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.started_time = int(time.time())
+        self.log.seek_end()
+        self.file_watcher = FileWatcher([self.log.path, self.switcher.loginusers_path],
+                                        lambda paths: self.changed.set(), delay=0.05,
+                                        poll_interval=self.poll_interval).start()
+        return self
+
+    def stop(self):
+        if self.file_watcher is not None:
+            self.file_watcher.stop()
+            self.file_watcher = None
+
+    def _check_log(self):
+        """
+        SteamID64 of the account steam logged on to, None if nothing new was logged
+        """
+        logged_on = None
+        for line in self.log.read_lines():
+            match = _LOGGED_ON.search(line)
+            if match:
+                logged_on = account_id_to_steamid64(match.group(1) or match.group(2))
+        return logged_on
+
+    def _check_loginusers(self):
+        """
+        SteamID64 of the MostRecent account if steam updated it since start()
+        """
+        for uid, steam_user in (self.switcher.load_loginusers() or {}).items():
+            timestamp = steam_user.get("Timestamp", "")
+            if steam_user.get("MostRecent") == "1" and timestamp.isdigit() and int(timestamp) >= self.started_time:
+                return uid
+        return None
+
+    def wait(self, timeout: float = 120, cancelled: threading.Event = None) -> LoginResult:
+        result = LoginResult(self.login_name)
+        deadline = time.monotonic() + timeout
+        expected_uid = self.switcher.loginusers_index.get(self.login_name) or \
+            self.switcher.users.get(self.login_name, {}).get("steam_uid")
+        try:
+            while True:
+                self.changed.clear()
+                for source, uid in (("connection_log", self._check_log()), ("loginusers", self._check_loginusers())):
+                    if uid is None:
+                        continue
+                    login_name = self.switcher.find_login_name(uid)
+                    if uid == expected_uid or login_name == self.login_name:
+                        result.ok = True
+                    else:
+                        result.error = "steam logged in as {0}".format(login_name or uid)
+                    result.steam_uid = uid
+                    result.source = source
+                    result.elapsed_ms = (time.perf_counter() - self.started) * 1000
+                    return result
+                remaining = deadline - time.monotonic()
+                if cancelled is not None and cancelled.is_set():
+                    result.error = "cancelled"
+                    return result
+                if remaining <= 0:
+                    result.error = "no login within {0} s".format(timeout)
+                    return result
+                self.changed.wait(min(remaining, self.poll_interval))
+        finally:
+            self.stop()
@@ -2,11 +2,22 @@
 # -*- coding: utf-8 -*-
 import sys
 
-from PySide2.QtWidgets import QApplication
-
-import gui
+import profiling
+from steamswitcher import build_parser, forward_to_daemon, SteamSwitcher
 
 if __name__ == "__main__":
+    args = build_parser().parse_args()
+    profiling.enable_from(args)
+    exit_code = forward_to_daemon(args, show=True)  # an instance is already running
+    if exit_code is not None:
+        sys.exit(exit_code)
+    if args.no_gui and args.no_tray or args.daemon:  # command line only, don't load Qt
+        sys.exit(SteamSwitcher(args).exit_code)
+
+    from PySide2.QtWidgets import QApplication
+
+    import gui
+
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)
 
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of parsed steam files, invalidated when the file changes on disk.
+"""
+import atexit
+import json
+import os
+import threading
+
+from fileutils import write_atomic
+
+
+class ParseCache:
+    """
+    Keeps loader(path) results keyed on (path, inode, size, mtime_ns), any change of the file
+    or directory at path makes the next get() load it again.
+
+    With cache_file the results are also kept on disk as JSON and shared between runs,
+    loader results have to be JSON serializable then. The file is written on exit or save().
+    """
+    def __init__(self, cache_file: str = None):
+        self.cache_file = cache_file
+        self.entries = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+        if cache_file:
+            atexit.register(self.save)
+
+    @staticmethod
+    def file_key(path: str) -> list:
+        stat = os.stat(path)
+        return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+    def _load_entries(self) -> dict:
+        if self.cache_file:
+            try:
+                with open(self.cache_file, encoding="utf-8") as cache_file:
+                    return {path: (key, value, True) for path, (key, value) in json.load(cache_file).items()}
+            except (OSError, ValueError, TypeError):
+                pass
+        return {}
+
+    def get(self, path: str, loader):
+        """
+        Returns loader(path), parsing the file only if it changed since it was cached.
+
+        Missing files and None results are not cached, loader is called and handles them.
+        """
+        try:
+            key = self.file_key(path)
+        except OSError:
+            return loader(path)
+        with self._lock:
+            if self.entries is None:
+                self.entries = self._load_entries()
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == key:
+                if entry[2]:
+                    self.disk_hits += 1
+                    self.entries[path] = (key, entry[1], False)
+                else:
+                    self.hits += 1
+                return entry[1]
+        value = loader(path)
+        self.misses += 1
+        if value is None:
+            return value
+        with self._lock:
+            self.entries[path] = (key, value, False)
+            self.dirty = True
+        return value
+
+    def invalidate(self, path: str = None):
+        with self._lock:
+            if self.entries is not None:
+                if path is None:
+                    self.entries.clear()
+                else:
+                    self.entries.pop(path, None)
+
+    def save(self):
+        with self._lock:
+            if not self.cache_file or not self.dirty:
+                return
+            self.dirty = False
+            data = {path: [key, value] for path, (key, value, _) in self.entries.items()}
+        try:
+            write_atomic(self.cache_file, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        except (OSError, TypeError) as e:
+            print("Parse cache write error\n{0}".format(e))
+
+    def stats(self) -> str:
+        return "parse cache: {0} hits, {1} from disk, {2} misses".format(self.hits, self.disk_hits, self.misses)
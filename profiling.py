@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Timing spans written as Chrome trace events (chrome://tracing, ui.perfetto.dev), with optional cProfile and
+tracemalloc dumps.
+
+Enabled with --profile [TRACE_JSON] or STEAM_SWITCHER_PROFILE=TRACE_JSON (1 for the default path),
+--profile-cpu / STEAM_SWITCHER_PROFILE_CPU=1 and --profile-memory / STEAM_SWITCHER_PROFILE_MEMORY=1 add
+TRACE_JSON.prof and TRACE_JSON.memory.txt. Disabled, span() returns a shared no-op and traced functions
+only check a flag.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+DEFAULT_TRACE = "profile-trace.json"
+
+enabled = False
+trace_path = None
+_events = []
+_thread_names = {}
+_cpu_profile = None
+_memory = False
+_start = time.perf_counter()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+        self.begin = None
+
+    def __enter__(self):
+        self.begin = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        thread = threading.current_thread()
+        _thread_names[thread.ident] = thread.name
+        # list.append is atomic, spans from every thread go to the same list
+        _events.append({"name": self.name, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                        "ts": (self.begin - _start) * 1e6, "dur": (end - self.begin) * 1e6, "args": self.args})
+        return False
+
+    def set(self, **args):
+        """
+        Add args to the span, e.g. counts only known at the end
+        """
+        self.args.update(args)
+
+
+def span(name: str, **args):
+    """
+    with span("name", key=value): times the block
+    """
+    if not enabled:
+        return _NULL_SPAN
+    return Span(name, args)
+
+
+def counter(name: str, **values):
+    """
+    Record numeric values at this point in time, drawn as a graph in the trace
+    """
+    if not enabled:
+        return
+    _events.append({"name": name, "ph": "C", "pid": os.getpid(), "ts": (time.perf_counter() - _start) * 1e6,
+                    "args": values})
+
+
+def traced(name: str = None):
+    """
+    Decorator that times every call of the function, named after its __qualname__ by default
+    """
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable(path: str = DEFAULT_TRACE, cpu=False, memory=False):
+    """
+    Start recording, everything is written when the process exits
+    """
+    global enabled, trace_path, _cpu_profile, _memory
+    if enabled:
+        return
+    enabled = True
+    trace_path = os.path.abspath(path)
+    if cpu:
+        import cProfile
+        _cpu_profile = cProfile.Profile()
+        _cpu_profile.enable()
+    if memory:
+        import tracemalloc
+        tracemalloc.start(25)
+        _memory = True
+    atexit.register(write)
+
+
+def enable_from(args=None):
+    """
+    Enable from the --profile arguments or the STEAM_SWITCHER_PROFILE environment variables
+    """
+    path = getattr(args, "profile", None) or os.environ.get("STEAM_SWITCHER_PROFILE")
+    if not path:
+        return
+    enable(DEFAULT_TRACE if path == "1" else path,
+           cpu=getattr(args, "profile_cpu", False) or os.environ.get("STEAM_SWITCHER_PROFILE_CPU") == "1",
+           memory=getattr(args, "profile_memory", False) or os.environ.get("STEAM_SWITCHER_PROFILE_MEMORY") == "1")
+
+
+def summary(limit: int = 15) -> list:
+    """
+    (name, calls, total ms, max ms) of the slowest spans by total time
+    """
+    totals = {}
+    for event in list(_events):
+        if event["ph"] != "X":
+            continue
+        calls, total, longest = totals.get(event["name"], (0, 0.0, 0.0))
+        totals[event["name"]] = calls + 1, total + event["dur"] / 1000, max(longest, event["dur"] / 1000)
+    return sorted(((name,) + value for name, value in totals.items()), key=lambda row: -row[2])[:limit]
+
+
+def write():
+    global _cpu_profile
+    if not enabled:
+        return
+    pid = os.getpid()
+    events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+              for tid, thread_name in _thread_names.items()]
+    try:
+        with open(trace_path, "w", encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": events + list(_events), "displayTimeUnit": "ms"}, trace_file)
+    except OSError as e:
+        print("Profile write error\n{0}".format(e))
+        return
+    print("Profile: {0} spans in {1}".format(len(_events), trace_path))
+    for name, calls, total, longest in summary():
+        print("  {0:<45} {1:>6} calls {2:>9.1f} ms  max {3:>8.1f} ms".format(name, calls, total, longest))
+    if _cpu_profile is not None:
+        _cpu_profile.disable()
+        _cpu_profile.dump_stats(trace_path + ".prof")
+        _cpu_profile = None
+        print("Profile: cProfile stats in {0}.prof".format(trace_path))
+    if _memory:
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        with open(trace_path + ".memory.txt", "w", encoding="utf-8") as memory_file:
+            memory_file.write("current {0:.1f} MiB, peak {1:.1f} MiB\n\n".format(current / 2 ** 20, peak / 2 ** 20))
+            for stat in snapshot.statistics("lineno")[:30]:
+                memory_file.write("{0}\n".format(stat))
+        print("Profile: tracemalloc top allocations in {0}.memory.txt".format(trace_path))
+
+
+enable_from()
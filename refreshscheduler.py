@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Background refresh of steam web api summaries for accounts older than a TTL.
+"""
+import threading
+import time
+
+import profiling
+from steamapi import SUMMARIES_BATCH_SIZE, SteamApiError
+
+DAILY_QUOTA = 100000  # GetPlayerSummaries calls per api key per day
+
+
+class TokenBucket:
+    """
+    rate tokens per second up to capacity, take() waits until a token is available
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _fill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> float:
+        """
+        Takes a token and returns 0, or returns the seconds until one is available
+        """
+        with self._lock:
+            self._fill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def take(self, stop: threading.Event = None) -> bool:
+        """
+        Waits for a token, returns False if stop was set while waiting
+        """
+        while True:
+            wait = self.try_take()
+            if not wait:
+                return True
+            if stop is not None and stop.wait(wait):
+                return False
+            elif stop is None:
+                time.sleep(wait)
+
+
+class RefreshScheduler:
+    """
+    Refreshes the summaries of accounts whose summary_refreshed is older than ttl seconds.
+
+    Requests are limited by a token bucket sized to the daily quota, 429 and 5xx answers back off
+    exponentially. Accounts passed to prioritize(), recently logged in accounts and then the oldest
+    summaries go first. on_refreshed(login_names) is called from the scheduler thread.
+    """
+    def __init__(self, switcher, ttl: float = 6 * 3600, interval: float = 60, daily_quota: int = DAILY_QUOTA,
+                 burst: int = 10, on_refreshed=None):
+        self.switcher = switcher
+        self.ttl = ttl
+        self.interval = interval
+        self.bucket = TokenBucket(daily_quota / 86400, burst)
+        self.on_refreshed = on_refreshed
+        self.priority = {}  # login_name: expiry
+        self.backoff = 0
+        self.backoff_until = 0
+        self.requests = 0
+        self.refreshed = 0
+        self.errors = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def from_settings(cls, switcher, on_refreshed=None):
+        settings = switcher.settings
+        return cls(switcher, ttl=settings.get("summary_ttl", 6 * 3600),
+                   interval=settings.get("refresh_interval", 60),
+                   daily_quota=settings.get("steam_api_daily_quota", DAILY_QUOTA), on_refreshed=on_refreshed)
+
+    def prioritize(self, login_names, seconds: float = 300):
+        """
+        Refresh login_names first for the next seconds, for visible accounts
+        """
+        expiry = time.monotonic() + seconds
+        with self._lock:
+            for login_name in login_names:
+                self.priority[login_name] = expiry
+
+    def stale_accounts(self, now: float = None) -> list:
+        """
+        Login names with a missing or older than ttl summary, in refresh order
+        """
+        now = time.time() if now is None else now
+        monotonic = time.monotonic()
+        with self._lock:
+            self.priority = {name: expiry for name, expiry in self.priority.items() if expiry > monotonic}
+            priority = set(self.priority)
+        last_login = {steam_user.get("AccountName"): int(steam_user.get("Timestamp", "0") or 0)
+                      for steam_user in (self.switcher.load_loginusers() or {}).values()}
+        stale = [(login_name not in priority, -last_login.get(login_name, 0), user.get("summary_refreshed", 0),
+                  login_name)
+                 for login_name, user in list(self.switcher.users.items())
+                 if user.get("steam_uid") and now - user.get("summary_refreshed", 0) >= self.ttl]
+        return [login_name for *_, login_name in sorted(stale)]
+
+    def refresh_stale(self, limit: int = None, cancelled: threading.Event = None, progress=None) -> list:
+        """
+        Refresh stale accounts now, in batches of 100 as the rate limit allows.
+
+        Returns the refreshed login names, stops early while backing off or when cancelled is set.
+        progress(done, total, text) is called after each batch.
+        """
+        if time.monotonic() < self.backoff_until or not self.switcher.settings.get("steam_api_key"):
+            return []
+        stale = self.stale_accounts()
+        if limit is not None:
+            stale = stale[:limit]
+        refreshed = []
+        for i in range(0, len(stale), SUMMARIES_BATCH_SIZE):
+            if cancelled is not None and cancelled.is_set() or not self.bucket.take(self._stop):
+                break
+            batch = stale[i:i + SUMMARIES_BATCH_SIZE]
+            if not self._refresh_batch(batch):
+                break
+            refreshed += batch
+            if progress is not None:
+                progress(len(refreshed), len(stale), "Refreshed {0}/{1} accounts".format(len(refreshed), len(stale)))
+        return refreshed
+
+    @profiling.traced()
+    def _refresh_batch(self, login_names: list) -> bool:
+        import requests
+
+        uids = [self.switcher.users[name]["steam_uid"] for name in login_names if name in self.switcher.users]
+        self.requests += 1
+        try:
+            players = self.switcher.get_steam_api().get_player_summaries(uids).players
+        except (SteamApiError, requests.RequestException, ValueError) as e:
+            self.errors += 1
+            self.last_error = e
+            status_code = getattr(e, "status_code", None)
+            if status_code is None or status_code == 429 or status_code >= 500:
+                self.backoff = min(max(self.backoff * 2, 30), 3600)
+                self.backoff_until = time.monotonic() + self.backoff
+                print("Summary refresh failed, retrying in {0} s\n{1}".format(self.backoff, e))
+            else:
+                print("Summary refresh failed\n{0}".format(e))
+            return False
+        self.backoff = 0
+        self.last_error = None
+        with self.switcher.command_lock:
+            merged = self.switcher.merge_usersummaries(players)
+            # Accounts the api didn't return are not retried before the ttl either
+            now = int(time.time())
+            missing = [name for name in login_names if name in self.switcher.users and name not in merged]
+            with self.switcher.users.lock, self.switcher.settings_writer.lock:
+                for login_name in missing:
+                    self.switcher.users[login_name]["summary_refreshed"] = now
+                self.switcher.settings["last_refreshed"] = str(now)
+            if missing:
+                self.switcher.users.save(*missing)
+            self.switcher.settings_write()
+        self.refreshed += len(merged)
+        if self.on_refreshed is not None and merged:
+            self.on_refreshed(merged)
+        return True
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="RefreshScheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def wake(self):
+        """
+        Refresh stale accounts now instead of at the next interval
+        """
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_stale()
+            except Exception as e:
+                print("Summary refresh error\n{0}".format(e))
+            self._wake.wait(max(self.interval, self.backoff_until - time.monotonic()))
+            self._wake.clear()
+
+    def stats(self) -> str:
+        return "summary refresh: {0} requests, {1} accounts, {2} errors, backoff {3} s".format(
+            self.requests, self.refreshed, self.errors, self.backoff)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Search over login name, steam name, comment and steam uid of the accounts, for the filter box, the tray
+quick switch and --find.
+"""
+import heapq
+import re
+from operator import itemgetter
+
+_WORD_SEPARATOR = re.compile(r"[\W_]+")
+
+
+def tokenize(text: str) -> list:
+    return [token for token in _WORD_SEPARATOR.split(text.casefold()) if token]
+
+
+def fuzzy_pattern(characters: str):
+    """
+    Regex matching characters in order within one tab separated field, a[^b\t]*b[^c\t]*c doesn't backtrack
+    """
+    parts = [re.escape(characters[0])]
+    for character in characters[1:]:
+        parts.append("[^{0}\t]*{0}".format(re.escape(character)))
+    return re.compile("".join(parts))
+
+
+class SearchIndex:
+    """
+    Substring, word prefix and fuzzy (characters in order) matching of the account fields.
+
+    Each account is kept as casefolded text prepared for str containment tests, sync() re-prepares only the
+    accounts the store reports as changed since the last sync. A query that extends the previous one only searches
+    the previous matches, as when typing into the filter box.
+    """
+    def __init__(self):
+        self.records = {}  # login_name: (fields, display_order, login name, text, " word word ...")
+        self.version = None
+        self._ordered = None
+        self._last_query = None
+        self._last_matches = None
+        self._substring_matches = []
+        self._spans = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    @staticmethod
+    def account_fields(login_name: str, user: dict) -> tuple:
+        return (login_name, str(user.get("steam_name") or ""), str(user.get("comment") or ""),
+                str(user.get("steam_uid") or ""))
+
+    def add(self, login_name: str, user: dict):
+        fields = self.account_fields(login_name, user)
+        display_order = user.get("display_order", 0)
+        record = self.records.get(login_name)
+        if record is not None and record[0] == fields and record[1] == display_order:
+            return
+        text = "\t".join(fields).casefold()
+        words = " " + " ".join(token for field in fields for token in tokenize(field))
+        self.records[login_name] = (fields, display_order, login_name.casefold(), text, words)
+        self._changed()
+
+    def remove(self, login_name: str):
+        if self.records.pop(login_name, None) is not None:
+            self._changed()
+
+    def _changed(self):
+        self._ordered = None
+        self._last_query = self._last_matches = None
+        self._substring_matches = []
+        self._spans = {}
+
+    def sync(self, users) -> int:
+        """
+        Re-index the accounts of users that were added, changed or removed since the last sync, returns how many
+        """
+        version = getattr(users, "version", None)
+        if version is not None and version == self.version:
+            return 0
+        if self.version is not None and version is not None and hasattr(users, "changed_since"):
+            # Only the accounts the store changed since the last sync
+            changed = 0
+            for login_name in users.changed_since(self.version):
+                user = users.get(login_name)
+                if user is None:
+                    changed += login_name in self.records
+                    self.remove(login_name)
+                else:
+                    changed += 1
+                    self.add(login_name, user)
+            self.version = version
+            return changed
+        items = list(users.items())
+        changed = 0
+        for login_name, user in items:
+            record = self.records.get(login_name)
+            if record is None or record[1] != user.get("display_order", 0) or \
+                    record[0] != self.account_fields(login_name, user):
+                self.add(login_name, user)
+                changed += 1
+        # Every account of users is indexed now, anything more was removed or renamed
+        if len(self.records) != len(items):
+            names = {login_name for login_name, _ in items}
+            for login_name in [login_name for login_name in self.records if login_name not in names]:
+                self.remove(login_name)
+                changed += 1
+        self.version = version
+        return changed
+
+    def ordered(self) -> list:
+        if self._ordered is None:
+            self._ordered = sorted(self.records.values(), key=lambda record: (record[1], record[2]))
+        return self._ordered
+
+    def _matches(self, query: str) -> list:
+        """
+        Records matching query in display order, narrowed down from the previous query when it extends it.
+
+        One word matches as a substring, or fuzzily with its characters in order within one field, several words
+        each match as a substring in any order. Sets _spans to {login_name: length of the match} for the records
+        that only match fuzzily.
+        """
+        terms = query.split(" ")
+        candidates = self.ordered()
+        if self._last_query and query.startswith(self._last_query):
+            candidates = self._last_matches
+            if " " in query:
+                # Every previous word is in the non fuzzy matches already, as is any word inside one of them
+                if self._spans:
+                    candidates = [record for record in candidates if record[0][0] not in self._spans]
+                last_terms = self._last_query.split(" ")
+                terms = [term for term in terms if not any(term in last_term for last_term in last_terms)]
+        spans = {}
+        if " " in query:
+            if len(terms) == 1:
+                term = terms[0]
+                matches = substring_matches = [record for record in candidates if term in record[3]]
+            else:
+                matches = substring_matches = [record for record in candidates
+                                               if all(map(record[3].__contains__, terms))]
+        else:
+            hits = [query in record[3] for record in candidates]
+            substring_matches = [record for record, hit in zip(candidates, hits) if hit]
+            if len(query) > 1 and len(substring_matches) < len(candidates):
+                fuzzy = fuzzy_pattern(query).search
+                for record, hit in zip(candidates, hits):
+                    if not hit:
+                        match = fuzzy(record[3])
+                        if match is not None:
+                            spans[record[0][0]] = match.end() - match.start()
+            matches = [record for record, hit in zip(candidates, hits) if hit or record[0][0] in spans] \
+                if spans else substring_matches
+        self._last_query, self._last_matches, self._spans = query, matches, spans
+        self._substring_matches = substring_matches
+        return matches
+
+    def search(self, query: str, limit: int = None, ranked=True) -> list:
+        """
+        Login names matching query. An empty query returns every account in display order.
+
+        ranked puts login names starting with the query first, then accounts with a word starting with each query
+        word, then substring and last fuzzy matches, otherwise they are in display order.
+        """
+        query = " ".join(query.casefold().split())
+        if not query:
+            records = self.ordered()
+        else:
+            records = self._matches(query)
+            if ranked:
+                records = self._rank(query, records, limit)
+        return [record[0][0] for record in (records[:limit] if limit else records)]
+
+    def _rank(self, query: str, records: list, limit: int = None) -> list:
+        # Records are the last _matches(), only substring matches can start with the query or have word prefixes
+        spans = self._spans
+        ranked = [record for record in self._substring_matches if record[2].startswith(query)]
+        if limit and len(ranked) >= limit:
+            return ranked
+        rest = [record for record in self._substring_matches if not record[2].startswith(query)]
+        word_terms = [" " + term for term in tokenize(query)]
+        if len(word_terms) == 1:
+            word_term = word_terms[0]
+            ranked += [record for record in rest if word_term in record[4]]
+            ranked += [record for record in rest if word_term not in record[4]]
+        elif word_terms:
+            words = [all(map(record[4].__contains__, word_terms)) for record in rest]
+            ranked += [record for record, is_word in zip(rest, words) if is_word]
+            ranked += [record for record, is_word in zip(rest, words) if not is_word]
+        else:
+            ranked += rest
+        if spans and not (limit and len(ranked) >= limit):
+            # Fuzzy matches last, closer together characters first, spans is in display order
+            fuzzy = heapq.nsmallest(limit - len(ranked), spans.items(), key=itemgetter(1)) if limit else \
+                sorted(spans.items(), key=itemgetter(1))
+            ranked += [self.records[login_name] for login_name, _ in fuzzy]
+        return ranked
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Write-behind writer for settings.json.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+from fileutils import write_atomic
+
+
+class SettingsWriter:
+    """
+    Coalesces settings writes, the file is written once after delay seconds without new changes,
+    on flush() or on exit.
+
+    lock is held while the settings are serialized, threads changing the settings hold it as well. A failed write
+    leaves the settings dirty, they are written again on the next change or flush(). The file being replaced is
+    kept as previous_path, hard linked so it costs no copy.
+    """
+    def __init__(self, path: str, get_settings, delay: float = 0.5):
+        self.path = path
+        self.previous_path = path + ".prev"
+        self.get_settings = get_settings
+        self.delay = delay
+        self.dirty = False
+        self.requested_writes = 0
+        self.writes = 0
+        self.lock = threading.RLock()
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._deadline = None
+        self._thread = None
+        atexit.register(self.flush)
+
+    @property
+    def skipped_writes(self) -> int:
+        return self.requested_writes - self.writes
+
+    def mark_dirty(self):
+        with self._condition:
+            self.dirty = True
+            self.requested_writes += 1
+            self._deadline = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="SettingsWriter", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._deadline is None or self._deadline > time.monotonic():
+                    self._condition.wait(None if self._deadline is None else self._deadline - time.monotonic())
+                self._deadline = None
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        Write the settings now if they changed, returns False when the write failed
+        """
+        with self._write_lock:
+            with self._condition:
+                if not self.dirty:
+                    return True
+                self._deadline = None
+                requested = self.requested_writes
+            try:
+                self.write(self.get_settings())
+            except (OSError, TypeError, ValueError) as e:
+                print("Settings write error, retrying on the next change\n{0}".format(e))
+                return False
+            with self._condition:
+                self.writes += 1
+                # Changes made while writing are written by the timer they armed
+                self.dirty = self.requested_writes != requested
+            return True
+
+    def write(self, settings: dict):
+        with self.lock:
+            data = json.dumps(settings, indent=2, ensure_ascii=False).encode("utf-8")
+        self._keep_previous()
+        write_atomic(self.path, data, fsync=True)
+
+    def _keep_previous(self):
+        tmp_path = self.previous_path + ".tmp"
+        try:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            os.link(self.path, tmp_path)
+            os.replace(tmp_path, self.previous_path)
+        except OSError:
+            pass
+
+    def load_previous(self):
+        """
+        The settings of the file replaced by the last write, None when there is no readable one
+        """
+        try:
+            with open(self.previous_path, encoding="utf-8") as previous_file:
+                return json.load(previous_file)
+        except (OSError, ValueError):
+            return None
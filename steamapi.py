@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Steam Web API client used by SteamSwitcher.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_URL = "https://api.steampowered.com"
+SUMMARIES_BATCH_SIZE = 100  # GetPlayerSummaries accepts at most 100 steamids per call
+
+
+class SteamApiError(Exception):
+    def __init__(self, message: str, status_code: int = None):
+        Exception.__init__(self, message)
+        self.status_code = status_code
+
+
+class PlayerSummaries:
+    """
+    Result of get_player_summaries: the players of the batches that succeeded, failed [(batch index, uids, error)]
+    and timings [(batch index, number of uids, seconds)] of every batch
+    """
+    def __init__(self):
+        self.players = []
+        self.failed = []
+        self.timings = []
+
+
+class SteamApi:
+    def __init__(self, api_key: str, api_url: str = API_URL, max_workers: int = 4, retries: int = 3,
+                 backoff_factor: float = 0.5, timeout: float = 10):
+        self.api_key = api_key
+        self.api_url = api_url.rstrip("/")
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    @staticmethod
+    def batches(uids: list, size: int = SUMMARIES_BATCH_SIZE) -> list:
+        uids = list(dict.fromkeys(uid for uid in uids if uid))
+        return [uids[i:i + size] for i in range(0, len(uids), size)]
+
+    def _get_summaries_batch(self, index: int, uids: list) -> tuple:
+        """
+        (players, error, seconds) of one batch, errors are returned so the other batches are kept
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.get(self.api_url + "/ISteamUser/GetPlayerSummaries/v0002",
+                                        params={"key": self.api_key, "steamids": ",".join(uids)},
+                                        timeout=self.timeout)
+            if response.status_code != 200:
+                raise SteamApiError("GetPlayerSummaries batch {0} failed with HTTP {1}".format(
+                    index, response.status_code), response.status_code)
+            return response.json().get("response", {}).get("players", []), None, time.perf_counter() - start
+        except (SteamApiError, requests.RequestException, ValueError) as e:
+            return [], e, time.perf_counter() - start
+
+    def get_player_summaries(self, uids: list) -> PlayerSummaries:
+        """
+        Fetch player summaries for any number of steam ids, 100 per request, in parallel.
+
+        The players of the batches that succeeded are returned with the failed batches, the error of the first
+        batch is raised only when all of them failed.
+        """
+        result = PlayerSummaries()
+        batches = self.batches(uids)
+        if not batches:
+            return result
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            for index, (players, error, elapsed) in enumerate(
+                    executor.map(self._get_summaries_batch, range(len(batches)), batches)):
+                result.timings.append((index, len(batches[index]), elapsed))
+                if error is None:
+                    result.players += players
+                else:
+                    result.failed.append((index, batches[index], error))
+        if len(result.failed) == len(batches):
+            raise result.failed[0][2]
+        return result
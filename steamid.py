@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Conversions between SteamID64 (loginusers.vdf, web api) and the 32 bit account id (logs, userdata dirs).
+
+STEAM_1:Y:Z (steam2) and [U:1:N] (steam3) text forms are accepted by to_steamid64 as well.
+"""
+import os
+import re
+
+STEAMID64_BASE = 76561197960265728  # individual account in the public universe
+ACCOUNT_ID_MAX = 0xFFFFFFFF
+
+_STEAM2 = re.compile(r"STEAM_[0-5]:([01]):(\d+)$", re.I)
+_STEAM3 = re.compile(r"\[?U:1:(\d+)\]?$", re.I)
+
+
+def account_id_to_steamid64(account_id) -> str:
+    return str(STEAMID64_BASE + int(account_id))
+
+
+def steamid64_to_account_id(steamid64) -> int:
+    account_id = int(steamid64) - STEAMID64_BASE
+    if not 0 < account_id <= ACCOUNT_ID_MAX:
+        raise ValueError("Not an individual SteamID64: {0}".format(steamid64))
+    return account_id
+
+
+def is_steamid64(value) -> bool:
+    try:
+        steamid64_to_account_id(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def account_id_to_steam2(account_id) -> str:
+    account_id = int(account_id)
+    return "STEAM_1:{0}:{1}".format(account_id & 1, account_id >> 1)
+
+
+def account_id_to_steam3(account_id) -> str:
+    return "[U:1:{0}]".format(int(account_id))
+
+
+def to_steamid64(value) -> str:
+    """
+    SteamID64 of a SteamID64, account id, STEAM_1:Y:Z or [U:1:N], raises ValueError for anything else
+    """
+    text = str(value).strip()
+    match = _STEAM2.match(text)
+    if match:
+        return account_id_to_steamid64(int(match.group(2)) * 2 + int(match.group(1)))
+    match = _STEAM3.match(text)
+    if match:
+        return account_id_to_steamid64(match.group(1))
+    if not text.isdigit():
+        raise ValueError("Not a steam id: {0}".format(value))
+    if 0 < int(text) <= ACCOUNT_ID_MAX:
+        return account_id_to_steamid64(text)
+    steamid64_to_account_id(text)
+    return text
+
+
+def userdata_path(userdata_dir: str, steamid64, *parts) -> str:
+    """
+    Path inside the userdata/<account id> directory of steamid64
+    """
+    return os.path.join(userdata_dir, str(steamid64_to_account_id(steamid64)), *parts)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Steam process helpers for the account switch, waiting for exit and the structured switch result.
+"""
+import os
+import platform
+import select
+import time
+
+SWITCH_PHASES = ("terminate", "wait_exit", "patch_registry", "launch", "confirm")
+
+if platform.system() == "Windows":
+    import ctypes
+
+    _SYNCHRONIZE = 0x00100000
+    _PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    _STILL_ACTIVE = 259
+    _WAIT_OBJECT_0 = 0
+
+
+class SwitchError(Exception):
+    pass
+
+
+class SwitchResult:
+    """
+    Outcome of SteamSwitcher.login_with, timings has the milliseconds spent in each phase that ran
+    """
+    def __init__(self, login_name: str):
+        self.login_name = login_name
+        self.ok = False
+        self.failed_phase = None
+        self.error = None
+        self.timings = {}
+        self.old_pid = None
+        self.new_pid = None
+        self.escalated = False
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.timings.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "login_name": self.login_name,
+            "ok": self.ok,
+            "failed_phase": self.failed_phase,
+            "error": str(self.error) if self.error else None,
+            "timings_ms": dict(self.timings),
+            "old_pid": self.old_pid,
+            "new_pid": self.new_pid,
+            "escalated": self.escalated,
+        }
+
+    def __str__(self):
+        timings = ", ".join("{0} {1:.0f} ms".format(phase, ms) for phase, ms in self.timings.items())
+        if self.ok:
+            return "Switched to {0} in {1:.0f} ms ({2})".format(self.login_name, self.total_ms, timings)
+        if self.failed_phase is None:
+            return "Switch to {0} failed: {1}".format(self.login_name, self.error)
+        return "Switch to {0} failed in {1}: {2} ({3})".format(self.login_name, self.failed_phase, self.error, timings)
+
+
+def process_alive(pid: int) -> bool:
+    if platform.system() == "Windows":
+        handle = ctypes.windll.kernel32.OpenProcess(_PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == _STILL_ACTIVE
+        finally:
+            ctypes.windll.kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    try:
+        # An exited process that its parent hasn't reaped yet
+        with open("/proc/{0}/stat".format(pid)) as stat_file:
+            return stat_file.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+def wait_for_exit(pid: int, timeout: float, poll_interval: float = 0.05) -> bool:
+    """
+    Returns True when the process pid has exited within timeout seconds.
+
+    Uses a pidfd on Linux, WaitForSingleObject on Windows and polling otherwise.
+    """
+    if platform.system() == "Windows":
+        handle = ctypes.windll.kernel32.OpenProcess(_SYNCHRONIZE, False, pid)
+        if handle:
+            try:
+                return ctypes.windll.kernel32.WaitForSingleObject(handle, int(timeout * 1000)) == _WAIT_OBJECT_0
+            finally:
+                ctypes.windll.kernel32.CloseHandle(handle)
+    elif hasattr(os, "pidfd_open"):
+        try:
+            pidfd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pidfd = None
+        if pidfd is not None:
+            try:
+                return bool(select.select([pidfd], [], [], timeout)[0]) or not process_alive(pid)
+            finally:
+                os.close(pidfd)
+
+    deadline = time.monotonic() + timeout
+    while process_alive(pid):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll_interval)
+    return True
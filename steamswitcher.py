@@ -6,20 +6,84 @@ A GUI program to quickly switch between many steam accounts for Linux and Window
 import argparse
 import os
 import ntpath
-import pprint
+import shutil
 import signal
 import sys
 
-from PyVDF import PyVDF
 import json
 import platform
-import subprocess
-import requests
+import threading
 import time
+from typing import TYPE_CHECKING
+
+from accountstore import AccountStore, JsonAccountStore, SqliteAccountStore, migrate_json_to_sqlite
+import controlsocket
+from parsecache import ParseCache
+import profiling
+from settingswriter import SettingsWriter
+import steamid
+from steamprocess import SwitchError, SwitchResult, process_alive, wait_for_exit
+import vdf
 
 if platform.system() == "Windows":
     import winreg
 
+# requests and subprocess are imported where they are used, --list and --login don't need them
+if TYPE_CHECKING:
+    from avatars import AvatarDownloader, AvatarStore
+    from gamesindex import GamesIndex
+    from loginwatcher import LoginResult, LoginWatcher
+    from refreshscheduler import RefreshScheduler
+    from searchindex import SearchIndex
+    from steamapi import SteamApi
+
+REGISTRY_AUTOLOGIN = "Registry.HKCU.Software.Valve.Steam.AutoLoginUser"
+REGISTRY_SKIN = "Registry.HKCU.Software.Valve.Steam.SkinV5"
+# Queries starting with this find the accounts with a game instead, "app:730" or "app:counter"
+GAME_QUERY_PREFIX = "app:"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.pyw",
+                                     usage="%(prog)s [options]",
+                                     description="Program to quickly switch between steam accounts.")
+    parser.add_argument("-l", "--login", type=str, action="store", help="Login with account")
+    parser.add_argument("-fl", "--force-login", type=str, action="store", help="Login with account, no check")
+    parser.add_argument("--confirm", action="store_true", help="Wait until steam has logged in after --login")
+    parser.add_argument("--list", action="store_true", help="List accounts")
+    parser.add_argument("--find", type=str, action="store", metavar="QUERY",
+                        help="Search accounts by login name, steam name, comment or steam uid")
+    parser.add_argument("--who-has", type=str, action="store", metavar="APPID",
+                        help="List accounts that installed, played or configured a game, APPID or part of its name")
+    parser.add_argument("--refresh", action="store_true", help="Refresh account summaries from steam api")
+    parser.add_argument("--refresh-stale", action="store_true",
+                        help="Refresh account summaries older than the summary_ttl setting")
+    parser.add_argument("-a", "--add", type=str, action="store", help="Add account")
+    parser.add_argument("--import-all", action="store_true", help="Add all accounts steam has logged in to")
+    parser.add_argument("--import", dest="import_uids", type=str, action="store",
+                        help="Add the accounts with these steam uids or login names, comma separated")
+    parser.add_argument("--delete", "--remove", type=str, action="store", help="Remove account")
+    parser.add_argument("-s", "--settings", action="store", help="Modify settings")
+    parser.add_argument("--set", action="store", help="Set settings value to")
+    parser.add_argument("--first-run", action="store_true", help="Run the first run wizard")
+    parser.add_argument("--gc-avatars", action="store_true",
+                        help="Remove avatars no account uses and the oldest over avatar_store_mb")
+    parser.add_argument("--migrate-sqlite", action="store_true", help="Move accounts to accounts.db")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and serve later command lines")
+    parser.add_argument("--profile", nargs="?", const=profiling.DEFAULT_TRACE, metavar="TRACE_JSON",
+                        help="Write timings as a chrome trace when exiting")
+    parser.add_argument("--profile-cpu", action="store_true", help="With --profile also write cProfile stats")
+    parser.add_argument("--profile-memory", action="store_true", help="With --profile also write tracemalloc stats")
+
+    gui_group = parser.add_mutually_exclusive_group(required=False)
+    gui_group.add_argument("--gui", action="store_true", help="Show gui")
+    gui_group.add_argument("--no-gui", action="store_true", help="Don't show gui")
+
+    tray_group = parser.add_mutually_exclusive_group(required=False)
+    tray_group.add_argument("--tray", action="store_true", help="Show  systemtray")
+    tray_group.add_argument("--no-tray", action="store_true", help="Don't show on systemtray")
+    return parser
+
 
 class SteamSwitcher:
     steam_dir: str
@@ -27,30 +91,55 @@ class SteamSwitcher:
     skins_dir: str
     system_os: str
     # windows_HKCU_registry: winreg
-    linux_registry: {}
     settings: dict
+    users: AccountStore
     settings_file: str
-    steam_skins: []
     default_avatar: str
     first_run: bool
     stop: bool
+    steam_api: "SteamApi" = None
+    refresh_scheduler: "RefreshScheduler" = None
+    search_index: "SearchIndex" = None
+    games_index: "GamesIndex" = None
+    avatar_downloader: "AvatarDownloader" = None
+    avatar_store: "AvatarStore" = None
+    settings_writer: SettingsWriter = None
+    parse_cache: ParseCache
+    localconfig_cache: ParseCache
+    _accounts_snapshot: tuple = None
+    uid_index: dict
+    loginusers_index: dict
+    synced_skins: list = None
+    synced_autologin: str = None
 
-    def __init__(self):
+    @profiling.traced()
+    def __init__(self, args: argparse.Namespace = None):
         self.first_run = False
+        self.stop = False
+        self.command_lock = threading.RLock()
         self._load_registry()
         self.settings = self._load_settings()
+        self.users = self._load_account_store()
+        self.parse_cache = ParseCache(os.path.join(self.changer_path, "parse_cache.json")
+                                      if self.settings.get("parse_cache", True) else None)
+        # localconfig.vdf results are too big to keep in parse_cache.json, they are only cached in memory
+        self.localconfig_cache = ParseCache()
+        self.loginusers_index = {}
+        self.build_uid_index()
         if self.system_os == "Windows":
             self.skins_dir = ntpath.join(self.steam_dir, "skins")
         else:
             self.skins_dir = os.path.join(self.steam_linux_dir, "skins")
-        self.steam_skins = self.get_steam_skins()
         self.default_avatar = os.path.join(self.changer_path, "avatars/avatar.png")
-        self.parser = argparse.ArgumentParser(prog="main.pyw",
-                                              usage="%(prog)s [options]",
-                                              description="Program to quickly switch between steam accounts.")
-        self.args = self.arg_setup()
-        self.parse(self.args)
+        self.parser = build_parser()
+        self.args = args if args is not None else self.parser.parse_args()
+        self.exit_code = self.parse(self.args)
 
+    @property
+    def steam_skins(self) -> list:
+        return self.get_steam_skins() or ["default"]
+
+    @profiling.traced()
     def _load_registry(self):
         self.system_os = platform.system()
         self.steam_dir = (self._get_linux_registry() if self.system_os == "Linux"
@@ -65,15 +154,14 @@ class SteamSwitcher:
         self.steam_dir = os.path.join(os.path.expanduser("~"), ".steam")
         self.steam_linux_dir = os.path.join(os.path.expanduser("~"), ".local/share/Steam")
         self.registry_path = os.path.join(self.steam_dir, "registry.vdf")
-        try:
-            self.linux_registry = PyVDF(infile=self.registry_path)
-        except Exception as e:
-            print("registry load error\n{e}")
         return self.steam_dir
 
+    @profiling.traced()
     def _load_settings(self) -> dict:
         self.changer_path = os.getcwd()
         self.settings_file = os.path.join(self.changer_path, "settings.json")
+        if self.settings_writer is None:
+            self.settings_writer = SettingsWriter(self.settings_file, lambda: self.settings)
         try:
             with open(self.settings_file, encoding="utf-8") as settings_file:
                 return json.load(settings_file)
@@ -82,8 +170,39 @@ class SteamSwitcher:
             self.first_run = True
             self.settings_write(True)
             return self._load_settings()
-        except json.JSONDecodeError:
-            print("Settings file is corrupted")
+        except json.JSONDecodeError as e:
+            return self._recover_settings(e)
+
+    def _recover_settings(self, error) -> dict:
+        """
+        Replace a corrupted settings.json with the copy it replaced, or with the defaults when there is none.
+        The corrupted file is kept as settings.json.corrupt
+        """
+        print("Settings file is corrupted: {0}".format(error))
+        os.replace(self.settings_file, self.settings_file + ".corrupt")
+        settings = self.settings_writer.load_previous()
+        if not isinstance(settings, dict):
+            print("No previous settings, starting with the defaults")
+            self.settings_write(True)
+            return self._load_settings()
+        print("Restored the previous settings, the corrupted file is {0}.corrupt".format(self.settings_file))
+        self.settings_writer.write(settings)
+        return settings
+
+    def _load_account_store(self) -> AccountStore:
+        if self.settings.get("account_store") == "sqlite":
+            return SqliteAccountStore(os.path.join(self.changer_path, "accounts.db"))
+        return JsonAccountStore(self.settings, self.settings_write, self.settings_writer.lock)
+
+    def migrate_account_store(self):
+        if isinstance(self.users, SqliteAccountStore):
+            print("Accounts are already stored in accounts.db")
+            return
+        shutil.copyfile(self.settings_file, self.settings_file + ".bak")
+        self.users = migrate_json_to_sqlite(self.settings, os.path.join(self.changer_path, "accounts.db"))
+        self.settings_write()
+        print("Moved {0} accounts to accounts.db, old settings saved in {1}.bak".format(len(self.users),
+                                                                                        self.settings_file))
 
     def settings_write(self, new=False):
         empty_settings = {
@@ -96,120 +215,475 @@ class SteamSwitcher:
             "use_systemtray": True,
             "users": {}
         }
+        if not new:
+            self.settings_writer.mark_dirty()
+            return
         try:
-            with open(self.settings_file, "w", encoding="utf-8") as settings_file:
-                json.dump(empty_settings if new else self.settings, settings_file, indent=2, ensure_ascii=False)
+            self.settings_writer.write(empty_settings)
         except FileNotFoundError:
             print("Settings file not found")
 
+    def settings_flush(self):
+        self.settings_writer.flush()
+        if self.avatar_store is not None:
+            self.avatar_store.save()
+
     def get_steam_skins(self) -> []:
         try:
-            l = [f.name for f in os.scandir(self.skins_dir) if f.is_dir()]
-            l.insert(0, "default")
-            return l
+            return ["default"] + self.parse_cache.get(self.skins_dir, lambda path: sorted(
+                f.name for f in os.scandir(path) if f.is_dir()))
         except FileNotFoundError as e:
             print("Error: is steam installed? \n{0}".format(e))
 
-    def login_with(self, login_name, force=False):
+    @profiling.traced()
+    def login_with(self, login_name, force=False) -> SwitchResult:
+        """
+        Switch steam to login_name: terminate steam, wait for it to exit, set AutoLoginUser, launch and
+        confirm that a new steam is running with the account. Errors are returned in the result.
+        """
+        result = SwitchResult(login_name)
+        if login_name not in self.users and not force:
+            result.error = SwitchError("Account not in settings file")
+            return result
         try:
-            if login_name in self.settings["users"] or force:
-                self.kill_steam()
-                self.set_autologin_account(login_name)
-                self.start_steam()
+            result.old_pid = self._switch_phase(result, "terminate", self.kill_steam)
+            if result.old_pid is not None:
+                self._switch_phase(result, "wait_exit", self.wait_steam_exit, result)
+            self._switch_phase(result, "patch_registry", self.set_autologin_account, login_name)
+            process = self._switch_phase(result, "launch", self.start_steam)
+            self._switch_phase(result, "confirm", self.confirm_steam_start, result, process)
         except Exception as e:
-            print("Something went wrong. Are you running as administrator?\n{0}".format(e))
-            raise e
+            result.error = e
+            return result
+        result.ok = True
+        result.failed_phase = None
+        return result
 
-    def kill_steam(self):
-        if self.system_os == "Linux":
-            try:
+    @staticmethod
+    def _switch_phase(result: SwitchResult, phase: str, fn, *args):
+        result.failed_phase = phase
+        start = time.perf_counter()
+        try:
+            with profiling.span("switch." + phase):
+                return fn(*args)
+        finally:
+            result.timings[phase] = (time.perf_counter() - start) * 1000
+
+    def get_steam_pid(self):
+        """
+        Pid of the running steam or None
+        """
+        try:
+            if self.system_os == "Linux":
                 with open(os.path.join(self.steam_dir, "steam.pid")) as file:
-                    pid = file.read()
-                os.kill(int(pid), signal.SIGTERM)
-            except ProcessLookupError:
-                print("Steam isn't running on pid " + pid)
-        elif self.system_os == "Windows":
-            reg_activeprocess = winreg.OpenKey(self.windows_HKCU_registry, "ACTIVEPROCESS")
-            pid = winreg.QueryValueEx(reg_activeprocess, "PID")[0]
+                    pid = int(file.read().strip())
+            elif self.system_os == "Windows":
+                reg_activeprocess = winreg.OpenKey(self.windows_HKCU_registry, "ACTIVEPROCESS")
+                pid = int(winreg.QueryValueEx(reg_activeprocess, "PID")[0])
+            else:
+                return None
+        except (OSError, ValueError):
+            return None
+        return pid if pid > 0 and process_alive(pid) else None
 
-            try:
-                os.kill(int(pid), signal.SIGTERM)
-            except PermissionError as e:
-                raise e
-            except OSError:
-                print("Steam not running on PID {0}".format(pid))
+    def kill_steam(self, sig=signal.SIGTERM):
+        """
+        Signal the running steam, returns its pid or None if steam isn't running
+        """
+        pid = self.get_steam_pid()
+        if pid is None:
+            return None
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            return None
+        return pid
+
+    def wait_steam_exit(self, result: SwitchResult):
+        timeout = self.settings.get("steam_exit_timeout", 10)
+        if wait_for_exit(result.old_pid, timeout):
+            return
+        sigkill = getattr(signal, "SIGKILL", None)
+        if sigkill is None:
+            raise SwitchError("Steam didn't exit in {0} s".format(timeout))
+        result.escalated = True
+        self.kill_steam(sigkill)
+        if not wait_for_exit(result.old_pid, 5):
+            raise SwitchError("Steam didn't exit after SIGKILL")
 
     def start_steam(self):
+        import subprocess
         if self.system_os == "Windows":
             steam_exe = winreg.QueryValueEx(self.windows_HKCU_registry, "STEAMEXE")[0]
-            subprocess.Popen(steam_exe)
+            return subprocess.Popen(steam_exe)
         elif self.system_os == "Linux":
-            subprocess.Popen("/usr/bin/steam-runtime", stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-    def arg_setup(self):
-        self.parser.add_argument("-l", "--login", type=str, action="store", help="Login with account")
-        self.parser.add_argument("-fl", "--force-login", type=str, action="store", help="Login with account, no check")
-        self.parser.add_argument("--list", action="store_true", help="List accounts")
-        self.parser.add_argument("-a", "--add", type=str, action="store", help="Add account")
-        self.parser.add_argument("--delete", "--remove", type=str, action="store", help="Remove account")
-        self.parser.add_argument("-s", "--settings", action="store", help="Modify settings")
-        self.parser.add_argument("--set", action="store", help="Set settings value to")
-        self.parser.add_argument("--first-run", action="store_true", help="Run the first run wizard")
-
-        gui_group = self.parser.add_mutually_exclusive_group(required=False)
-        gui_group.add_argument("--gui", action="store_true", help="Show gui")
-        gui_group.add_argument("--no-gui", action="store_true", help="Don't show gui")
-
-        tray_group = self.parser.add_mutually_exclusive_group(required=False)
-        tray_group.add_argument("--tray", action="store_true", help="Show  systemtray")
-        tray_group.add_argument("--no-tray", action="store_true", help="Don't show on systemtray")
-
-        return self.parser.parse_args()
-
-    def parse(self, args):
-        pp = pprint.PrettyPrinter(indent=2).pprint
-        if args.login and args.login in self.settings["users"]:
-            self.login_with(args.login)
-        elif args.force_login:
-            self.login_with(args.force_login, force=True)
-        elif args.login and args.login not in self.settings["users"]:
-            print("Login user not in settings file, ignoring...\nUse --force-login {0} instead".format(args.login))
+            # Nobody reads steam's output, a full pipe would block it
+            return subprocess.Popen(self.settings.get("steam_runtime", "/usr/bin/steam-runtime"),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+    def confirm_steam_start(self, result: SwitchResult, process=None):
+        timeout = self.settings.get("steam_start_timeout", 30)
+        deadline = time.monotonic() + timeout
+        while True:
+            pid = self.get_steam_pid()
+            if pid is not None and pid != result.old_pid:
+                result.new_pid = pid
+                break
+            return_code = process.poll() if process is not None else None
+            if return_code not in (None, 0):
+                raise SwitchError("Steam exited with code {0}".format(return_code))
+            if time.monotonic() >= deadline:
+                raise SwitchError("Steam didn't start in {0} s".format(timeout))
+            time.sleep(0.1)
+        autologin = self.get_autologin_account()
+        if autologin != result.login_name:
+            raise SwitchError("AutoLoginUser was changed to {0}".format(autologin))
+
+    def watch_login(self, login_name) -> "LoginWatcher":
+        """
+        Start watching for steam's login before switching, see confirm_login
+        """
+        from loginwatcher import LoginWatcher
+        return LoginWatcher(self, login_name).start()
+
+    def confirm_login(self, watcher: "LoginWatcher", timeout: float = None,
+                      cancelled: threading.Event = None) -> "LoginResult":
+        """
+        Wait for steam to log in to the account and refresh the summary of just that account
+        """
+        result = watcher.wait(timeout or self.settings.get("login_timeout", 120), cancelled)
+        if result.ok and result.steam_uid and self.settings.get("steam_api_key"):
+            try:
+                self.get_steamapi_usersummary([result.steam_uid])
+            except Exception as e:
+                print("Summary refresh after login failed\n{0}".format(e))
+        return result
+
+    def get_autologin_account(self):
+        if self.system_os == "Windows":
+            try:
+                return winreg.QueryValueEx(self.windows_HKCU_registry, "AutoLoginUser")[0]
+            except OSError:
+                return None
+        return self.load_registry().get(REGISTRY_AUTOLOGIN)
+
+    def parse(self, args, out=print) -> int:
+        """
+        Run the commands in args, output goes to out. Returns the exit code
+        """
+        exit_code = 0
+        login_name = args.login if args.login in self.users else args.force_login
+        if login_name:
+            watcher = self.watch_login(login_name) if args.confirm else None
+            result = self.login_with(login_name, force=bool(args.force_login))
+            out(str(result))
+            exit_code = 0 if result.ok else 1
+            if watcher is not None and result.ok:
+                login_result = self.confirm_login(watcher)
+                out(str(login_result))
+                exit_code = 0 if login_result.ok else 1
+            elif watcher is not None:
+                watcher.stop()
+        elif args.login and args.login not in self.users:
+            out("Login user not in settings file, ignoring...\nUse --force-login {0} instead".format(args.login))
+            exit_code = 1
 
         if args.list:
-            pp(self.settings.get("users", "No installed users").keys())
+            out("\n".join(self.users.keys()) if self.users else "No installed users")
+            self.stop = True
+
+        if args.find:
+            found = self.find_accounts(args.find)
+            if found:
+                out("\n".join("{0}\t{1}\t{2}".format(login_name, self.users[login_name].get("steam_name", ""),
+                                                      self.users[login_name].get("steam_uid", ""))
+                              for login_name in found))
+            else:
+                out("No accounts match {0}".format(args.find))
+                exit_code = 1
             self.stop = True
 
+        if args.who_has:
+            exit_code = self.print_who_has(args.who_has, out) or exit_code
+            self.stop = True
+
+        if args.add:
+            self.add_account(args.add, self.users.get(args.add))
+            out("Added account {0}".format(args.add))
+
+        if args.import_all or args.import_uids:
+            exit_code = self.import_accounts(args.import_uids, out) or exit_code
+
         if args.delete:
-            if args.delete in self.settings["users"]:
+            if args.delete in self.users:
                 self.delete_account(args.delete)
             else:
-                print("User {0} not in settings file".format(args.delete))
+                out("User {0} not in settings file".format(args.delete))
+                exit_code = 1
+
+        if args.refresh:
+            self.refresh(out)
+            self.stop = True
+
+        if args.refresh_stale:
+            refreshed = self.get_refresh_scheduler().refresh_stale()
+            out("Refreshed {0} accounts".format(len(refreshed)))
+            self.stop = True
+
+        if args.gc_avatars:
+            self.gc_avatars(out, budget_bytes=0)
+            out(self.get_avatar_store().stats())
+            self.stop = True
+
+        if args.migrate_sqlite:
+            self.migrate_account_store()
+            self.stop = True
 
-    def get_steamapi_usersummary(self, uids: list = None, get_missing=False):
+        if args.daemon:
+            self.serve_daemon()
+            self.stop = True
+        return exit_code
+
+    def import_accounts(self, import_uids: str = None, out=print) -> int:
+        """
+        Add the loginusers.vdf accounts with the comma separated uids or login names, all of them without
+        """
+        loginusers = self.load_loginusers() or {}
+        names = {uid: steam_user.get("AccountName") for uid, steam_user in loginusers.items()}
+        names.update((login_name, login_name) for login_name in list(names.values()))
+        exit_code = 0
+        if import_uids:
+            wanted = [uid.strip() for uid in import_uids.split(",") if uid.strip()]
+            unknown = [uid for uid in wanted if uid not in names]
+            if unknown:
+                out("Not in loginusers.vdf: {0}".format(", ".join(unknown)))
+                exit_code = 1
+            login_names = [names[uid] for uid in wanted if uid in names]
+        else:
+            login_names = [steam_user.get("AccountName") for steam_user in loginusers.values()]
+        added = self.add_accounts([login_name for login_name in dict.fromkeys(login_names)
+                                   if login_name not in self.users])
+        for login_name, future in self.download_steam_avatars(added).items():
+            try:
+                future.result()
+            except Exception as e:
+                out("Avatar download for {0} failed: {1}".format(login_name, e))
+        out("Imported {0} accounts{1}".format(len(added), ": " + ", ".join(added) if added else ""))
+        return exit_code
+
+    def run_command(self, command: dict) -> dict:
+        """
+        Run a command line forwarded by controlsocket.forward, command is the vars() of its parsed arguments
+        """
+        args = self.parser.parse_args([])
+        for key, value in command.items():
+            if hasattr(args, key) and key != "daemon":
+                setattr(args, key, value)
+        lines = []
+        with self.command_lock:
+            try:
+                exit_code = self.parse(args, lines.append)
+            except Exception as e:
+                lines.append("Error: {0}".format(e))
+                exit_code = 1
+        return {"ok": exit_code == 0, "exit_code": exit_code, "output": "\n".join(lines)}
+
+    def serve_daemon(self):
+        """
+        Keep running and serve forwarded command lines on the control socket until SIGTERM or ctrl-c
+        """
+        if not controlsocket.available():
+            print("--daemon needs unix sockets")
+            return
+        server = controlsocket.ControlServer(controlsocket.socket_path(self.changer_path), self.run_command)
+        if not server.bind():
+            print("A switcher is already running on {0}".format(server.path))
+            return
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        print("Listening on {0}".format(server.path))
+        if self.settings.get("auto_refresh", True) and self.settings.get("steam_api_key"):
+            self.get_refresh_scheduler().start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            if self.refresh_scheduler is not None:
+                self.refresh_scheduler.stop()
+            self.settings_flush()
+
+    @profiling.traced()
+    def refresh(self, out=print):
+        start = time.perf_counter()
+        self.update_steamuids()
+        summaries = self.get_steamapi_usersummary(out=out)
+        for index, num_uids, elapsed in summaries.timings:
+            out("batch {0}: {1} uids in {2:.0f} ms".format(index, num_uids, elapsed * 1000))
+        for login_name, future in self.download_steam_avatars(self.users, revalidate=True).items():
+            try:
+                future.result()
+            except Exception as e:
+                out("Avatar download error {0}\n{1}".format(login_name, e))
+        self.gc_avatars(out)
+        out("Refreshed {0} accounts in {1:.0f} ms".format(len(self.users), (time.perf_counter() - start) * 1000))
+        out(self.parse_cache.stats())
+
+    def get_steam_api(self) -> "SteamApi":
+        from steamapi import API_URL, SteamApi
         api_key = self.settings["steam_api_key"]
+        api_url = self.settings.get("steam_api_url", API_URL)
         if not api_key:
             raise Exception("No steam_api_key defined")
+        if self.steam_api is None or self.steam_api.api_key != api_key or self.steam_api.api_url != api_url.rstrip("/"):
+            if self.steam_api is not None:
+                self.steam_api.close()
+            self.steam_api = SteamApi(api_key, api_url)
+        return self.steam_api
+
+    def get_refresh_scheduler(self) -> "RefreshScheduler":
+        if self.refresh_scheduler is None:
+            from refreshscheduler import RefreshScheduler
+            self.refresh_scheduler = RefreshScheduler.from_settings(self)
+        return self.refresh_scheduler
+
+    def get_search_index(self) -> "SearchIndex":
+        """
+        The search index of the accounts, brought up to date with the changes since it was last used
+        """
+        if self.search_index is None:
+            from searchindex import SearchIndex
+            self.search_index = SearchIndex()
+        self.search_index.sync(self.users)
+        return self.search_index
+
+    def find_accounts(self, query: str, limit: int = None, ranked=True) -> list:
+        """
+        Login names matching query, best matches first or in display order when not ranked.
+
+        "app:<appid or game name>" finds the accounts with that game in the games index, most recently played first.
+        """
+        query = query.strip()
+        if not query.lower().startswith(GAME_QUERY_PREFIX):
+            return self.get_search_index().search(query, limit, ranked)
+        login_names = list(dict.fromkeys(login_name for _, login_name, *_ in
+                                         self.who_has(query[len(GAME_QUERY_PREFIX):]) if login_name in self.users))
+        if not ranked:
+            login_names.sort(key=lambda login_name: self.users[login_name].get("display_order", 0))
+        return login_names[:limit]
+
+    @property
+    def steam_root(self) -> str:
+        return self.steam_dir if self.system_os == "Windows" else self.steam_linux_dir
+
+    def get_games_index(self) -> "GamesIndex":
+        if self.games_index is None:
+            from gamesindex import GamesIndex
+            self.games_index = GamesIndex(os.path.join(self.changer_path, "games_index.json"))
+        return self.games_index
+
+    @profiling.traced()
+    def update_games_index(self, progress=None) -> int:
+        """
+        Re-read the appmanifests and userdata files that changed since the games index was last updated
+        """
+        from gamesindex import library_dirs
+        return self.get_games_index().update(library_dirs(self.steam_root), self.userdata_dir,
+                                             self.settings.get("games_index_processes"), progress)
+
+    def who_has(self, query: str) -> list:
+        """
+        [(appid, login name, steamid64, installed, last played, playtime), ...] from the games index for the games
+        matching query, an appid or part of a game name. login name is None for steam users that aren't accounts
+        """
+        index = self.get_games_index()
+        return [(appid, self.uid_index.get(uid), uid, installed, last_played, playtime)
+                for appid in index.find_apps(query) for uid, installed, last_played, playtime in index.who_has(appid)]
+
+    def print_who_has(self, query: str, out=print) -> int:
+        self.update_games_index()
+        rows = self.who_has(query)
+        if not rows:
+            out("No accounts have {0}".format(query))
+            return 1
+        index = self.get_games_index()
+        for appid, login_name, uid, installed, last_played, playtime in rows:
+            details = ["installed"] if installed else []
+            if last_played:
+                details.append("played {0}".format(time.strftime("%Y-%m-%d", time.localtime(last_played))))
+            if playtime:
+                details.append("{0:.1f} h".format(playtime / 60))
+            out("{0}\t{1}\t{2}\t{3}\t{4}".format(appid, index.name(appid), login_name or "-", uid,
+                                                ", ".join(details) or "configured"))
+        return 0
+
+    @profiling.traced()
+    def get_steamapi_usersummary(self, uids: list = None, get_missing=False, out=print) -> "PlayerSummaries":
+        """
+        Download and store the summaries of uids, or of every account. Batches that failed are reported on out and
+        the others are kept, raises when nothing could be downloaded
+        """
+        import requests
+        from steamapi import SteamApiError
+        steam_api = self.get_steam_api()
         if not uids:
             if get_missing:
-                uids = [user.get("steam_uid") for user in self.settings["users"].values() if not user.get("steam_user")]
+                uids = [user.get("steam_uid") for user in self.users.values() if not user.get("steam_user")]
             else:
-                uids = [user.get("steam_uid") for user in self.settings["users"].values()]
-        self.settings["last_refreshed"] = str(int(time.time()))
-        api_url = "https://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002"
-        response = requests.get(api_url, params={"key": api_key, "steamids": ",".join(uids)})
-        if response.status_code == 200 and response.json()["response"]["players"]:
-            for steam_user in response.json()["response"]["players"]:
-                login_name, user = [(login_name, user) for (login_name, user) in self.settings["users"].items() if
-                                    user.get("steam_uid") == steam_user["steamid"]][0]
+                uids = [user.get("steam_uid") for user in self.users.values()]
+        with self.settings_writer.lock:
+            self.settings["last_refreshed"] = str(int(time.time()))
+        try:
+            summaries = steam_api.get_player_summaries(uids)
+        except (SteamApiError, requests.RequestException, ValueError) as e:
+            raise Exception("ERROR: downloading usersummaries\n{0}".format(e))
+        for index, batch_uids, error in summaries.failed:
+            out("Summaries batch {0} of {1} accounts failed\n{2}".format(index, len(batch_uids), error))
+        if not summaries.players:
+            raise Exception("ERROR: downloading usersummaries")
+
+        self.merge_usersummaries(summaries.players)
+        self.settings_write()
+        return summaries
+
+    def merge_usersummaries(self, players: list) -> list:
+        """
+        Store the summaries on their accounts with the time they were refreshed, returns the login names
+        """
+        merged = []
+        now = int(time.time())
+        with self.users.lock:
+            for steam_user in players:
+                login_name = self.uid_index.get(steam_user["steamid"])
+                if login_name is None:
+                    continue
+                user = self.users[login_name]
                 user["steam_user"] = steam_user
                 user["steam_name"] = steam_user.get("personaname")
-                self.settings["users"][login_name] = user
-            self.settings_write()
-        else:
-            raise Exception("ERROR: downloading usersummaries")
+                user["summary_refreshed"] = now
+                merged.append(login_name)
+        self.users.save(*merged)
+        return merged
+
+    def build_uid_index(self):
+        self.uid_index = {user["steam_uid"]: login_name for login_name, user in self.users.items()
+                          if user.get("steam_uid")}
+
+    def _index_account(self, login_name):
+        uid = self.users[login_name].get("steam_uid")
+        if uid:
+            self.uid_index[uid] = login_name
+
+    def _unindex_account(self, login_name):
+        uid = self.users.get(login_name, {}).get("steam_uid")
+        if uid and self.uid_index.get(uid) == login_name:
+            del self.uid_index[uid]
+
+    def find_login_name(self, uid: str):
+        return self.uid_index.get(uid)
 
     def set_autologin_account(self, login_name):
-        user = self.settings["users"].get(login_name)
+        user = self.users.get(login_name)
         if self.system_os == "Windows":
             try:
                 winreg.SetValueEx(self.windows_HKCU_registry, "AutoLoginUser", 0, winreg.REG_SZ, login_name)
@@ -219,101 +693,403 @@ class SteamSwitcher:
             except PermissionError:
                 print("ERROR: Insufficient permission to set AutoLoginUser")
         elif self.system_os == "Linux":
-            self.linux_registry.edit("Registry.HKCU.Software.Valve.Steam.AutoLoginUser", login_name)
+            values = {REGISTRY_AUTOLOGIN: login_name}
             if user:
-                self.linux_registry.edit("Registry.HKCU.Software.Valve.Steam.SkinV5", user.get("steam_skin", ""))
-            self.linux_registry.write_file(self.registry_path)
+                values[REGISTRY_SKIN] = user.get("steam_skin", "")
+            registry = self.load_registry()
+            if any(registry.get(key_path) != value for key_path, value in values.items()):
+                vdf.patch(self.registry_path, values)
 
-    def set_account_localconfig(self, uid):
-        def convert_uid(uid: str) -> str:
-            return "asd"
+    def load_registry(self) -> dict:
+        """
+        AutoLoginUser and SkinV5 of registry.vdf as {key path: value}, linux only
+        """
+        try:
+            return self.parse_cache.get(self.registry_path,
+                                        lambda path: vdf.extract(path, [REGISTRY_AUTOLOGIN, REGISTRY_SKIN]))
+        except (OSError, vdf.VdfError) as e:
+            print("registry.vdf load error\n{0}".format(e))
+            return {}
+
+    @property
+    def userdata_dir(self) -> str:
+        if self.system_os == "Windows":
+            return os.path.join(self.steam_dir, "userdata")
+        return os.path.join(self.steam_linux_dir, "userdata")
 
-        localconfig_path = os.path.join(self.steam_dir, "userdata", convert_uid(uid), "localconfig.vdf")
+    def localconfig_path(self, uid: str) -> str:
+        return steamid.userdata_path(self.userdata_dir, uid, "config", "localconfig.vdf")
 
-        print(localconfig_path)
+    def get_localconfig(self, uid: str) -> dict:
+        """
+        Persona name, friends and per app settings from the localconfig.vdf of uid, see localconfig.parse.
+
+        Results are cached per account until the file changes, {} when the file is missing or unreadable.
+        """
+        import localconfig
+        try:
+            path = self.localconfig_path(uid)
+        except ValueError:
+            return {}
+        try:
+            return self.localconfig_cache.get(path, localconfig.read)
+        except FileNotFoundError:
+            return {}
+        except (OSError, vdf.VdfError) as e:
+            print("localconfig.vdf load error {0}\n{1}".format(path, e))
+            return {}
+
+    def set_account_localconfig(self, uid):
+        """
+        Fill in the steam name of the account of uid from its localconfig.vdf when there is none yet
+        """
+        login_name = self.uid_index.get(uid)
+        if not uid or login_name is None:
+            return {}
+        config = self.get_localconfig(uid)
+        user = self.users[login_name]
+        if config.get("persona_name") and not user.get("steam_name"):
+            with self.users.lock:
+                user["steam_name"] = config["persona_name"]
+            self.users.save(login_name)
+        return config
 
     def add_account(self, login_name, user=None, original_login_name=None):
         if not user:
             user = {}
         skin = user.get("steam_skin")
-        user = {
+        display_order = user.get("display_order") or max((u.get("display_order", 0) for u in self.users.values()),
+                                                         default=0) + 1
+        fields = {
             "comment": user.get("comment", ""),
-            "display_order": len(self.settings["users"].keys()) + 1,
+            "display_order": display_order,
             "timestamp": user.get("timestamp") if user.get("timestamp") else str(int(time.time())),
             "steam_skin": skin if skin in self.steam_skins else "default",
-            "steam_uid": user.get("steam_uid", ""),
-            "steam_user": user.get("steam_user", {})
+            "steam_uid": user.get("steam_uid") or self.loginusers_index.get(login_name, ""),
         }
+        if "steam_user" in user:
+            fields["steam_user"] = user["steam_user"]
         if original_login_name and login_name != original_login_name:
-            try:
-                user.pop("steam_user")
-                user.pop("steam_name")
-            except KeyError:
-                pass
-            self.settings["users"].pop(original_login_name)
-
-        self.settings["users"][login_name] = user
-        self.set_account_localconfig(user["steam_uid"])
+            # The summary of the old login name isn't carried over
+            fields.pop("steam_user", None)
+            self._unindex_account(original_login_name)
+            del self.users[original_login_name]
 
+        self._unindex_account(login_name)
         print("Saving {0} account".format(login_name))
-        self.settings_write()
+        existing = self.users.get(login_name)
+        if existing is None:
+            fields.setdefault("steam_user", {})
+            self.users[login_name] = fields
+        else:
+            # Edited in place, steam_name, summary_refreshed and the other fields not edited here are kept
+            with self.users.lock:
+                existing.update(fields)
+            self.users.save(login_name)
+        self._index_account(login_name)
+        self.set_account_localconfig(fields["steam_uid"])
+
+    @profiling.traced()
+    def add_accounts(self, batch, fetch=True) -> list:
+        """
+        Add several accounts with one write, batch is a list of login names or {login_name: user}.
+
+        Uids and persona names come from loginusers.vdf, accounts that already exist are skipped.
+        With fetch the summaries and avatars of just the new accounts are downloaded.
+        Returns the added login names.
+        """
+        if not isinstance(batch, dict):
+            batch = dict.fromkeys(batch)
+        invalid = [login_name for login_name in batch if not isinstance(login_name, str) or not login_name.strip()
+                   or login_name != login_name.strip()]
+        if invalid:
+            raise Exception("Invalid login names: {0}".format(", ".join(repr(name) for name in invalid)))
+        loginusers = {steam_user.get("AccountName"): (uid, steam_user.get("PersonaName"))
+                      for uid, steam_user in (self.load_loginusers() or {}).items()}
+        self.loginusers_index.update((login_name, uid) for login_name, (uid, _) in loginusers.items())
+        skins = self.steam_skins
+        display_order = max((u.get("display_order", 0) for u in self.users.values()), default=0)
+        timestamp = str(int(time.time()))
+        new_users = {}
+        existing = [login_name for login_name in batch if login_name in self.users]
+        if existing:
+            print("Skipping {0} existing accounts".format(len(existing)))
+        for login_name, user in batch.items():
+            if login_name in self.users:
+                continue
+            user = user or {}
+            uid, persona_name = loginusers.get(login_name, (None, None))
+            uid = user.get("steam_uid") or uid
+            if uid and not persona_name:
+                persona_name = self.get_localconfig(uid).get("persona_name")
+            display_order += 1
+            new_users[login_name] = {
+                "comment": user.get("comment", ""),
+                "display_order": display_order,
+                "timestamp": user.get("timestamp") or timestamp,
+                "steam_skin": user.get("steam_skin") if user.get("steam_skin") in skins else "default",
+                "steam_uid": uid or "",
+                "steam_user": user.get("steam_user", {})
+            }
+            if persona_name is not None:
+                new_users[login_name]["steam_name"] = persona_name
+        if not new_users:
+            return []
+        self.users.add_many(new_users)
+        for login_name in new_users:
+            self._index_account(login_name)
+        print("Added {0} accounts".format(len(new_users)))
+        if fetch:
+            self.fetch_accounts(list(new_users))
+        return list(new_users)
+
+    def fetch_accounts(self, login_names: list):
+        """
+        Download the summaries and start downloading the avatars of login_names
+        """
+        uids = [self.users[login_name]["steam_uid"] for login_name in login_names
+                if self.users[login_name].get("steam_uid")]
+        if not uids or not self.settings.get("steam_api_key"):
+            return
+        try:
+            self.get_steamapi_usersummary(uids)
+        except Exception as e:
+            print(e)
+            return
+        self.download_steam_avatars(login_names)
 
     def delete_account(self, account_name):
-        self.settings["users"].pop(account_name)
-        self.settings_write()
+        self._unindex_account(account_name)
+        del self.users[account_name]
+        # Its avatar is removed by the next gc_avatars, on refresh or --gc-avatars
+        if self.avatar_store is not None:
+            self.avatar_store.forget(account_name)
 
-    def load_loginusers(self) -> dict:
+    @property
+    def loginusers_path(self) -> str:
         if self.system_os == "Windows":
-            loginusers_path = os.path.join(self.steam_dir, "config/loginusers.vdf")
-        else:
-            loginusers_path = os.path.join(self.steam_linux_dir, "config/loginusers.vdf")
+            return os.path.join(self.steam_dir, "config/loginusers.vdf")
+        return os.path.join(self.steam_linux_dir, "config/loginusers.vdf")
+
+    @profiling.traced()
+    def load_loginusers(self) -> dict:
         try:
-            with open(loginusers_path, encoding="utf-8") as loginusers_file:
-                return PyVDF(infile=loginusers_file).getData()["users"]
+            return self.parse_cache.get(self.loginusers_path, lambda path: vdf.load(path, "users"))
         except Exception as e:
             print("loginusers.vdf load error\n{0}".format(e))
 
     def update_steamuids(self, no_save=False):
         loginusers = self.load_loginusers()
 
+        changed = []
+        self.loginusers_index = {}
         for uid, user in loginusers.items():
             if not len(uid) == 17 and uid.isnumeric():
                 raise Exception("UID: {0} doesn't seem like steam id".format(uid))
-            if user["AccountName"] in self.settings["users"] and not no_save:
-                self.settings["users"][user["AccountName"]]["steam_uid"] = uid
-                self.settings["users"][user["AccountName"]]["steam_name"] = user["PersonaName"]
+            self.loginusers_index[user["AccountName"]] = uid
+            if user["AccountName"] in self.users and not no_save:
+                self._unindex_account(user["AccountName"])
+                with self.users.lock:
+                    self.users[user["AccountName"]]["steam_uid"] = uid
+                    self.users[user["AccountName"]]["steam_name"] = user["PersonaName"]
+                self._index_account(user["AccountName"])
+                changed.append(user["AccountName"])
         if not no_save:
-            self.settings_write()
+            self.users.save(*changed)
+
+    def watched_paths(self) -> list:
+        paths = [self.loginusers_path, self.skins_dir]
+        if self.system_os == "Linux":
+            paths.append(self.registry_path)
+        return paths
 
+    def sync_baseline(self):
+        """
+        Remember the current loginusers, skins and AutoLoginUser for sync_steam_files to compare against
+        """
+        self.update_steamuids(no_save=True)
+        self.synced_skins = self.get_steam_skins() or []
+        if self.system_os == "Linux":
+            self.synced_autologin = self.load_registry().get(REGISTRY_AUTOLOGIN)
+
+    @profiling.traced()
+    def sync_steam_files(self, paths) -> dict:
+        """
+        Apply the changes of the watched steam files in paths to the accounts.
+
+        Returns the delta: "accounts" whose uid or persona name changed, "new_logins" found in loginusers
+        that aren't accounts yet, "skins_added", "skins_removed" and "autologin" when AutoLoginUser changed.
+        """
+        if self.synced_skins is None:
+            self.sync_baseline()
+        delta = {"accounts": [], "new_logins": [], "skins_added": [], "skins_removed": [], "autologin": None}
+        if self.loginusers_path in paths:
+            for uid, steam_user in (self.load_loginusers() or {}).items():
+                login_name = steam_user.get("AccountName")
+                if not login_name:
+                    continue
+                if login_name not in self.loginusers_index and login_name not in self.users:
+                    delta["new_logins"].append(login_name)
+                self.loginusers_index[login_name] = uid
+                user = self.users.get(login_name)
+                persona_name = steam_user.get("PersonaName")
+                if user is None or (user.get("steam_uid") == uid and
+                                    (not persona_name or user.get("steam_name") == persona_name)):
+                    continue
+                self._unindex_account(login_name)
+                with self.users.lock:
+                    user["steam_uid"] = uid
+                    if persona_name:
+                        user["steam_name"] = persona_name
+                self._index_account(login_name)
+                delta["accounts"].append(login_name)
+            if delta["accounts"]:
+                self.users.save(*delta["accounts"])
+        if self.skins_dir in paths:
+            skins = self.get_steam_skins() or []
+            delta["skins_added"] = [skin for skin in skins if skin not in self.synced_skins]
+            delta["skins_removed"] = [skin for skin in self.synced_skins if skin not in skins]
+            self.synced_skins = skins
+        if self.system_os == "Linux" and self.registry_path in paths:
+            autologin = self.load_registry().get(REGISTRY_AUTOLOGIN)
+            if autologin != self.synced_autologin:
+                delta["autologin"] = self.synced_autologin = autologin
+        return delta
+
+    def get_avatar_store(self) -> "AvatarStore":
+        from avatars import AvatarStore
+        if self.avatar_store is None:
+            self.avatar_store = AvatarStore(os.path.join(self.changer_path, "avatars"),
+                                            self.settings.get("avatar_store_mb", 256) * 1024 * 1024)
+        return self.avatar_store
+
+    def get_avatar_downloader(self) -> "AvatarDownloader":
+        from avatars import AvatarDownloader
+        if self.avatar_downloader is None:
+            self.avatar_downloader = AvatarDownloader(self.get_avatar_store())
+        return self.avatar_downloader
+
+    def avatar_url(self, login_name):
+        return self.users.get(login_name, {}).get("steam_user", {}).get("avatarfull")
+
+    def download_steam_avatars(self, login_names, revalidate=False) -> dict:
+        """
+        Start downloading avatars of login_names, returns {login_name: Future} resolving to the avatar path
+        """
+        r = {}
+        for login_name in login_names:
+            img_url = self.avatar_url(login_name)
+            if img_url:
+                r[login_name] = self.get_avatar_downloader().fetch(img_url, revalidate)
+        return r
+
+    def avatar_path(self, login_name):
+        """
+        Path of the downloaded avatar of login_name from the avatar store manifest, None when there is none
+        """
+        img_url = self.avatar_url(login_name)
+        return self.get_avatar_store().lookup(login_name, img_url) if img_url else None
+
+    def gc_avatars(self, out=print, budget_bytes: int = None):
+        """
+        Remove avatars no account uses any more while the store is over the avatar_store_mb setting, or over
+        budget_bytes. Avatars of accounts are kept
+        """
+        store = self.get_avatar_store()
+        account_urls = {login_name: user["steam_user"]["avatarfull"] for login_name, user in self.users.items()
+                        if user.get("steam_user", {}).get("avatarfull")}
+        removed, freed = store.gc(account_urls, budget_bytes)
+        if removed and out:
+            out("Removed {0} avatars, {1:.1f} MiB".format(removed, freed / 2 ** 20))
+
+    def accounts_snapshot(self) -> tuple:
+        """
+        Returns (version, ((login_name, display name, avatar path), ...)) in display order.
+
+        The snapshot is rebuilt only when the accounts or the avatar store change, avatar paths come from the
+        store manifest.
+        """
+        version = (self.users.version, self.get_avatar_store().version)
+        if self._accounts_snapshot is None or self._accounts_snapshot[0] != version:
+            self._accounts_snapshot = (version, tuple(
+                (login_name, str(user.get("steam_name", login_name)), self.avatar_path(login_name))
+                for login_name, user in self.users.sorted_items()))
+        return self._accounts_snapshot
+
+    @profiling.traced()
     def get_steam_avatars(self, *login_names, **kwargs) -> dict:
+        """
+        Returns avatars already in the avatar store, the default avatar for the rest.
+
+        Missing avatars are downloaded in the background and passed to
+        kwargs["callback"](login_name, avatar_path) as they finish.
+        """
+        callback = kwargs.get("callback")
         r = {}
+        missing = []
+        store = self.get_avatar_store()
         for login_name in login_names[0]:
-            if login_name in self.settings["users"]:
-                try:
-                    img_url = self.settings["users"][login_name]["steam_user"].get("avatarfull")
-                    img_filename = img_url.split("/")[-1] if img_url is not None else "avatar.png"
-                    avatar_path = os.path.join(self.changer_path, "avatars", img_filename)
-                    if os.path.isfile(avatar_path):
-                        r[login_name] = avatar_path
-                        continue
-
-                    response = requests.get(img_url)
-                    if response.status_code == 200:
-                        with open(avatar_path, "wb") as img_file:
-                            img_file.write(response.content)
-                        r[login_name] = avatar_path
-                        continue
-                    else:
-                        print("Avatar download error")
-                        r[login_name] = self.default_avatar
-                except KeyError:
-                    print("EEROREREQWRJKOJQAWJERKOJAOWEKSRJ")
+            img_url = self.avatar_url(login_name)
+            avatar_path = store.lookup(login_name, img_url) if img_url else None
+            if avatar_path:
+                r[login_name] = avatar_path
             else:
                 r[login_name] = self.default_avatar
+                if img_url:
+                    missing.append(login_name)
+
+        def done(login_name, future):
+            try:
+                callback(login_name, future.result())
+            except Exception as e:
+                print("Avatar download error\n{0}".format(e))
+
+        for login_name, future in self.download_steam_avatars(missing).items():
+            if callback:
+                future.add_done_callback(lambda f, name=login_name: done(name, f))
         return r
 
 
+# Commands a running switcher can run for a later invocation
+DAEMON_COMMANDS = ("login", "force_login", "list", "find", "refresh", "refresh_stale", "add", "import_all",
+                   "import_uids", "delete", "gc_avatars", "who_has")
+
+
+def forward_to_daemon(args: argparse.Namespace, show=False):
+    """
+    Run the commands of args in an already running switcher.
+
+    Returns the exit code, or None when nothing is listening or args have to run in this process.
+    With show a command line without commands asks a running GUI to show its window.
+    """
+    if args.daemon or args.settings or args.set or args.migrate_sqlite or args.first_run:
+        return None
+    command = dict(vars(args))
+    if not any(command[name] for name in DAEMON_COMMANDS):
+        if not show or args.no_gui:
+            return None
+        command["show"] = True
+    response = controlsocket.forward(controlsocket.socket_path(os.getcwd()), command)
+    if response is None or command.get("show") and not response.get("ok"):
+        return None
+    if response.get("output"):
+        print(response["output"])
+    return response.get("exit_code", 0)
+
+
+def main(argv: list = None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    if not argv:
+        parser.print_help()
+        return
+    args = parser.parse_args(argv)
+    profiling.enable_from(args)
+    exit_code = forward_to_daemon(args)
+    if exit_code is not None:
+        sys.exit(exit_code)
+    sys.exit(SteamSwitcher(args).exit_code)
+
+
 if __name__ == "__main__":
-    steam_switcher = SteamSwitcher()
-    if not len(sys.argv) > 1:
-        steam_switcher.parser.print_help()
+    main()
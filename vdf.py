@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming reader and in-place patcher for steam's text VDF (KeyValues) files.
+
+Key paths are dot separated like "Registry.HKCU.Software.Valve.Steam.AutoLoginUser"
+and matched case-insensitively, as steam does.
+"""
+import mmap
+import re
+
+from fileutils import write_atomic
+
+# Quoted strings, braces and unquoted strings, leading whitespace, // comments and [$PLATFORM] conditionals are skipped
+_TOKEN = re.compile(rb'(?:\s+|//[^\n]*|\[[^\]\n]*\])*(?:"([^"\\]*(?:\\.[^"\\]*)*)"|([{}])|([^\s{}"\[]+))', re.S)
+# Everything up to the next brace that isn't inside a quoted string or comment
+_SKIP = re.compile(rb'[^"{}/]*(?:(?:"[^"\\]*(?:\\.[^"\\]*)*"|//[^\n]*|/)[^"{}/]*)*')
+_ESCAPE = re.compile(r'\\(.)', re.S)
+_ESCAPES = {"n": "\n", "t": "\t"}
+
+STRING = 0
+OPEN = 1
+CLOSE = 2
+
+
+class VdfError(Exception):
+    pass
+
+
+def tokenize(data, pos: int = 0):
+    """
+    Yields (kind, start, end) of each token in data, the span of a quoted string excludes the quotes
+    """
+    for match in _TOKEN.finditer(data, pos):
+        if match.start(1) != -1:
+            yield STRING, match.start(1), match.end(1)
+        elif match.start(2) != -1:
+            yield (OPEN if match.group(2) == b"{" else CLOSE), match.start(2), match.end(2)
+        else:
+            yield STRING, match.start(3), match.end(3)
+
+
+def unescape(value: bytes) -> str:
+    return _ESCAPE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), value.decode("utf-8", "replace"))
+
+
+def escape(value: str) -> bytes:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t").encode("utf-8")
+
+
+def split_key_path(key_path: str) -> tuple:
+    return tuple(key_path.lower().split("."))
+
+
+def _skip_block(data, pos: int) -> int:
+    """
+    Returns the position after the } closing the block opened before pos
+    """
+    depth = 1
+    while True:
+        pos = _SKIP.match(data, pos).end()
+        brace = data[pos:pos + 1]
+        if brace == b"{":
+            depth += 1
+        elif brace == b"}":
+            depth -= 1
+            if not depth:
+                return pos + 1
+        else:
+            raise VdfError("Unexpected end of file")
+        pos += 1
+
+
+def walk(data, targets: set):
+    """
+    Yields (kind, path, key, start, end) for the blocks leading to the target paths and everything inside them.
+
+    path is the lowercased key path tuple, key the original key. Blocks that can't contain a target
+    are skipped by counting braces without decoding anything. Raises VdfError when data ends inside a block.
+    """
+    prefixes = {target[:i] for target in targets for i in range(len(target))}
+    tokens = tokenize(data)
+    path = ()
+    inside = 0  # how many of the open blocks are inside a target
+    key = None
+    while True:
+        token = next(tokens, None)
+        if token is None:
+            # A truncated file, e.g. one steam was still writing, must not read as an empty one
+            if path:
+                raise VdfError("Unexpected end of file inside {0}".format(".".join(path)))
+            if key is not None:
+                raise VdfError("Unexpected end of file after key {0}".format(key))
+            break
+        kind, start, end = token
+        if kind == STRING:
+            if key is None:
+                key = unescape(data[start:end])
+                continue
+            value_path = path + (key.lower(),)
+            if inside or value_path in targets:
+                yield STRING, value_path, key, start, end
+            key = None
+        elif kind == OPEN:
+            if key is None:
+                raise VdfError("Block without a key at byte {0}".format(start))
+            block_path = path + (key.lower(),)
+            if inside or block_path in targets or block_path in prefixes:
+                if inside or block_path in targets:
+                    inside += 1
+                path = block_path
+                yield OPEN, path, key, start, end
+            else:
+                tokens = tokenize(data, _skip_block(data, end))
+            key = None
+        else:
+            if not path:
+                raise VdfError("Unbalanced }} at byte {0}".format(start))
+            yield CLOSE, path, None, start, end
+            if inside:
+                inside -= 1
+            path = path[:-1]
+
+
+def _read(path: str):
+    with open(path, "rb") as vdf_file:
+        try:
+            return mmap.mmap(vdf_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # mmap of an empty file
+            return b""
+
+
+def extract_data(data, key_paths: list) -> dict:
+    """
+    Returns {key_path: value} of the key paths found in data, values are strings or dicts of their subtree.
+
+    Reading stops once every key path has been found, the first occurrence of a key path is returned.
+    """
+    targets = {split_key_path(key_path): key_path for key_path in key_paths}
+    remaining = set(targets)
+    r = {}
+    blocks = [((), None)]
+    target_depth = 0  # open blocks at or inside a target
+    for kind, path, key, start, end in walk(data, set(targets)):
+        if kind == CLOSE:
+            blocks.pop()
+            if target_depth:
+                target_depth -= 1
+                if not target_depth and not remaining:
+                    break
+            continue
+        value = {} if kind == OPEN else unescape(data[start:end])
+        if path in targets and path in remaining:
+            r[targets[path]] = value
+            remaining.discard(path)
+        if blocks[-1][1] is not None:
+            blocks[-1][1][key] = value
+        if kind == OPEN:
+            blocks.append((path, value))
+            if target_depth or path in targets:
+                target_depth += 1
+        if not remaining and not target_depth:
+            break
+    return r
+
+
+def extract(path: str, key_paths: list) -> dict:
+    """
+    Read only the given key paths of the vdf file at path, see extract_data
+    """
+    data = _read(path)
+    try:
+        return extract_data(data, key_paths)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def load(path: str, root_key: str) -> dict:
+    return extract(path, [root_key]).get(root_key, {})
+
+
+def patch_data(data: bytes, values: dict) -> bytes:
+    """
+    Set the string values of {key_path: value} in data, only the bytes of the changed values are rewritten.
+
+    Missing keys are added at the end of their block, the block itself has to exist.
+    """
+    targets = {split_key_path(key_path): (key_path.split(".")[-1], value) for key_path, value in values.items()}
+    parents = {target[:-1] for target in targets}
+    found = set()
+    edits = []
+    for kind, path, key, start, end in walk(data, set(targets)):
+        if kind == STRING and path in targets:
+            found.add(path)
+            value = escape(targets[path][1])
+            edits.append((start, end, value if data[start - 1:start] == b'"' else b'"' + value + b'"'))
+        elif kind == CLOSE and path in parents:
+            line_start = data.rfind(b"\n", 0, start) + 1
+            indent = data[line_start:start] if not data[line_start:start].strip() else b""
+            for target, (new_key, value) in targets.items():
+                if target[:-1] == path and target not in found:
+                    found.add(target)
+                    edits.append((line_start, line_start, indent + b'\t"' + escape(new_key) + b'"\t\t"' +
+                                  escape(value) + b'"\n'))
+    missing = set(targets) - found
+    if missing:
+        raise VdfError("Block not found for {0}".format(", ".join(targets[t][0] for t in missing)))
+
+    for start, end, value in sorted(edits, reverse=True):
+        data = data[:start] + value + data[end:]
+    return data
+
+
+def patch(path: str, values: dict):
+    """
+    patch_data on the file at path, the file is replaced atomically
+    """
+    with open(path, "rb") as vdf_file:
+        data = vdf_file.read()
+    patched = patch_data(data, values)
+    if patched != data:
+        write_atomic(path, patched, fsync=True)